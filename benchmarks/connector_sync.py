@@ -0,0 +1,324 @@
+"""
+BizFlow AI MVP - 外部サービス連携の取り込み確認
+
+Slack・Gmail・Teams のAPIを模したローカルサーバーを起動し、ConnectorManager で
+SQLiteデータベースへ取り込みます。次の動作を確認し、件数・所要時間を表示します。
+
+    initial      初回同期（ページ送り・429の再試行・書き込みが遅い場合の取得の一時停止）
+    incremental  新着のみの差分同期（既読などの状態は保持）
+    restart      再起動後は保存済みのカーソルから再開（同じメッセージを取り直さない）
+    deleted      Gmailで履歴の取得後に削除されたメッセージは飛ばし、一覧から取り直さない
+    expired      Gmailの古すぎる historyId（history.list が404）は一覧から取り直す
+
+使い方:
+    python benchmarks/connector_sync.py
+    python benchmarks/connector_sync.py --slack 5000 --gmail 2000 --teams 1000 --write-delay 0.01
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.connectors import (
+    MESSAGES_COLLECTION, ConnectorManager, GmailConnector, SlackConnector, TeamsConnector
+)
+from utils.database import SQLiteDatabase
+
+SLACK_CHANNELS = ('C1', 'C2')
+TEAMS_CHANNEL = 'team1/19:general@thread'
+TEAMS_PAGE_SIZE = 50
+GMAIL_PAGE_SIZE = 100
+
+
+class FakeServices:
+    """Slack・Gmail・Teams のAPIの状態（メッセージ・履歴・リクエストの記録）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slack = {channel: [] for channel in SLACK_CHANNELS}
+        self.slack_count = 0
+        # (メッセージID, 追加時の historyId)
+        self.gmail = []
+        self.gmail_deleted = set()
+        self.history_id = 100
+        # これより古い startHistoryId は404（履歴の保持期間切れ）
+        self.oldest_history_id = 0
+        self.teams = []
+        self.rate_limit_once = True
+        self.requests = []
+
+    def add_slack(self, channel, count):
+        with self.lock:
+            # ts はメッセージの一意なIDを兼ねるため、浮動小数点の丸めで重複しないよう整数から作る
+            for _ in range(count):
+                self.slack_count += 1
+                self.slack[channel].append(f"{1792200000 + self.slack_count}.000100")
+
+    def add_gmail(self, count):
+        with self.lock:
+            for _ in range(count):
+                self.history_id += 1
+                self.gmail.append((f"g{len(self.gmail)}", self.history_id))
+
+    def add_teams(self, count):
+        with self.lock:
+            for _ in range(count):
+                number = len(self.teams)
+                self.teams.append({
+                    'id': str(number),
+                    'messageType': 'message',
+                    'createdDateTime': '2026-10-18T01:02:03Z',
+                    'from': {'user': {'displayName': '山田'}},
+                    'subject': None,
+                    'body': {'content': f"<p>至急 確認 {number}</p>"}
+                })
+
+    def count_requests(self, prefix):
+        return sum(1 for path in self.requests if path.startswith(prefix))
+
+
+def make_handler(services):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            # Teams のアクセストークン
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send(200, {'access_token': 'token', 'expires_in': 3600})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            path = url.path
+            with services.lock:
+                services.requests.append(path)
+                if path == '/slack/conversations.history':
+                    return self.slack_history(query)
+                if path.startswith('/gmail/'):
+                    return self.gmail(path[len('/gmail/'):], query)
+                if path.endswith('/messages/delta'):
+                    return self.teams_delta(path, query)
+            self.send(404, {})
+
+        def slack_history(self, query):
+            if services.rate_limit_once:
+                services.rate_limit_once = False
+                return self.send(429, {}, {'Retry-After': '1'})
+            timestamps = sorted(
+                (ts for ts in services.slack[query['channel']] if float(ts) > float(query.get('oldest', 0))),
+                key=float, reverse=True
+            )
+            offset = int(query.get('cursor') or 0)
+            limit = int(query['limit'])
+            page = timestamps[offset:offset + limit]
+            next_cursor = str(offset + limit) if offset + limit < len(timestamps) else ''
+            self.send(200, {
+                'ok': True,
+                'messages': [{'type': 'message', 'ts': ts, 'user': 'U1', 'text': f"確認お願いします {ts}"} for ts in page],
+                'response_metadata': {'next_cursor': next_cursor}
+            })
+
+        def gmail(self, path, query):
+            if path == 'profile':
+                return self.send(200, {'historyId': str(services.history_id)})
+            if path == 'messages':
+                ids = [message_id for message_id, _ in services.gmail if message_id not in services.gmail_deleted]
+                offset = int(query.get('pageToken') or 0)
+                body = {'messages': [{'id': message_id} for message_id in ids[offset:offset + GMAIL_PAGE_SIZE]]}
+                if offset + GMAIL_PAGE_SIZE < len(ids):
+                    body['nextPageToken'] = str(offset + GMAIL_PAGE_SIZE)
+                return self.send(200, body)
+            if path.startswith('messages/'):
+                message_id = path.rsplit('/', 1)[1]
+                if message_id in services.gmail_deleted:
+                    return self.send(404, {'error': {'code': 404, 'message': 'Requested entity was not found.'}})
+                return self.send(200, {
+                    'id': message_id,
+                    'snippet': '今日中にお願いします &amp; 確認',
+                    'internalDate': '1792287175000',
+                    'payload': {'headers': [
+                        {'name': 'From', 'value': 'client@example.com'},
+                        {'name': 'Subject', 'value': f"件名 {message_id}"}
+                    ]}
+                })
+            if path == 'history':
+                start = int(query['startHistoryId'])
+                if start < services.oldest_history_id:
+                    return self.send(404, {'error': {'code': 404, 'message': 'Requested entity was not found.'}})
+                records = [
+                    {'messagesAdded': [{'message': {'id': message_id}}]}
+                    for message_id, history_id in services.gmail if history_id > start
+                ]
+                return self.send(200, {'history': records, 'historyId': str(services.history_id)})
+            self.send(404, {})
+
+        def teams_delta(self, path, query):
+            token = int(query.get('token') or 0)
+            skip = int(query.get('skip') or 0)
+            base = f"http://127.0.0.1:{self.server.server_port}{path}"
+            new = services.teams[token:]
+            body = {'value': new[skip:skip + TEAMS_PAGE_SIZE]}
+            if skip + TEAMS_PAGE_SIZE < len(new):
+                body['@odata.nextLink'] = f"{base}?token={token}&skip={skip + TEAMS_PAGE_SIZE}"
+            else:
+                body['@odata.deltaLink'] = f"{base}?token={len(services.teams)}"
+            self.send(200, body)
+
+    return Handler
+
+
+def start_server(services):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(services))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_connectors(base):
+    return [
+        SlackConnector({'token': 'token', 'channels': list(SLACK_CHANNELS), 'api_base': f"{base}/slack"}),
+        GmailConnector({'credentials': '{"token": "token"}', 'api_base': f"{base}/gmail"}),
+        TeamsConnector({
+            'client_id': 'client', 'client_secret': 'secret', 'tenant_id': 'tenant',
+            'channels': [TEAMS_CHANNEL], 'api_base': f"{base}/graph", 'login_base': f"{base}/login"
+        })
+    ]
+
+
+def count_messages(db):
+    return sum(1 for _ in db.collection(MESSAGES_COLLECTION).stream())
+
+
+def wait_for(db, expected, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if count_messages(db) >= expected:
+            break
+        time.sleep(0.1)
+    return count_messages(db)
+
+
+def report(label, ok, detail):
+    print(f"{label:<12} {'OK ' if ok else 'NG '} {detail}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slack", type=int, default=450, help="チャンネルC1の初期メッセージ数")
+    parser.add_argument("--gmail", type=int, default=230)
+    parser.add_argument("--teams", type=int, default=120)
+    parser.add_argument("--write-delay", type=float, default=0.05, help="1回の書き込みに加える待ち時間（秒）")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    services = FakeServices()
+    server = start_server(services)
+    base = f"http://127.0.0.1:{server.server_port}"
+    services.add_slack('C1', args.slack)
+    services.add_slack('C2', 3)
+    services.add_gmail(args.gmail)
+    services.add_teams(args.teams)
+
+    db = SQLiteDatabase(os.path.join(tempfile.mkdtemp(), 'connector_sync.sqlite3'))
+    bulk_write = db.bulk_write
+    max_queued = [0]
+
+    def slow_bulk_write(operations):
+        # 書き込みが遅い場合も取得済みのページが上限を超えて溜まらないことを確認
+        max_queued[0] = max(max_queued[0], manager._queue.qsize())
+        time.sleep(args.write_delay)
+        bulk_write(operations)
+
+    db.bulk_write = slow_bulk_write
+    results = []
+
+    # 初回同期
+    manager = ConnectorManager(build_connectors(base), db, poll_interval=0.5, queue_size=2, write_batch_size=50)
+    expected = args.slack + 3 + args.gmail + args.teams
+    start = time.perf_counter()
+    manager.start()
+    total = wait_for(db, expected, args.timeout)
+    elapsed = time.perf_counter() - start
+    results.append(report(
+        "initial", total == expected and max_queued[0] <= 2,
+        f"{total}/{expected}件 {elapsed:.2f}秒（{total / elapsed:,.0f}件/秒） 待機ページ数の最大 {max_queued[0]}"
+    ))
+
+    # 差分同期（既読にしたメッセージの状態は保持）
+    first = next(iter(db.collection(MESSAGES_COLLECTION).stream()))
+    db.collection(MESSAGES_COLLECTION).document(first.id).update({'status': '既読'})
+    services.add_slack('C2', 5)
+    services.add_gmail(4)
+    services.add_teams(7)
+    expected += 16
+    manager.sync_now()
+    total = wait_for(db, expected, args.timeout)
+    manager.stop()
+    status = db.collection(MESSAGES_COLLECTION).document(first.id).get().to_dict().get('status')
+    results.append(report("incremental", total == expected and status == '既読', f"{total}/{expected}件 状態 {status}"))
+
+    # 再起動後はカーソルから再開
+    services.requests.clear()
+    manager = ConnectorManager(build_connectors(base), db, poll_interval=60, queue_size=2)
+    manager.start()
+    time.sleep(2)
+    manager.stop()
+    fetched = services.count_requests('/gmail/messages/')
+    results.append(report(
+        "restart", count_messages(db) == expected and fetched == 0,
+        f"{count_messages(db)}件 Gmailメッセージの再取得 {fetched}件"
+    ))
+
+    # 履歴の取得後に削除されたGmailのメッセージ
+    services.add_gmail(3)
+    services.gmail_deleted.add(services.gmail[-2][0])
+    expected += 2
+    services.requests.clear()
+    manager = ConnectorManager(build_connectors(base), db, poll_interval=60, queue_size=2)
+    manager.start()
+    total = wait_for(db, expected, args.timeout)
+    manager.stop()
+    listed = services.count_requests('/gmail/messages') - services.count_requests('/gmail/messages/')
+    errors = {name: status.last_error for name, status in manager.status.items() if status.last_error}
+    results.append(report(
+        "deleted", total == expected and listed == 0 and not errors,
+        f"{total}/{expected}件 一覧の再取得 {listed}回 エラー {errors or 'なし'}"
+    ))
+
+    # 古すぎる historyId は一覧から取り直す
+    services.add_gmail(2)
+    expected += 2
+    services.oldest_history_id = services.history_id + 1
+    services.requests.clear()
+    manager = ConnectorManager(build_connectors(base), db, poll_interval=60, queue_size=2)
+    manager.start()
+    total = wait_for(db, expected, args.timeout)
+    manager.stop()
+    listed = services.count_requests('/gmail/messages') - services.count_requests('/gmail/messages/')
+    results.append(report("expired", total == expected and listed > 0, f"{total}/{expected}件 一覧の再取得 {listed}回"))
+
+    server.shutdown()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
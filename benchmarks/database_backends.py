@@ -0,0 +1,124 @@
+"""
+BizFlow AI MVP - データベースのバックエンド間の動作確認
+
+DummyDatabase・SQLiteDatabase・FirestoreDatabase に同じ書き込みを行い、結果が一致するかを確認します。
+存在しないドキュメントの更新は、単体の更新・バッチ・bulk_write のいずれでも例外にせず飛ばします。
+
+    update       存在しないドキュメントの document().update() は無視する
+    batch        バッチ内の存在しないドキュメントの更新だけを飛ばし、他の書き込みは反映する
+    batch_order  同じバッチ内で作成・削除したドキュメントへの更新は、その順序どおりに扱う
+    bulk         bulk_write（update_many_user_data）の存在しないドキュメントの更新を再試行せずに飛ばす
+
+Firestore は FIRESTORE_EMULATOR_HOST（または --firestore-emulator）を指定した場合のみ確認します。
+
+使い方:
+    gcloud emulators firestore start --host-port=localhost:8080
+    python benchmarks/database_backends.py --firestore-emulator localhost:8080
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import DummyDatabase, SQLiteDatabase, update_many_user_data
+
+
+def check_update(db, collection):
+    collection.document('missing').update({'status': '完了'})
+    return {'missing': collection.document('missing').get().to_dict()}
+
+
+def check_batch(db, collection):
+    collection.document('a').set({'status': '未着手'})
+    with db.batch() as batch:
+        batch.update(collection.document('missing'), {'status': '完了'})
+        batch.update(collection.document('a'), {'status': '完了'})
+        batch.set(collection.document('b'), {'status': '未着手'})
+    return {doc_id: collection.document(doc_id).get().to_dict() for doc_id in ('a', 'b', 'missing')}
+
+
+def check_batch_order(db, collection):
+    collection.document('deleted').set({'status': '未着手'})
+    with db.batch() as batch:
+        batch.update(collection.document('created'), {'status': '先に更新'})
+        batch.set(collection.document('created'), {'status': '未着手'})
+        batch.update(collection.document('created'), {'priority': '高'})
+        batch.delete(collection.document('deleted'))
+        batch.update(collection.document('deleted'), {'status': '完了'})
+    return {doc_id: collection.document(doc_id).get().to_dict() for doc_id in ('created', 'deleted')}
+
+
+def check_bulk(db, collection):
+    collection.document('c').set({'status': '未着手'})
+    start = time.perf_counter()
+    saved = update_many_user_data(db, collection.collection_name, {
+        'c': {'status': '完了'},
+        'missing1': {'status': '完了'},
+        'missing2': {'status': '完了'}
+    })
+    elapsed = time.perf_counter() - start
+    return {
+        'saved': saved,
+        'c': collection.document('c').get().to_dict(),
+        'missing1': collection.document('missing1').get().to_dict(),
+        # 再試行していれば数秒かかる
+        'fast': elapsed < 2
+    }
+
+
+CHECKS = {
+    'update': check_update,
+    'batch': check_batch,
+    'batch_order': check_batch_order,
+    'bulk': check_bulk,
+}
+
+
+def run_checks(label, db):
+    results = {}
+    for name, check in CHECKS.items():
+        collection = db.collection(f"check_{name}_{uuid.uuid4().hex[:8]}")
+        try:
+            results[name] = check(db, collection)
+        except Exception as e:
+            results[name] = f"{type(e).__name__}: {e}"
+        print(f"{label:<10} {name:<12} {results[name]}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--firestore-emulator", default=os.getenv("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args()
+
+    backends = {'dummy': DummyDatabase()}
+    workdir = tempfile.mkdtemp(prefix="bizflow_backends_")
+    backends['sqlite'] = SQLiteDatabase(os.path.join(workdir, "check.sqlite3"))
+    if args.firestore_emulator:
+        from utils.firestore_database import FirestoreDatabase, create_firestore_client
+        backends['firestore'] = FirestoreDatabase(create_firestore_client(args.firestore_emulator))
+    else:
+        print("FIRESTORE_EMULATOR_HOST が未設定のため、Firestore は確認しません")
+
+    results = {label: run_checks(label, db) for label, db in backends.items()}
+
+    expected = results['dummy']
+    failed = [
+        f"{label}/{name}"
+        for label, checks in results.items()
+        for name in CHECKS
+        if checks[name] != expected[name]
+    ]
+    if failed:
+        print(f"NG: DummyDatabase と結果が異なります: {', '.join(failed)}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
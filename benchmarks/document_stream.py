@@ -0,0 +1,77 @@
+"""
+BizFlow AI MVP - DummyCollection.stream の計測
+
+従来の実装（ドキュメントごとに type() でクラスを生成しリストで返す）と、
+__slots__ のスナップショットを返すジェネレーターの所要時間・ピークメモリを比較します。
+
+使い方:
+    python benchmarks/document_stream.py --docs 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import DummyDatabase
+
+
+def legacy_stream(documents):
+    """従来の実装"""
+    results = []
+    for doc_id, doc_data in documents.items():
+        doc = type('obj', (object,), {
+            'id': doc_id,
+            'to_dict': lambda: doc_data
+        })
+        results.append(doc)
+    return results
+
+
+def consume_legacy(db):
+    count = 0
+    for doc in legacy_stream(db.data['tasks']):
+        count += len(doc.to_dict())
+    return count
+
+
+def consume_snapshots(db):
+    count = 0
+    for doc in db.collection('tasks').stream():
+        count += len(doc.data)
+    return count
+
+
+def measure(label, func, db):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(db)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed * 1000:9.1f}ms  peak={peak / 1024 / 1024:8.2f}MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100000)
+    args = parser.parse_args()
+
+    db = DummyDatabase()
+    for i in range(args.docs):
+        db.data['tasks'][f"doc_{i + 1}"] = {
+            'name': f"タスク{i}",
+            'status': 'To Do',
+            'project': 'プロジェクトX',
+            'priority': '中'
+        }
+
+    measure("legacy", consume_legacy, db)
+    measure("snapshot", consume_snapshots, db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+BizFlow AI MVP - LLMクライアント再利用のレイテンシ計測
+
+従来方式（呼び出しごとに genai.configure と GenerativeModel を生成）と
+LLMClientRegistry による再利用方式の1リクエストあたりの所要時間を比較します。
+
+使い方:
+    GEMINI_API_KEY=... python benchmarks/llm_client_latency.py --requests 20
+    python benchmarks/llm_client_latency.py --setup-only   # API呼び出しを行わずセットアップ処理のみ計測
+
+--setup-only ではリクエスト送信の直前までの処理（設定・モデル生成・APIクライアント生成）を計測します。
+genai.configure はキャッシュ済みのAPIクライアントを破棄するため、従来方式では毎回クライアントが再生成されます。
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.llm_client import LLMClientRegistry
+
+PROMPT = "「了解しました」を英語に翻訳してください。"
+
+
+def call_model(model, setup_only):
+    """モデルを呼び出す（setup_only の場合はAPIクライアントの生成まで）"""
+    if setup_only:
+        from google.generativeai.client import get_default_generative_client
+        if model._client is None:
+            model._client = get_default_generative_client()
+    else:
+        model.generate_content(PROMPT)
+
+
+def run_per_call(api_key, model_name, requests, setup_only):
+    """従来方式: 呼び出しごとに設定・モデル生成"""
+    import google.generativeai as genai
+
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(model_name)
+        call_model(model, setup_only)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_registry(api_key, model_name, requests, setup_only):
+    """改善方式: レジストリでモデルと接続を再利用"""
+    registry = LLMClientRegistry()
+
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        registry.configure_gemini(api_key)
+        model = registry.gemini_model(model_name)
+        call_model(model, setup_only)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[max(0, int(len(timings_ms) * 0.95) - 1)]
+    print(
+        f"{label:<10} mean={statistics.mean(timings_ms):8.2f}ms "
+        f"p50={statistics.median(timings_ms):8.2f}ms p95={p95:8.2f}ms "
+        f"first={timings[0] * 1000:8.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--model", default="gemini-1.5-flash")
+    parser.add_argument("--setup-only", action="store_true", help="API呼び出しを行わない")
+    args = parser.parse_args()
+
+    api_key = os.getenv("GEMINI_API_KEY", "benchmark-dummy-key" if args.setup_only else "")
+    if not api_key:
+        parser.error("GEMINI_API_KEY を設定するか --setup-only を指定してください")
+
+    report("per-call", run_per_call(api_key, args.model, args.requests, args.setup_only))
+    report("registry", run_registry(api_key, args.model, args.requests, args.setup_only))
+
+
+if __name__ == "__main__":
+    main()
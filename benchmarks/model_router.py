@@ -0,0 +1,165 @@
+"""
+BizFlow AI MVP - ModelRouter のルーティング確認
+
+レイテンシ・失敗を注入した StubProvider で ModelRouter を動かし、応答したプロバイダー・
+各プロバイダーの呼び出し回数・所要時間が想定どおりかを確認します。
+
+    fast        primary が速ければ primary だけを呼ぶ
+    hedge       primary が hedge_after を過ぎても応答しなければ secondary にもリクエストし、先に返った方を使う
+    p95         計測済みのプロバイダーは hedge_after ではなく p95（下限 hedge_after/4）を過ぎた時点でヘッジする
+    failover    primary が失敗したらヘッジを待たずに secondary へ切り替える
+    unhealthy   エラー率が max_error_rate を超えたプロバイダーは後回しにする
+    transient   全て一時的なエラーで失敗した場合は AllProvidersFailedError.retryable が True
+    permanent   恒久的なエラーが含まれる場合は retryable が False
+
+使い方:
+    python benchmarks/model_router.py
+    python benchmarks/model_router.py --hedge-after 0.5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.model_router import AllProvidersFailedError, ModelRouter, StubProvider
+
+PROMPT = "確認"
+
+
+def request(router):
+    """1リクエストを送り、(応答したプロバイダー, 所要時間, 例外) を返す"""
+    start = time.monotonic()
+    try:
+        response = router.generate(PROMPT)
+    except AllProvidersFailedError as e:
+        return None, time.monotonic() - start, e
+    return response.split(']')[0].lstrip('['), time.monotonic() - start, None
+
+
+def scenario_fast(hedge_after):
+    primary = StubProvider('primary', latency=0.01)
+    secondary = StubProvider('secondary', latency=0.01)
+    router = ModelRouter([primary, secondary], hedge_after=hedge_after)
+    answered, elapsed, error = request(router)
+    return {
+        'answered': answered, 'calls': (primary.calls, secondary.calls), 'elapsed': elapsed,
+        'ok': answered == 'primary' and (primary.calls, secondary.calls) == (1, 0)
+    }
+
+
+def scenario_hedge(hedge_after):
+    primary = StubProvider('primary', latency=hedge_after * 5)
+    secondary = StubProvider('secondary', latency=0.01)
+    router = ModelRouter([primary, secondary], hedge_after=hedge_after)
+    answered, elapsed, error = request(router)
+    return {
+        'answered': answered, 'calls': (primary.calls, secondary.calls), 'elapsed': elapsed,
+        'ok': answered == 'secondary' and (primary.calls, secondary.calls) == (1, 1)
+        and hedge_after <= elapsed < hedge_after * 2
+    }
+
+
+def scenario_p95(hedge_after):
+    # primary は普段 hedge_after/10 で応答する（p95 が小さい）ため、hedge_after/4 を過ぎた時点でヘッジする
+    slow = []
+    primary = StubProvider('primary', latency=lambda: hedge_after * 5 if slow else hedge_after / 10)
+    secondary = StubProvider('secondary', latency=hedge_after / 5)
+    router = ModelRouter([primary, secondary], hedge_after=hedge_after)
+    for _ in range(10):
+        request(router)
+    calls = (primary.calls, secondary.calls)
+    slow.append(True)
+    answered, elapsed, error = request(router)
+    return {
+        'answered': answered, 'calls': (primary.calls, secondary.calls), 'elapsed': elapsed,
+        'ok': answered == 'secondary' and (primary.calls, secondary.calls) == (calls[0] + 1, calls[1] + 1)
+        and elapsed < hedge_after
+    }
+
+
+def scenario_failover(hedge_after):
+    primary = StubProvider('primary', fail=True)
+    secondary = StubProvider('secondary', latency=0.01)
+    router = ModelRouter([primary, secondary], hedge_after=hedge_after)
+    answered, elapsed, error = request(router)
+    return {
+        'answered': answered, 'calls': (primary.calls, secondary.calls), 'elapsed': elapsed,
+        'ok': answered == 'secondary' and (primary.calls, secondary.calls) == (1, 1)
+        and elapsed < hedge_after
+    }
+
+
+def scenario_unhealthy(hedge_after):
+    primary = StubProvider('primary', fail=True)
+    secondary = StubProvider('secondary', latency=0.01)
+    router = ModelRouter([primary, secondary], hedge_after=hedge_after, max_error_rate=0.5)
+    request(router)
+    answered, elapsed, error = request(router)
+    return {
+        'answered': answered, 'calls': (primary.calls, secondary.calls), 'elapsed': elapsed,
+        'ok': answered == 'secondary' and (primary.calls, secondary.calls) == (1, 2)
+    }
+
+
+def scenario_transient(hedge_after):
+    primary = StubProvider('primary', fail=True)
+    secondary = StubProvider('secondary', fail=TimeoutError("secondary timeout"))
+    router = ModelRouter([primary, secondary], hedge_after=hedge_after)
+    answered, elapsed, error = request(router)
+    return {
+        'answered': answered, 'calls': (primary.calls, secondary.calls), 'elapsed': elapsed,
+        'retryable': error and error.retryable,
+        'ok': error is not None and error.retryable is True and (primary.calls, secondary.calls) == (1, 1)
+    }
+
+
+def scenario_permanent(hedge_after):
+    primary = StubProvider('primary', fail=True)
+    secondary = StubProvider('secondary', fail=ValueError("invalid prompt"))
+    router = ModelRouter([primary, secondary], hedge_after=hedge_after)
+    answered, elapsed, error = request(router)
+    return {
+        'answered': answered, 'calls': (primary.calls, secondary.calls), 'elapsed': elapsed,
+        'retryable': error and error.retryable,
+        'ok': error is not None and error.retryable is False and (primary.calls, secondary.calls) == (1, 1)
+    }
+
+
+SCENARIOS = {
+    'fast': scenario_fast,
+    'hedge': scenario_hedge,
+    'p95': scenario_p95,
+    'failover': scenario_failover,
+    'unhealthy': scenario_unhealthy,
+    'transient': scenario_transient,
+    'permanent': scenario_permanent,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hedge-after", type=float, default=0.2)
+    args = parser.parse_args()
+
+    failed = []
+    for name, scenario in SCENARIOS.items():
+        result = scenario(args.hedge_after)
+        retryable = f"  retryable={result['retryable']}" if 'retryable' in result else ""
+        print(
+            f"{'OK' if result['ok'] else 'NG'}  {name:<10} 応答={result['answered'] or '-':<10} "
+            f"呼び出し(primary, secondary)={result['calls']}  {result['elapsed'] * 1000:7.1f}ms{retryable}"
+        )
+        if not result['ok']:
+            failed.append(name)
+
+    if failed:
+        print(f"NG: {', '.join(failed)}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+BizFlow AI MVP - /api/tasks の転送量・応答時間の計測
+
+ボード同期サーバーをローカルで起動し、HTTPクライアント（http.client、keep-alive）から
+次の取得方法を比較します。
+
+    full        毎回 /api/board で全件を取得（従来のポーリング）
+    paged       /api/tasks をカーソルでページ送りして全件を取得
+    revalidate  If-None-Match 付きで再取得（変更なしのため304）
+    delta       いくつかのタスクを更新した後、since で差分のみ取得
+
+使い方:
+    python benchmarks/task_api.py --tasks 10000 --encoding gzip
+    python benchmarks/task_api.py --tasks 10000 --encoding br   # brotli パッケージが必要
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+
+from board_server import create_app
+from utils.event_log import TaskEventLog
+from utils.shared_board import SharedBoard
+
+STATUSES = ['To Do', '進行中', 'レビュー中', '完了']
+
+
+def build_board(count):
+    tasks = [
+        {
+            'id': i + 1,
+            'name': f"タスク{i + 1}",
+            'status': STATUSES[i % len(STATUSES)],
+            'project': f"プロジェクト{i % 20}",
+            'priority': ['高', '中', '低'][i % 3],
+            'assignee': f"user{i % 50}",
+            'deadline': '2026-12-31',
+            'description': f"タスク{i + 1}の説明。顧客への返信と資料の確認を行います。",
+            'subtasks': [{'id': 1, 'name': '確認', 'completed': False}],
+            'comments': []
+        }
+        for i in range(count)
+    ]
+    return SharedBoard(tasks, event_log=TaskEventLog())
+
+
+def start_server(board, port):
+    server = uvicorn.Server(uvicorn.Config(create_app(board), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+class Client:
+    """転送量を数えるHTTPクライアント（1本の接続を使い回す）"""
+
+    def __init__(self, port, encoding):
+        self.connection = http.client.HTTPConnection("127.0.0.1", port)
+        self.encoding = encoding
+
+    def get(self, path, etag=None):
+        headers = {'Accept-Encoding': self.encoding}
+        if etag:
+            headers['If-None-Match'] = etag
+        self.connection.request("GET", path, headers=headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        return response.status, response.getheader('ETag'), body, response.getheader('Content-Encoding')
+
+
+def decode(body, content_encoding):
+    if content_encoding == 'gzip':
+        import gzip
+        body = gzip.decompress(body)
+    elif content_encoding == 'br':
+        import brotli
+        body = brotli.decompress(body)
+    return json.loads(body)
+
+
+def fetch_full(client):
+    _, _, body, _ = client.get("/api/board")
+    return len(body)
+
+
+def fetch_paged(client, limit):
+    total = 0
+    cursor = None
+    while True:
+        path = f"/api/tasks?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        _, _, body, content_encoding = client.get(path)
+        total += len(body)
+        cursor = decode(body, content_encoding)['next_cursor']
+        if cursor is None:
+            return total
+
+
+def measure(label, func, repeat):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = func()
+        timings.append(time.perf_counter() - start)
+    timings_ms = [t * 1000 for t in timings]
+    print(
+        f"{label:<11} mean={statistics.mean(timings_ms):8.2f}ms "
+        f"p50={statistics.median(timings_ms):8.2f}ms  bytes={size:>10,}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=1000, help="1ページあたりの件数")
+    parser.add_argument("--updates", type=int, default=20, help="差分取得前に更新するタスク数")
+    parser.add_argument("--encoding", default="gzip", help="Accept-Encoding（identity / gzip / br）")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8699)
+    args = parser.parse_args()
+
+    board = build_board(args.tasks)
+    server = start_server(board, args.port)
+    client = Client(args.port, args.encoding)
+
+    measure("full", lambda: fetch_full(client), args.repeat)
+    measure("paged", lambda: fetch_paged(client, args.limit), args.repeat)
+
+    path = f"/api/tasks?limit={args.limit}"
+    _, etag, _, _ = client.get(path)
+
+    def revalidate():
+        status, _, body, _ = client.get(path, etag)
+        assert status == 304
+        return len(body)
+    measure("revalidate", revalidate, args.repeat)
+
+    def delta():
+        version = board.version
+        for task_id in range(1, args.updates + 1):
+            board.update(task_id, {'status': '完了'}, user='benchmark')
+        _, _, body, content_encoding = client.get(f"/api/tasks?since={version}")
+        assert len(decode(body, content_encoding)['tasks']) == args.updates
+        return len(body)
+    measure("delta", delta, args.repeat)
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+BizFlow AI MVP - ボード同期サーバー
+共有タスクボードをJSONで公開し、変更をServer-Sent Events / WebSocketで即時に配信します
+（kanban_module / bizflow-vite のReactボード向け）
+
+エンドポイント:
+    GET /api/board                  現在の版と全タスク
+    GET /api/board/events?since=N   版Nより後のイベント（圧縮済みの場合はスナップショット付き）
+    GET /api/tasks?cursor=C&limit=L ID順のタスク一覧（カーソルによるページ送り）
+    GET /api/tasks?since=N          版Nより後に変更・削除されたタスクのみ（圧縮済みの場合は410）
+    GET /api/board/stream?since=N   SSE（再接続時は Last-Event-ID から再開）
+    WS  /api/board/ws?since=N       WebSocket（SSEと同じメッセージをJSONで送信）
+
+配信するメッセージ:
+    snapshot  {"version": 版, "tasks": [...]}       接続時（since 未指定・圧縮済みの場合）
+    event     イベントログの1件（offset・type・task_id・changes など）
+    クライアントは changes をタスクにマージし、受け取った offset を次回の since に使います。
+
+/api/tasks はボードの版から作る強いETagを返し、If-None-Match が一致すれば本文を作らず304を返します。
+本文は Accept-Encoding に応じて brotli（brotli パッケージがある場合）または gzip で圧縮します。
+ポーリングするクライアントは最初にページ送りで全件を取得し、1ページ目の version を since に渡して差分を取得します。
+
+起動方法:
+    BOARD_SERVER_ENABLED=true streamlit run main.py         # Streamlitと同じプロセスで起動
+    python board_server.py --port 8600                       # 単体で起動（動作確認用）
+
+共有タスクボードとイベントログはプロセス内のメモリにあります。単体で起動した場合はサーバー専用の
+ボード（サンプルタスク）を配信し、Streamlitアプリでの変更は反映されません。アプリのボードを配信する
+場合は BOARD_SERVER_ENABLED=true で同じプロセスで起動してください。
+"""
+
+import argparse
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import streamlit as st
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+from config.config import BOARD_SERVER_CONFIG
+from utils.shared_board import get_shared_board
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# これより小さい本文は圧縮しない（バイト）
+MIN_COMPRESS_SIZE = 1024
+
+
+def to_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def encode_cursor(task_id):
+    return base64.urlsafe_b64encode(to_json([task_id]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))[0]
+
+
+def accepted_encodings(header):
+    """Accept-Encoding から受け入れ可能な符号化方式（q=0 を除く）"""
+    encodings = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class EncodedBodyCache:
+    """ETag・符号化方式ごとの圧縮済み本文のLRUキャッシュ
+
+    同じ版を取得する複数のクライアントに対して、JSONの生成と圧縮を1回で済ませます。
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class Subscription:
+    """1クライアント分の配信キュー"""
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class BoardBroadcaster:
+    """ボードの変更を接続中のクライアントへ配信
+
+    ボードの変更通知は任意のスレッドから届くため、イベントループに渡してから各クライアントのキューに入れます。
+    処理が追いつかずキューがあふれたクライアントは切断し、再接続時にオフセットから追いつかせます。
+    """
+
+    def __init__(self, board, loop, queue_size=1000, heartbeat_seconds=15.0):
+        self.board = board
+        self.loop = loop
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._subscriptions = set()
+        self._unsubscribe = board.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        self.loop.call_soon_threadsafe(self._publish, event)
+
+    def _publish(self, event):
+        for subscription in list(self._subscriptions):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self._subscriptions.discard(subscription)
+
+    def close(self):
+        self._unsubscribe()
+
+    @property
+    def client_count(self):
+        return len(self._subscriptions)
+
+    async def messages(self, since=None):
+        """(種別, 内容) を返す非同期ジェネレーター（種別: snapshot / event / heartbeat）"""
+        subscription = Subscription(self.queue_size)
+        # 取りこぼしが無いよう、現在の状態を読む前に購読を開始する
+        self._subscriptions.add(subscription)
+        try:
+            if since is None:
+                version, tasks = self.board.snapshot()
+                yield 'snapshot', {'version': version, 'tasks': tasks}
+                last_offset = version
+            else:
+                last_offset = since
+                for kind, payload in self._catch_up(since):
+                    yield kind, payload
+                    last_offset = payload['version'] if kind == 'snapshot' else payload['offset']
+
+            while not subscription.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield 'heartbeat', None
+                    continue
+                # 購読開始から状態の読み込みまでの間に届いたイベント・補完済みのイベントは送信済み
+                if event['offset'] <= last_offset:
+                    continue
+                if event['offset'] > last_offset + 1:
+                    # 変更通知はボードのロックの外で行われるため、別スレッドの変更が先に届くことがある。
+                    # 間のイベントはイベントログから補って順番どおりに送る
+                    for kind, payload in self._catch_up(last_offset):
+                        yield kind, payload
+                        last_offset = payload['version'] if kind == 'snapshot' else payload['offset']
+                    continue
+                yield 'event', event
+                last_offset = event['offset']
+        finally:
+            self._subscriptions.discard(subscription)
+
+    def _catch_up(self, offset):
+        """オフセットより後の変更を (種別, 内容) で返す（圧縮済みの場合はスナップショットから）"""
+        snapshot, events = self.board.events.catch_up(offset)
+        if snapshot is not None:
+            yield 'snapshot', {'version': snapshot['offset'], 'tasks': list(snapshot['tasks'].values())}
+        for event in events:
+            yield 'event', event
+
+
+def parse_since(value):
+    """since・Last-Event-ID の値（未指定の場合はNone、整数でない・負の値の場合はValueError）"""
+    if value in (None, ''):
+        return None
+    since = int(value)
+    if since < 0:
+        raise ValueError(f"since には0以上を指定してください: {value}")
+    return since
+
+
+def create_app(board, allowed_origins=(), queue_size=1000, heartbeat_seconds=15.0,
+               page_size=200, max_page_size=1000):
+    """ボード同期サーバーのASGIアプリケーションを作成"""
+    state = {}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        state['broadcaster'] = BoardBroadcaster(
+            board, asyncio.get_running_loop(), queue_size=queue_size, heartbeat_seconds=heartbeat_seconds
+        )
+        try:
+            yield
+        finally:
+            state['broadcaster'].close()
+
+    def error_response(status_code, message, **extra):
+        return JSONResponse({'error': message, **extra}, status_code=status_code)
+
+    async def board_state(request):
+        version, tasks = board.snapshot()
+        return Response(to_json({'version': version, 'tasks': tasks}), media_type='application/json')
+
+    async def board_events(request):
+        try:
+            since = parse_since(request.query_params.get('since')) or 0
+        except ValueError:
+            return error_response(400, 'since の値が不正です')
+        snapshot, events = board.events.catch_up(since)
+        payload = {'version': board.version, 'events': events}
+        if snapshot is not None:
+            payload['snapshot'] = {'version': snapshot['offset'], 'tasks': list(snapshot['tasks'].values())}
+        return Response(to_json(payload), media_type='application/json')
+
+    body_cache = EncodedBodyCache()
+
+    def tasks_etag(version, request, encoding):
+        """版とクエリから強いETagを作成（符号化方式ごとに別の値）"""
+        query = hashlib.sha1(str(sorted(request.query_params.multi_items())).encode()).hexdigest()[:12]
+        return f'"{version}-{query}-{encoding}"'
+
+    def etag_matches(request, version):
+        """If-None-Match が現在の版のいずれかの符号化方式のETagと一致するか"""
+        header = request.headers.get('if-none-match')
+        if not header:
+            return False
+        prefix = tasks_etag(version, request, '')[:-1]
+        return header.strip() == '*' or any(
+            tag.strip().removeprefix('W/').startswith(prefix) for tag in header.split(',')
+        )
+
+    def negotiate_encoding(request):
+        accepted = accepted_encodings(request.headers.get('accept-encoding'))
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return 'identity'
+
+    def tasks_response(request, version, build_payload):
+        """ETag・圧縮付きのJSONレスポンス"""
+        encoding = negotiate_encoding(request)
+        etag = tasks_etag(version, request, encoding)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+
+        body = body_cache.get(etag)
+        if body is None:
+            body = to_json(build_payload()).encode()
+            if len(body) < MIN_COMPRESS_SIZE:
+                encoding = 'identity'
+            elif encoding == 'br':
+                body = brotli.compress(body, quality=5)
+            elif encoding == 'gzip':
+                body = gzip.compress(body, compresslevel=6)
+            body_cache.set(etag, (body, encoding))
+        else:
+            body, encoding = body
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(body, media_type='application/json', headers=headers)
+
+    def list_tasks(request):
+        """タスク一覧・差分（JSONの生成と圧縮はスレッドプールで実行し、配信を止めない）"""
+        params = request.query_params
+        # 現在の版のETagと一致すれば、一覧を作らずに304を返す
+        version = board.version
+        if etag_matches(request, version):
+            return Response(status_code=304, headers={
+                'ETag': tasks_etag(version, request, negotiate_encoding(request)),
+                'Cache-Control': 'no-cache',
+                'Vary': 'Accept-Encoding'
+            })
+        try:
+            since = parse_since(params.get('since'))
+            limit = min(int(params.get('limit') or page_size), max_page_size)
+            after = decode_cursor(params['cursor']) if params.get('cursor') else None
+        except (ValueError, TypeError, IndexError):
+            return error_response(400, 'since・limit・cursor の値が不正です')
+        if limit < 1:
+            return error_response(400, 'limit は1以上を指定してください')
+
+        if since is not None:
+            if after is not None:
+                return error_response(400, 'since と cursor は同時に指定できません')
+            changes = board.changes(since)
+            if changes is None:
+                # 差分を作れないため、クライアントは一覧を取得し直す
+                return error_response(410, '指定した版の変更履歴は残っていません', version=board.version)
+            version, tasks, deleted = changes
+            return tasks_response(request, version, lambda: {
+                'version': version, 'since': since, 'tasks': tasks, 'deleted': deleted
+            })
+
+        version, tasks, next_after = board.page(after, limit)
+        return tasks_response(request, version, lambda: {
+            'version': version,
+            'tasks': tasks,
+            'next_cursor': None if next_after is None else encode_cursor(next_after)
+        })
+
+    async def board_stream(request):
+        try:
+            since = parse_since(request.query_params.get('since'))
+        except ValueError:
+            return error_response(400, 'since の値が不正です')
+        try:
+            # 再接続時はブラウザが送る Last-Event-ID を優先（不正な値の場合は現在の版から配信）
+            last_event_id = parse_since(request.headers.get('last-event-id'))
+        except ValueError:
+            last_event_id = since = None
+        if last_event_id is not None:
+            since = last_event_id
+
+        async def body():
+            # 再接続までの待ち時間（ミリ秒）
+            yield "retry: 1000\n\n"
+            async for kind, payload in state['broadcaster'].messages(since):
+                if kind == 'heartbeat':
+                    yield ": ping\n\n"
+                    continue
+                offset = payload['offset'] if kind == 'event' else payload['version']
+                yield f"id: {offset}\nevent: {kind}\ndata: {to_json(payload)}\n\n"
+
+        return StreamingResponse(body(), media_type='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            # リバースプロキシでのバッファリングを無効化
+            'X-Accel-Buffering': 'no'
+        })
+
+    async def board_websocket(websocket):
+        await websocket.accept()
+        try:
+            since = parse_since(websocket.query_params.get('since'))
+        except ValueError:
+            await websocket.close(code=1008, reason='since の値が不正です')
+            return
+        try:
+            async for kind, payload in state['broadcaster'].messages(since):
+                await websocket.send_text(to_json({'kind': kind, 'data': payload}))
+        except WebSocketDisconnect:
+            pass
+
+    async def health(request):
+        return JSONResponse({'version': board.version, 'clients': state['broadcaster'].client_count})
+
+    return Starlette(
+        routes=[
+            Route('/api/board', board_state),
+            Route('/api/board/events', board_events),
+            Route('/api/tasks', list_tasks),
+            Route('/api/board/stream', board_stream),
+            WebSocketRoute('/api/board/ws', board_websocket),
+            Route('/api/health', health),
+        ],
+        middleware=[Middleware(
+            CORSMiddleware, allow_origins=list(allowed_origins), allow_methods=['GET'], expose_headers=['ETag']
+        )],
+        lifespan=lifespan
+    )
+
+
+def build_server(board, config=BOARD_SERVER_CONFIG, port=None):
+    app = create_app(
+        board,
+        allowed_origins=config["allowed_origins"],
+        heartbeat_seconds=config["heartbeat_seconds"],
+        page_size=config["page_size"],
+        max_page_size=config["max_page_size"]
+    )
+    return uvicorn.Server(uvicorn.Config(
+        app, host=config["host"], port=port or config["port"], log_level="warning"
+    ))
+
+
+@st.cache_resource
+def start_board_server(_board):
+    """Streamlitと同じプロセスでサーバーをバックグラウンド起動（プロセスにつき1回）"""
+    server = build_server(_board)
+    thread = threading.Thread(target=server.run, name="board-server", daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=BOARD_SERVER_CONFIG["port"])
+    args = parser.parse_args()
+    # 単体起動ではこのプロセス専用のボードを配信する（Streamlitアプリのボードとは共有されない）
+    print("単体起動: このプロセスのタスクボードを配信します（Streamlitアプリでの変更は反映されません）")
+    build_server(get_shared_board(), port=args.port).run()
+
+
+if __name__ == "__main__":
+    main()
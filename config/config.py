@@ -28,7 +28,8 @@ AI_MODELS = {
     "models": {
         "gemini": {
             "api_key": os.getenv("GEMINI_API_KEY"),
-            "model_name": "gemini-1.5-pro"
+            "model_name": "gemini-1.5-pro",
+            "requests_per_minute": int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
         },
         "claude": {
             "api_key": os.getenv("CLAUDE_API_KEY"),
@@ -45,23 +46,130 @@ AI_MODELS = {
 EXTERNAL_SERVICES = {
     "slack": {
         "token": os.getenv("SLACK_TOKEN"),
-        "enabled": True if os.getenv("SLACK_TOKEN") else False
+        "enabled": True if os.getenv("SLACK_TOKEN") else False,
+        # 取得するチャンネルID（カンマ区切り、未設定の場合はボットが参加している全チャンネル）
+        "channels": [c.strip() for c in os.getenv("SLACK_CHANNELS", "").split(",") if c.strip()],
+        "api_base": os.getenv("SLACK_API_BASE", "https://slack.com/api")
     },
     "gmail": {
         "credentials": os.getenv("GMAIL_CREDENTIALS"),
-        "enabled": True if os.getenv("GMAIL_CREDENTIALS") else False
+        "enabled": True if os.getenv("GMAIL_CREDENTIALS") else False,
+        # 初回同期で取得する期間（日数）
+        "initial_days": int(os.getenv("GMAIL_INITIAL_DAYS", "7")),
+        "api_base": os.getenv("GMAIL_API_BASE", "https://gmail.googleapis.com/gmail/v1/users/me")
     },
     "teams": {
         "client_id": os.getenv("TEAMS_CLIENT_ID"),
         "client_secret": os.getenv("TEAMS_CLIENT_SECRET"),
-        "enabled": True if os.getenv("TEAMS_CLIENT_ID") else False
+        "enabled": True if os.getenv("TEAMS_CLIENT_ID") else False,
+        "tenant_id": os.getenv("TEAMS_TENANT_ID", "common"),
+        # 取得するチャンネル（「チームID/チャンネルID」のカンマ区切り）
+        "channels": [c.strip() for c in os.getenv("TEAMS_CHANNELS", "").split(",") if c.strip()],
+        "api_base": os.getenv("TEAMS_API_BASE", "https://graph.microsoft.com/v1.0"),
+        "login_base": os.getenv("TEAMS_LOGIN_BASE", "https://login.microsoftonline.com")
     }
 }
 
+# 外部サービスからのメッセージ取り込み
+CONNECTOR_CONFIG = {
+    # 新着確認の間隔（秒）
+    "poll_interval": float(os.getenv("CONNECTOR_POLL_INTERVAL", "60")),
+    # 取得済み・未保存のページ数の上限（超えると取得を一時停止）
+    "queue_size": int(os.getenv("CONNECTOR_QUEUE_SIZE", "8")),
+    # 1回の書き込みでまとめて保存するメッセージ数
+    "write_batch_size": int(os.getenv("CONNECTOR_WRITE_BATCH_SIZE", "200")),
+    # エラー時の再試行間隔の上限（秒）
+    "max_backoff": float(os.getenv("CONNECTOR_MAX_BACKOFF", "300")),
+    "request_timeout": float(os.getenv("CONNECTOR_REQUEST_TIMEOUT", "10"))
+}
+
+# 取り込んだメッセージのAI処理（重要度・要約・タスク抽出をまとめて実行）
+AI_SCHEDULER_CONFIG = {
+    # 連携設定で保存するまでの「AI処理のタイミング」
+    "default_timing": os.getenv("AI_PROCESSING_TIMING", "15分毎"),
+    # 1回のAIリクエストで分析するメッセージ数の上限
+    "max_batch_size": int(os.getenv("AI_BATCH_MAX_MESSAGES", "20")),
+    # リアルタイム処理で同時に届いたメッセージをまとめる待ち時間（秒）
+    "realtime_delay": float(os.getenv("AI_REALTIME_DELAY", "2")),
+    # リアルタイム設定時の重要度「高」以外のメッセージの処理間隔（秒）
+    "realtime_fallback_interval": float(os.getenv("AI_REALTIME_FALLBACK_INTERVAL", "300")),
+    # AIリクエストが失敗したメッセージを再試行する回数
+    "max_attempts": int(os.getenv("AI_BATCH_MAX_ATTEMPTS", "3"))
+}
+
+# AIジョブキュー（タスク生成・要約・返信案などを画面とは別のワーカーで実行）
+JOB_QUEUE_CONFIG = {
+    "path": os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite3"),
+    # アプリのプロセス内で起動するワーカー数（0の場合は job_worker.py を別プロセスで起動）
+    "workers": int(os.getenv("JOB_WORKERS", "4")),
+    "max_attempts": int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    # 実行中のジョブを他のワーカーが引き継ぐまでの時間（秒）
+    "lease_seconds": float(os.getenv("JOB_LEASE_SECONDS", "300")),
+    # 新しいジョブ・画面の状態表示を確認する間隔（秒）
+    "poll_interval": float(os.getenv("JOB_POLL_INTERVAL", "1.0")),
+    # 完了したジョブを保持する日数
+    "retention_days": float(os.getenv("JOB_RETENTION_DAYS", "7"))
+}
+
 # アプリケーション設定
 APP_CONFIG = {
     "title": "BizFlow AI MVP",
     "version": "1.0.0",
     "debug": os.getenv("DEBUG", "False").lower() == "true",
     "secret_key": os.getenv("SECRET_KEY", "your-secret-key-here")
-}
\ No newline at end of file
+}
+
+# キャッシュ設定
+CACHE_CONFIG = {
+    "llm_max_entries": int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+    "llm_ttl_seconds": int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+    "llm_db_path": os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3"),
+    # ディスク層の最大件数（起動時と llm_prune_interval 回の保存ごとに期限切れを削除し、超過分は古い順に削除）
+    "llm_disk_max_entries": int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "10000")),
+    "llm_prune_interval": int(os.getenv("LLM_CACHE_PRUNE_INTERVAL", "100")),
+    # データベース読み取り結果のキャッシュ
+    "query_max_entries": int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256")),
+    # 設定すると同じマシン上の他プロセスにも無効化を通知（例: .cache/query_invalidation.sqlite3）
+    "query_invalidation_path": os.getenv("QUERY_CACHE_INVALIDATION_PATH", ""),
+    "query_poll_interval": float(os.getenv("QUERY_CACHE_POLL_INTERVAL", "1.0"))
+}
+
+# メッセージ重要度の判定ルール
+MESSAGE_PRIORITY_RULES = {
+    "urgent_keywords": ['緊急', '至急', '今日中', 'ASAP', '急ぎ', '重要', '締切'],
+    "high_priority_senders": ['クライアント', '顧客', 'CEO', '重要'],
+    "today_keywords": ['today', '今日']
+}
+
+# タスクイベントログ（snapshot_interval 件ごとにスナップショットを取り、古いイベントを圧縮）
+EVENT_LOG_CONFIG = {
+    "snapshot_interval": int(os.getenv("EVENT_LOG_SNAPSHOT_INTERVAL", "500")),
+    "retained_snapshots": int(os.getenv("EVENT_LOG_RETAINED_SNAPSHOTS", "2"))
+}
+
+# データベース設定（backend: "dummy" / "sqlite" / "firestore"）
+DATABASE_CONFIG = {
+    "backend": os.getenv("DATABASE_BACKEND", "dummy"),
+    "sqlite_path": os.getenv("SQLITE_PATH", "data/bizflow.sqlite3"),
+    "pool_size": int(os.getenv("SQLITE_POOL_SIZE", "5")),
+    # Firestore（FIRESTORE_EMULATOR_HOST を設定するとローカルのエミュレーターに接続）
+    "firestore_emulator_host": os.getenv("FIRESTORE_EMULATOR_HOST"),
+    "firestore_page_size": int(os.getenv("FIRESTORE_PAGE_SIZE", "500"))
+}
+
+# ボード同期サーバー設定（Reactのカンバンボードへ変更を配信）
+BOARD_SERVER_CONFIG = {
+    "enabled": os.getenv("BOARD_SERVER_ENABLED", "False").lower() == "true",
+    "host": os.getenv("BOARD_SERVER_HOST", "127.0.0.1"),
+    "port": int(os.getenv("BOARD_SERVER_PORT", "8600")),
+    # 接続を許可するフロントエンドのオリジン（カンマ区切り）
+    "allowed_origins": [
+        origin.strip()
+        for origin in os.getenv("BOARD_SERVER_ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
+        if origin.strip()
+    ],
+    "heartbeat_seconds": float(os.getenv("BOARD_SERVER_HEARTBEAT_SECONDS", "15")),
+    # /api/tasks の1ページあたりの件数（既定値・上限）
+    "page_size": int(os.getenv("BOARD_SERVER_PAGE_SIZE", "200")),
+    "max_page_size": int(os.getenv("BOARD_SERVER_MAX_PAGE_SIZE", "1000"))
+}
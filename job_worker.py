@@ -0,0 +1,47 @@
+"""
+BizFlow AI MVP - AIジョブワーカー（別プロセス）
+Streamlitアプリとは別のプロセスでジョブキューのAIジョブを実行します。
+実行結果はジョブキューに保存され、タスク・メッセージへの反映はアプリのプロセスで行います。
+
+使い方:
+    JOB_WORKERS=0 streamlit run main.py      # アプリ内では結果の反映のみ
+    python job_worker.py --workers 4
+    python job_worker.py --workers 2 --kinds reply_drafts,message_summary
+"""
+
+import argparse
+import signal
+import threading
+
+from config.config import JOB_QUEUE_CONFIG
+from utils.ai_jobs import AI_JOB_CLASSES, build_worker_pool
+from utils.job_queue import JobQueue
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(JOB_QUEUE_CONFIG["workers"], 1))
+    parser.add_argument("--kinds", default=",".join(AI_JOB_CLASSES), help="実行するジョブ種別（カンマ区切り）")
+    parser.add_argument("--path", default=JOB_QUEUE_CONFIG["path"], help="ジョブキューのSQLiteファイル")
+    args = parser.parse_args()
+
+    queue = JobQueue(
+        args.path, max_attempts=JOB_QUEUE_CONFIG["max_attempts"], lease_seconds=JOB_QUEUE_CONFIG["lease_seconds"]
+    )
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    pool = build_worker_pool(queue, args.workers, apply=False, kinds=kinds)
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    pool.start()
+    print(f"AIジョブワーカーを起動しました（{args.workers}スレッド: {', '.join(pool.kinds)}）")
+    try:
+        while not stopped.wait(60):
+            print(pool.stats())
+    except KeyboardInterrupt:
+        pass
+    pool.stop()
+
+
+if __name__ == "__main__":
+    main()
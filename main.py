@@ -4,6 +4,7 @@ HTMLレンダリング修正・レイアウト修正・ドラッグ風インタ
 """
 
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import sys
 import os
 import time
@@ -13,6 +14,18 @@ import json
 # プロジェクトのルートディレクトリをPythonパスに追加
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from config.config import BOARD_SERVER_CONFIG
+from utils.ai_jobs import get_job_workers, show_job, show_task_preview, submit_job
+from utils.database import get_database
+from utils.job_queue import PRIORITY_LOW
+from utils.llm_cache import get_llm_cache
+from utils.llm_client import get_llm_registry
+from utils.shared_board import VersionConflictError, get_shared_board
+
+# 1画面に描画するタスク数（カンバン列ごと・リストビュー1ページあたり）
+KANBAN_PAGE_SIZE = 20
+TASK_LIST_PAGE_SIZE = 50
+
 # Streamlitページ設定
 st.set_page_config(
     page_title="BizFlow AI MVP",
@@ -300,120 +313,26 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# 部分再実行（Streamlitのフラグメント。未対応バージョンでは通常の関数として動作）
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+def rerun_fragment():
+    """実行中のフラグメントのみ再実行（フラグメント外・未対応バージョンではアプリ全体を再実行）"""
+    try:
+        st.rerun(scope="fragment")
+    except (TypeError, StreamlitAPIException):
+        st.rerun()
+
 # AI設定
 def setup_ai():
     """AI APIの設定"""
     try:
-        import google.generativeai as genai
         api_key = st.secrets.get("GEMINI_API_KEY", "")
-        if api_key and api_key != "test-gemini-api-key-12345":
-            genai.configure(api_key=api_key)
-            return True
-        else:
-            return False
+        return get_llm_registry().configure_gemini(api_key)
     except Exception as e:
         st.error(f"AI設定エラー: {str(e)}")
         return False
 
-def generate_ai_task(message_info, summary_data=None):
-    """AIタスク自動生成機能"""
-    try:
-        import google.generativeai as genai
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # 要約データがある場合は活用
-        context = ""
-        if summary_data:
-            context = f"""
-            要約: {summary_data.get('要約', '')}
-            分類: {summary_data.get('分類', '')}
-            アクション: {summary_data.get('アクション', '')}
-            緊急度: {summary_data.get('緊急度', '')}
-            """
-        
-        prompt = f"""
-あなたは優秀なタスク管理アシスタントです。以下のメッセージから最適なタスクを生成してください。
-
-## メッセージ情報
-送信者: {message_info['sender']}
-件名: {message_info['subject']}
-時刻: {message_info['time']}
-{context}
-
-## タスク生成要件
-以下の形式で出力してください：
-
-**タスク名:**
-[簡潔で分かりやすいタスク名]
-
-**詳細説明:**
-[タスクの具体的な内容と要求事項]
-
-**期限:**
-[具体的な期限日時、不明な場合は「明日 17:00」]
-
-**優先度:**
-[高/中/低]
-
-**カテゴリ:**
-[コミュニケーション/プロジェクト作業/会議/レビュー/調査]
-
-**推定時間:**
-[タスク完了までの推定時間]
-
-**サブタスク:**
-[実行すべきステップを3つまで、改行区切り]
-
-**完了条件:**
-[タスクが完了したと判断する条件]
-        """
-        
-        response = model.generate_content(prompt)
-        return response.text
-        
-    except Exception as e:
-        # テンプレートタスク生成
-        return f"""
-**タスク名:**
-{message_info['subject']}への対応
-
-**詳細説明:**
-{message_info['sender']}さんからの{message_info['subject']}に関して適切に対応する
-
-**期限:**
-明日 17:00
-
-**優先度:**
-中
-
-**カテゴリ:**
-コミュニケーション
-
-**推定時間:**
-30分
-
-**サブタスク:**
-メッセージ内容の確認
-必要な資料の準備
-返信または対応の実行
-
-**完了条件:**
-適切な返信を送信し、相手からの確認を得る
-        """
-
-def parse_ai_response(response_text):
-    """AI応答をパース"""
-    sections = response_text.split("**")
-    parsed_data = {}
-    
-    for i in range(1, len(sections), 2):
-        if i + 1 < len(sections):
-            key = sections[i].strip().replace(':', '')
-            value = sections[i + 1].strip()
-            parsed_data[key] = value
-    
-    return parsed_data
-
 def simple_auth():
     """簡易認証システム"""
     if 'authenticated' not in st.session_state:
@@ -431,6 +350,7 @@ def simple_auth():
             if submit_button:
                 if username == "admin" and password == "admin123":
                     st.session_state.authenticated = True
+                    st.session_state.username = username
                     st.success("ログインに成功しました！")
                     st.rerun()
                 else:
@@ -444,109 +364,19 @@ def simple_auth():
     
     return True
 
+def current_user():
+    """ログイン中のユーザー名"""
+    return st.session_state.get('username', 'admin')
+
 def initialize_session_state():
     """セッション状態の初期化"""
-    if 'ai_tasks' not in st.session_state:
-        # サンプルタスクデータ
-        st.session_state.ai_tasks = [
-            {
-                'id': 1,
-                'name': '田中さんへの緊急返信',
-                'description': '【緊急】プレゼン資料確認への返信対応。修正箇所の特定と迅速な対応が必要。',
-                'status': 'To Do',
-                'priority': '高',
-                'project': 'プロジェクトX',
-                'assignee': '自分',
-                'due_date': '今日 18:00',
-                'estimated_time': '15分',
-                'created_from_message': True,
-                'source_message': {'sender': '田中一郎', 'subject': '【緊急】プレゼン資料確認'},
-                'subtasks': [
-                    {'id': 1, 'name': 'メッセージ内容の詳細確認', 'completed': False},
-                    {'id': 2, 'name': 'プレゼン資料の確認', 'completed': False},
-                    {'id': 3, 'name': '修正箇所の特定と対応', 'completed': False}
-                ],
-                'comments': [],
-                'tags': ['緊急', 'プレゼン', 'コミュニケーション'],
-                'created_at': '2025-07-19 14:30',
-                'completion_criteria': '田中さんへの返信送信完了'
-            },
-            {
-                'id': 2,
-                'name': 'マーケティング企画への回答',
-                'description': '山田花子さんからのキャンペーン企画相談への対応。ターゲット層分析とKPI設定を含む包括的な回答が必要。',
-                'status': '進行中',
-                'priority': '中',
-                'project': 'マーケティング戦略',
-                'assignee': '自分',
-                'due_date': '明日 17:00',
-                'estimated_time': '45分',
-                'created_from_message': True,
-                'source_message': {'sender': '山田花子', 'subject': 'キャンペーン企画の件'},
-                'subtasks': [
-                    {'id': 1, 'name': 'ターゲット層の分析', 'completed': True},
-                    {'id': 2, 'name': '予算配分の検討', 'completed': False},
-                    {'id': 3, 'name': 'KPI設定の提案', 'completed': False}
-                ],
-                'comments': [
-                    {'author': '自分', 'text': 'ターゲット層の分析完了。20代女性を中心に検討。', 'timestamp': '2025-07-19 15:30'}
-                ],
-                'tags': ['企画', 'マーケティング', 'コミュニケーション'],
-                'created_at': '2025-07-19 13:15',
-                'completion_criteria': '企画提案の回答送信完了'
-            },
-            {
-                'id': 3,
-                'name': 'クライアント向けプロポーザル作成',
-                'description': '新規クライアント向けの提案資料作成。要件整理からデザイン調整まで含む完全版の作成。',
-                'status': 'レビュー中',
-                'priority': '高',
-                'project': 'プロジェクトX',
-                'assignee': '自分',
-                'due_date': '明後日 12:00',
-                'estimated_time': '3時間',
-                'created_from_message': False,
-                'subtasks': [
-                    {'id': 1, 'name': '要件整理', 'completed': True},
-                    {'id': 2, 'name': 'コンテンツ作成', 'completed': True},
-                    {'id': 3, 'name': 'デザイン調整', 'completed': True},
-                    {'id': 4, 'name': '最終レビュー', 'completed': False}
-                ],
-                'comments': [
-                    {'author': '自分', 'text': 'プロポーザルのドラフト完成。レビュー待ち。', 'timestamp': '2025-07-19 16:00'}
-                ],
-                'tags': ['プロポーザル', '営業', 'ドキュメント'],
-                'created_at': '2025-07-18 09:00',
-                'completion_criteria': 'プロポーザル完成・提出完了'
-            },
-            {
-                'id': 4,
-                'name': 'システム進捗報告の確認',
-                'description': '佐藤次郎さんからの進捗報告内容の確認と返信。システム更新の進行状況を把握し適切にフィードバック。',
-                'status': '完了',
-                'priority': '低',
-                'project': 'システム開発',
-                'assignee': '自分',
-                'due_date': '今日 17:00',
-                'estimated_time': '10分',
-                'created_from_message': True,
-                'source_message': {'sender': '佐藤次郎', 'subject': '進捗報告'},
-                'subtasks': [
-                    {'id': 1, 'name': '進捗内容の確認', 'completed': True},
-                    {'id': 2, 'name': '質問事項の整理', 'completed': True},
-                    {'id': 3, 'name': '確認返信の送信', 'completed': True}
-                ],
-                'comments': [
-                    {'author': '自分', 'text': '80%進捗確認。予定通り完了見込み。', 'timestamp': '2025-07-19 11:30'}
-                ],
-                'tags': ['進捗', 'システム', '報告'],
-                'created_at': '2025-07-19 11:00',
-                'completion_criteria': '進捗確認と返信完了'
-            }
-        ]
+    if 'db' not in st.session_state:
+        # 全セッション共通のデータベース（DATABASE_CONFIGで切り替え）
+        st.session_state.db = get_database()
     
-    if 'task_counter' not in st.session_state:
-        st.session_state.task_counter = 5
+    if 'board_version' not in st.session_state:
+        # 共有ボードのどの版まで表示したか（セッションはデータを持たずカーソルのみ保持）
+        st.session_state.board_version = get_shared_board().version
     
     if 'projects' not in st.session_state:
         st.session_state.projects = [
@@ -582,60 +412,106 @@ def initialize_session_state():
     if 'show_task_modal' not in st.session_state:
         st.session_state.show_task_modal = False
 
-def add_ai_task(message_info, task_data):
-    """AIタスクをセッションに追加"""
-    initialize_session_state()
-    
-    # サブタスクの処理
-    subtasks_text = task_data.get('サブタスク', '')
-    subtasks = []
-    if subtasks_text:
-        subtask_lines = subtasks_text.split('\n')
-        for i, line in enumerate(subtask_lines):
-            if line.strip():
-                subtasks.append({
-                    'id': i + 1,
-                    'name': line.strip(),
-                    'completed': False
-                })
-    
-    task = {
-        'id': st.session_state.task_counter,
-        'name': task_data.get('タスク名', f"{message_info['subject']}への対応"),
-        'description': task_data.get('詳細説明', ''),
-        'status': 'To Do',
-        'priority': task_data.get('優先度', '中'),
-        'project': task_data.get('カテゴリ', 'コミュニケーション'),
-        'assignee': '自分',
-        'due_date': task_data.get('期限', '明日 17:00'),
-        'estimated_time': task_data.get('推定時間', '30分'),
-        'created_from_message': True,
-        'source_message': message_info,
-        'subtasks': subtasks,
-        'comments': [],
-        'tags': ['AI生成', 'コミュニケーション'],
-        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M'),
-        'completion_criteria': task_data.get('完了条件', '')
-    }
-    
-    st.session_state.ai_tasks.append(task)
-    st.session_state.task_counter += 1
-    
-    return task
-
 def get_task_by_id(task_id):
     """タスクIDからタスクを取得"""
-    for task in st.session_state.ai_tasks:
-        if task['id'] == task_id:
-            return task
-    return None
+    return get_shared_board().get(task_id)
+
+def report_conflict(error, widget_key=None):
+    """他のユーザーとの更新競合を次の表示で通知（競合した入力ウィジェットの状態は破棄）"""
+    if widget_key:
+        st.session_state.pop(widget_key, None)
+    if error.current is None:
+        st.session_state.conflict_notice = "このタスクは他のユーザーによって削除されています。"
+    else:
+        updated_by = error.current.get('updated_by') or '他のユーザー'
+        st.session_state.conflict_notice = (
+            f"「{error.current['name']}」は{updated_by}さんが先に更新していたため、変更を反映しませんでした。"
+            "最新の内容を表示しています。"
+        )
+
+def show_conflict_notice():
+    """更新競合の通知を表示"""
+    notice = st.session_state.pop('conflict_notice', None)
+    if notice:
+        st.warning(f"⚠️ {notice}")
+
+def displayed_task(task, view):
+    """前回の表示時の状態を返し、今回表示したタスクの状態を記録
+    
+    ウィジェット操作による再実行では最新のタスクを読み直すため、操作の前提には前回の表示時の状態を使います。
+    セッションにはタスクのコピーではなく、版とウィジェットの表示値（ステータス・サブタスクの完了状態）のみを保存します。
+    """
+    state = {
+        'version': task.get('version'),
+        'status': task.get('status'),
+        'subtasks': {subtask['id']: subtask['completed'] for subtask in task.get('subtasks', [])}
+    }
+    views = st.session_state.setdefault('displayed_tasks', {}).setdefault(task['id'], {})
+    shown = views.get(view, state)
+    views[view] = state
+    return shown
+
+def forget_displayed_tasks(view, keep_ids=()):
+    """今回表示しなかったタスクの記録を破棄（削除されたタスク・表示範囲外になったタスク）"""
+    displayed = st.session_state.get('displayed_tasks', {})
+    for task_id in [task_id for task_id, views in displayed.items() if view in views and task_id not in keep_ids]:
+        del displayed[task_id][view]
+        if not displayed[task_id]:
+            del displayed[task_id]
+        prune_own_versions(task_id)
+
+def record_own_update(task):
+    """自分の更新で作られた版を記録（自分の更新同士は競合させない）"""
+    if task is not None:
+        st.session_state.setdefault('own_task_versions', {}).setdefault(task['id'], set()).add(task['version'])
+
+def prune_own_versions(task_id):
+    """どの表示の前提にもならなくなった自分の版を破棄"""
+    own_versions = st.session_state.get('own_task_versions', {})
+    views = st.session_state.get('displayed_tasks', {}).get(task_id)
+    if task_id not in own_versions:
+        return
+    if views:
+        oldest = min(state['version'] or 0 for state in views.values())
+        own_versions[task_id] = {version for version in own_versions[task_id] if version > oldest}
+    if not views or not own_versions[task_id]:
+        del own_versions[task_id]
+
+def base_version(shown, task):
+    """操作の前提となる版（表示後の変更が全て自分の更新であれば最新の版）"""
+    own_versions = st.session_state.get('own_task_versions', {}).get(task['id'], set())
+    version = shown.get('version')
+    while version is not None and version + 1 in own_versions:
+        version += 1
+    prune_own_versions(task['id'])
+    return version
+
+def sync_widget(key, shown_value, current_value):
+    """表示後に値が変わっていて、ユーザーが操作していないウィジェットを最新の値に戻す"""
+    if shown_value != current_value and st.session_state.get(key) == shown_value:
+        del st.session_state[key]
+
+def update_task_status(task_id, new_status, expected_version=None, widget_key=None):
+    """タスクのステータスを更新（expected_version: 表示時の版。その後に他の更新があった場合はFalse）"""
+    try:
+        record_own_update(get_shared_board().update(
+            task_id, {'status': new_status}, user=current_user(), expected_version=expected_version
+        ))
+        return True
+    except VersionConflictError as e:
+        report_conflict(e, widget_key)
+        return False
 
-def update_task_status(task_id, new_status):
-    """タスクのステータスを更新"""
-    for task in st.session_state.ai_tasks:
-        if task['id'] == task_id:
-            task['status'] = new_status
-            break
+def delete_task(task_id, expected_version=None):
+    """タスクを削除（expected_version: 表示時の版。その後に他の更新があった場合はFalse）"""
+    try:
+        get_shared_board().delete(task_id, user=current_user(), expected_version=expected_version)
+        st.session_state.get('displayed_tasks', {}).pop(task_id, None)
+        prune_own_versions(task_id)
+        return True
+    except VersionConflictError as e:
+        report_conflict(e)
+        return False
 
 def get_move_options(current_status):
     """移動可能なステータスを取得"""
@@ -654,37 +530,33 @@ def show_dashboard():
     
     initialize_session_state()
     
+    # 集計カウンター（タスク追加・更新・削除時に差分更新済み）
+    counters = get_shared_board().counters
+    
     # プロジェクト別タスク統計
-    project_stats = {}
-    for task in st.session_state.ai_tasks:
-        project = task.get('project', 'その他')
-        if project not in project_stats:
-            project_stats[project] = {'total': 0, 'completed': 0}
-        project_stats[project]['total'] += 1
-        if task['status'] == '完了':
-            project_stats[project]['completed'] += 1
+    project_stats = counters.project_stats()
     
     # 5列のレイアウト
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        todo_count = len([t for t in st.session_state.ai_tasks if t['status'] == 'To Do'])
+        todo_count = counters.status('To Do')
         st.metric("📋 To Do", f"{todo_count}件", "新規タスク")
     
     with col2:
-        progress_count = len([t for t in st.session_state.ai_tasks if t['status'] == '進行中'])
+        progress_count = counters.status('進行中')
         st.metric("🔄 進行中", f"{progress_count}件", "作業中")
     
     with col3:
-        review_count = len([t for t in st.session_state.ai_tasks if t['status'] == 'レビュー中'])
+        review_count = counters.status('レビュー中')
         st.metric("👀 レビュー中", f"{review_count}件", "確認待ち")
     
     with col4:
-        completed_count = len([t for t in st.session_state.ai_tasks if t['status'] == '完了'])
+        completed_count = counters.status('完了')
         st.metric("✅ 完了", f"{completed_count}件", "今日")
     
     with col5:
-        ai_count = len([t for t in st.session_state.ai_tasks if t['created_from_message']])
+        ai_count = counters.ai_created
         st.metric("🤖 AI作成", f"{ai_count}件", "自動生成")
     
     st.markdown("---")
@@ -723,6 +595,9 @@ def render_task_card(task):
     else:
         subtask_text = "0/0"
     
+    # 操作の前提となる版（前回の表示時）
+    version = base_version(displayed_task(task, 'card'), task)
+    
     # 優先度クラス
     priority_class = f"priority-{task['priority'].lower()}" if task['priority'] in ['高', '中', '低'] else "priority-medium"
     
@@ -776,24 +651,38 @@ def render_task_card(task):
                 )
                 
                 if selected_move != "移動先選択":
-                    update_task_status(task['id'], selected_move)
-                    st.success(f"「{task['name']}」を「{selected_move}」に移動しました！")
-                    st.rerun()
+                    if update_task_status(task['id'], selected_move, expected_version=version):
+                        st.success(f"「{task['name']}」を「{selected_move}」に移動しました！")
+                    del st.session_state[f"move_select_{task['id']}"]
+                    rerun_fragment()
         
         with col3:
             if st.button("🗑️", key=f"delete_{task['id']}", help="タスクを削除"):
                 if st.session_state.get(f"confirm_delete_{task['id']}", False):
-                    st.session_state.ai_tasks = [t for t in st.session_state.ai_tasks if t['id'] != task['id']]
-                    st.success("タスクを削除しました")
-                    st.rerun()
+                    if delete_task(task['id'], expected_version=version):
+                        st.success("タスクを削除しました")
+                    rerun_fragment()
                 else:
                     st.session_state[f"confirm_delete_{task['id']}"] = True
                     st.warning("もう一度クリックすると削除されます")
 
+@fragment
 def show_fixed_kanban_board():
     """修正版カンバンボード"""
     st.markdown("### 📋 カンバンボード")
     
+    # 前回の表示以降に他のユーザーが行った変更を通知
+    board = get_shared_board()
+    changes = board.changes_since(st.session_state.board_version)
+    if changes is None:
+        st.info("🔄 他のユーザーがボードを更新しました")
+    else:
+        updated_by_others = {change['task_id'] for change in changes if change['user'] != current_user()}
+        if updated_by_others:
+            st.info(f"🔄 他のユーザーが{len(updated_by_others)}件のタスクを更新しました")
+    st.session_state.board_version = board.version
+    show_conflict_notice()
+    
     # ステータス列の定義
     statuses = [
         {'name': 'To Do', 'color': '#6c757d'},
@@ -807,6 +696,7 @@ def show_fixed_kanban_board():
     
     # 4列のカンバンボード
     cols = st.columns(4)
+    rendered_ids = set()
     
     for i, status_info in enumerate(statuses):
         with cols[i]:
@@ -814,8 +704,7 @@ def show_fixed_kanban_board():
             color = status_info['color']
             
             # カラムヘッダー
-            tasks_in_status = [t for t in st.session_state.ai_tasks if t['status'] == status]
-            task_count = len(tasks_in_status)
+            task_count = board.counters.status(status)
             
             st.markdown(f"""
             <div class="kanban-column">
@@ -825,9 +714,27 @@ def show_fixed_kanban_board():
                 </div>
             """, unsafe_allow_html=True)
             
-            # タスクカード表示
-            for task in tasks_in_status:
-                render_task_card(task)
+            # 列の折りたたみ（折りたたみ中はカードのウィジェットを生成しない）
+            collapsed_key = f"kanban_collapsed_{status}"
+            collapsed = st.session_state.get(collapsed_key, False)
+            if st.button("▶ 展開" if collapsed else "▼ 折りたたむ", key=f"toggle_column_{status}"):
+                st.session_state[collapsed_key] = not collapsed
+                rerun_fragment()
+            
+            if not collapsed:
+                # 先頭から表示件数分のみ描画
+                visible_key = f"kanban_visible_{status}"
+                visible_count = st.session_state.get(visible_key, KANBAN_PAGE_SIZE)
+                
+                for task in board.by_status(status, limit=visible_count):
+                    render_task_card(task)
+                    rendered_ids.add(task['id'])
+                
+                remaining = task_count - visible_count
+                if remaining > 0:
+                    if st.button(f"⬇️ さらに表示（残り{remaining}件）", key=f"load_more_{status}"):
+                        st.session_state[visible_key] = visible_count + KANBAN_PAGE_SIZE
+                        rerun_fragment()
             
             # 新規タスク追加（To Doカラムのみ）
             if status == 'To Do':
@@ -837,17 +744,28 @@ def show_fixed_kanban_board():
             st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
+    # 削除・折りたたみなどで表示しなくなったカードの記録を破棄
+    forget_displayed_tasks('card', rendered_ids)
 
+@fragment
 def show_task_modal():
     """タスク詳細モーダル"""
     if not st.session_state.show_task_modal or not st.session_state.selected_task_id:
         return
     
+    show_conflict_notice()
+    
     task = get_task_by_id(st.session_state.selected_task_id)
     if not task:
+        forget_displayed_tasks('modal')
         st.error("タスクが見つかりません")
         return
     
+    # 前回の表示内容と、操作の前提となる版（別のタスクを開いていた場合はその記録を破棄）
+    forget_displayed_tasks('modal', {task['id']})
+    shown = displayed_task(task, 'modal')
+    version = base_version(shown, task)
+    
     # モーダルの背景オーバーレイ
     with st.container():
         # モーダルヘッダー
@@ -873,6 +791,7 @@ def show_task_modal():
             
             # ステータス変更
             current_status = task['status']
+            sync_widget(f"modal_status_{task['id']}", shown['status'], current_status)
             new_status = st.selectbox(
                 "ステータス",
                 ['To Do', '進行中', 'レビュー中', '完了'],
@@ -881,14 +800,18 @@ def show_task_modal():
             )
             
             if new_status != current_status:
-                update_task_status(task['id'], new_status)
-                st.success(f"ステータスを「{new_status}」に変更しました")
+                if update_task_status(
+                    task['id'], new_status,
+                    expected_version=version, widget_key=f"modal_status_{task['id']}"
+                ):
+                    st.success(f"ステータスを「{new_status}」に変更しました")
                 st.rerun()
             
             # その他の基本情報
             st.write(f"**優先度:** {task['priority']}")
             st.write(f"**担当者:** {task.get('assignee', '')}")
             st.write(f"**期限:** {task.get('due_date', '')}")
+            st.caption(f"版 {task.get('version')}" + (f"（最終更新: {task['updated_by']}）" if task.get('updated_by') else ""))
         
         with col2:
             st.markdown("#### 📁 プロジェクト情報")
@@ -916,25 +839,34 @@ def show_task_modal():
         st.markdown("#### ✅ サブタスク")
         
         if task.get('subtasks'):
+            shown_completed = shown['subtasks']
             for i, subtask in enumerate(task['subtasks']):
                 col1, col2 = st.columns([5, 1])
                 
                 with col1:
                     # チェックボックスでサブタスクの完了状態を管理
+                    subtask_key = f"modal_subtask_{task['id']}_{subtask['id']}"
+                    sync_widget(subtask_key, shown_completed.get(subtask['id']), subtask['completed'])
                     completed = st.checkbox(
                         subtask['name'], 
                         value=subtask['completed'],
-                        key=f"modal_subtask_{task['id']}_{subtask['id']}"
+                        key=subtask_key
                     )
                     
                     # 状態が変更された場合
                     if completed != subtask['completed']:
-                        subtask['completed'] = completed
-                        if completed:
-                            st.success(f"サブタスク「{subtask['name']}」を完了しました！")
-                        else:
-                            st.info(f"サブタスク「{subtask['name']}」を未完了に戻しました")
-                        st.rerun()
+                        try:
+                            record_own_update(get_shared_board().set_subtask_completed(
+                                task['id'], subtask['id'], completed,
+                                user=current_user(), expected_version=version
+                            ))
+                            if completed:
+                                st.success(f"サブタスク「{subtask['name']}」を完了しました！")
+                            else:
+                                st.info(f"サブタスク「{subtask['name']}」を未完了に戻しました")
+                        except VersionConflictError as e:
+                            report_conflict(e, subtask_key)
+                        rerun_fragment()
                 
                 with col2:
                     st.write("✅" if subtask['completed'] else "⭕")
@@ -944,17 +876,11 @@ def show_task_modal():
             new_subtask_name = st.text_input("サブタスク名", key=f"modal_new_subtask_{task['id']}")
             if st.button("追加", key=f"modal_add_subtask_{task['id']}"):
                 if new_subtask_name:
-                    if 'subtasks' not in task:
-                        task['subtasks'] = []
-                    
-                    new_subtask = {
-                        'id': len(task['subtasks']) + 1,
-                        'name': new_subtask_name,
-                        'completed': False
-                    }
-                    task['subtasks'].append(new_subtask)
+                    record_own_update(
+                        get_shared_board().add_subtask(task['id'], new_subtask_name, user=current_user())
+                    )
                     st.success(f"サブタスク「{new_subtask_name}」を追加しました！")
-                    st.rerun()
+                    rerun_fragment()
         
         # コメント
         st.markdown("#### 💬 コメント")
@@ -973,17 +899,14 @@ def show_task_modal():
         new_comment = st.text_area("新しいコメント", key=f"modal_new_comment_{task['id']}")
         if st.button("コメント追加", key=f"modal_add_comment_{task['id']}"):
             if new_comment:
-                if 'comments' not in task:
-                    task['comments'] = []
-                
                 comment = {
-                    'author': '自分',
+                    'author': current_user(),
                     'text': new_comment,
                     'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M')
                 }
-                task['comments'].append(comment)
+                record_own_update(get_shared_board().add_comment(task['id'], comment, user=current_user()))
                 st.success("コメントを追加しました！")
-                st.rerun()
+                rerun_fragment()
         
         # 完了条件
         if task.get('completion_criteria'):
@@ -997,29 +920,28 @@ def show_task_modal():
         with col1:
             if task['status'] != '完了':
                 if st.button("✅ 完了にする", type="primary", key=f"modal_complete_{task['id']}"):
-                    update_task_status(task['id'], '完了')
-                    st.success("タスクを完了にしました！")
-                    st.balloons()
+                    if update_task_status(task['id'], '完了', expected_version=version):
+                        st.success("タスクを完了にしました！")
+                        st.balloons()
                     st.rerun()
         
         with col2:
             if st.button("📋 複製", key=f"modal_duplicate_{task['id']}"):
                 # タスクの複製
                 new_task = task.copy()
-                new_task['id'] = st.session_state.task_counter
+                new_task['id'] = None
                 new_task['name'] = f"{task['name']} (コピー)"
                 new_task['status'] = 'To Do'
                 new_task['created_at'] = datetime.now().strftime('%Y-%m-%d %H:%M')
                 
-                st.session_state.ai_tasks.append(new_task)
-                st.session_state.task_counter += 1
+                get_shared_board().add(new_task, user=current_user())
                 st.success("タスクを複製しました！")
         
         with col3:
             if st.button("🗑️ 削除", key=f"modal_delete_{task['id']}"):
-                st.session_state.ai_tasks = [t for t in st.session_state.ai_tasks if t['id'] != task['id']]
-                st.session_state.show_task_modal = False
-                st.success("タスクを削除しました")
+                if delete_task(task['id'], expected_version=version):
+                    st.session_state.show_task_modal = False
+                    st.success("タスクを削除しました")
                 st.rerun()
         
         with col4:
@@ -1037,6 +959,22 @@ def show_communication():
     else:
         st.warning("🤖 **AI統合テストモード** - 基本機能のみ利用可能（APIキーを設定してください）")
     
+    cache_stats = get_llm_cache().stats()
+    st.caption(
+        f"🗄️ AI応答キャッシュ: ヒット {cache_stats['hits']}件 / ミス {cache_stats['misses']}件"
+        f"（ヒット率 {cache_stats['hit_rate']:.0%}）"
+    )
+    
+    job_stats = get_job_workers().stats()
+    st.caption(
+        f"🧵 AIジョブ: 待機 {job_stats['queued']}件 / 実行中 {job_stats['running']}件 / "
+        f"失敗 {job_stats['failed'] + job_stats['apply_failed']}件"
+    )
+    
+    # メッセージごとのタスク生成ジョブ（送信者 -> ジョブID）
+    if 'task_jobs' not in st.session_state:
+        st.session_state.task_jobs = {}
+    
     st.markdown("---")
     st.markdown("### 📨 AI統合分析済みメッセージ一覧")
     
@@ -1090,22 +1028,27 @@ def show_communication():
             
             with col2:
                 if st.button("📋 Asanaタスク作成", key=f"asana_task_{msg['sender']}", type="primary"):
-                    # Asana風タスクを自動作成
-                    task_data = {
-                        'タスク名': f"{msg['subject']}への対応",
-                        '詳細説明': f"{msg['sender']}さんからの{msg['subject']}に対して適切に対応する",
-                        '期限': '明日 17:00',
-                        '優先度': msg['priority'].split()[1] if len(msg['priority'].split()) > 1 else '中',
-                        'カテゴリ': 'コミュニケーション',
-                        '推定時間': msg['estimated_time'],
-                        'サブタスク': f"メッセージ内容の確認\n対応方針の決定\n{msg['sender']}さんへの返信"
-                    }
-                    
-                    created_task = add_ai_task(msg, task_data)
-                    st.success(f"✅ Asana風タスク「{created_task['name']}」を作成しました！")
-                    st.info("📋 タスク管理ページのカンバンボードで確認できます")
+                    # AIによる生成はワーカーで実行（ページを移動しても継続し、完了後にボードへ追加）
+                    job = submit_job('task_generation', {'message': msg, 'user': current_user()})
+                    st.session_state.task_jobs[msg['sender']] = job['id']
+            
+            if msg['sender'] in st.session_state.task_jobs:
+                show_job(st.session_state.task_jobs[msg['sender']], show_created_task, "タスク生成", show_task_preview)
             
             st.markdown("---")
+    
+    # 一括タスク化（ジョブとして登録し、完了したものから順にタスクへ追加）
+    if st.button("📥 全メッセージを一括タスク化", key="bulk_ai_tasks"):
+        for msg in messages:
+            job = submit_job('task_generation', {'message': msg, 'user': current_user()}, priority=PRIORITY_LOW)
+            st.session_state.task_jobs[msg['sender']] = job['id']
+        # 各メッセージの下に生成状況を表示
+        st.rerun()
+
+def show_created_task(job):
+    """タスク生成ジョブの結果を表示"""
+    st.success(f"✅ Asana風タスク「{job['result']['task_name']}」を作成しました！")
+    st.info("📋 タスク管理ページのカンバンボードで確認できます")
 
 def show_tasks():
     """修正版Asana風タスク管理表示"""
@@ -1117,6 +1060,8 @@ def show_tasks():
     if st.session_state.show_task_modal:
         with st.container():
             show_task_modal()
+    else:
+        forget_displayed_tasks('modal')
     
     # ビュー切り替え
     view_tabs = st.tabs(["📋 カンバンボード", "📊 リストビュー"])
@@ -1126,51 +1071,80 @@ def show_tasks():
         show_fixed_kanban_board()
     
     with view_tabs[1]:
-        st.markdown("### 📊 タスクリスト")
+        show_task_list_view()
+
+@fragment
+def show_task_list_view():
+    """リストビュー表示"""
+    st.markdown("### 📊 タスクリスト")
+    
+    # テーブル形式でタスク一覧表示（ページ単位で描画）
+    total_tasks = len(get_shared_board())
+    if total_tasks:
+        total_pages = (total_tasks - 1) // TASK_LIST_PAGE_SIZE + 1
+        page_index = min(st.session_state.get('task_list_page', 0), total_pages - 1)
         
-        # テーブル形式でタスク一覧表示
-        if st.session_state.ai_tasks:
-            for task in st.session_state.ai_tasks:
-                col1, col2, col3, col4, col5, col6 = st.columns([3, 1, 1, 1, 1, 1])
-                
-                with col1:
-                    task_name = task['name']
-                    if task.get('created_from_message'):
-                        task_name += " 🤖"
-                    st.write(f"**{task_name}**")
-                    st.caption(f"📁 {task.get('project', '')}")
-                
-                with col2:
-                    priority_colors = {"高": "🔴", "中": "🟡", "低": "🟢"}
-                    st.write(f"{priority_colors.get(task['priority'], '📊')} {task['priority']}")
-                
-                with col3:
-                    status_colors = {
-                        "To Do": "⭕", "進行中": "🔄", 
-                        "レビュー中": "👀", "完了": "✅"
-                    }
-                    st.write(f"{status_colors.get(task['status'], '📋')} {task['status']}")
-                
-                with col4:
-                    st.write(f"⏰ {task.get('due_date', '')}")
-                
-                with col5:
-                    if task.get('subtasks'):
-                        completed = len([s for s in task['subtasks'] if s['completed']])
-                        total = len(task['subtasks'])
-                        st.write(f"📝 {completed}/{total}")
-                    else:
-                        st.write("➖")
-                
-                with col6:
-                    if st.button("📖", key=f"list_detail_{task['id']}", help="詳細表示"):
-                        st.session_state.selected_task_id = task['id']
-                        st.session_state.show_task_modal = True
-                        st.rerun()
-                
-                st.markdown("---")
-        else:
-            st.info("タスクがありません")
+        for task in get_shared_board().all(
+            offset=page_index * TASK_LIST_PAGE_SIZE,
+            limit=TASK_LIST_PAGE_SIZE
+        ):
+            col1, col2, col3, col4, col5, col6 = st.columns([3, 1, 1, 1, 1, 1])
+            
+            with col1:
+                task_name = task['name']
+                if task.get('created_from_message'):
+                    task_name += " 🤖"
+                st.write(f"**{task_name}**")
+                st.caption(f"📁 {task.get('project', '')}")
+            
+            with col2:
+                priority_colors = {"高": "🔴", "中": "🟡", "低": "🟢"}
+                st.write(f"{priority_colors.get(task['priority'], '📊')} {task['priority']}")
+            
+            with col3:
+                status_colors = {
+                    "To Do": "⭕", "進行中": "🔄", 
+                    "レビュー中": "👀", "完了": "✅"
+                }
+                st.write(f"{status_colors.get(task['status'], '📋')} {task['status']}")
+            
+            with col4:
+                st.write(f"⏰ {task.get('due_date', '')}")
+            
+            with col5:
+                if task.get('subtasks'):
+                    completed = len([s for s in task['subtasks'] if s['completed']])
+                    total = len(task['subtasks'])
+                    st.write(f"📝 {completed}/{total}")
+                else:
+                    st.write("➖")
+            
+            with col6:
+                if st.button("📖", key=f"list_detail_{task['id']}", help="詳細表示"):
+                    st.session_state.selected_task_id = task['id']
+                    st.session_state.show_task_modal = True
+                    st.rerun()
+            
+            st.markdown("---")
+        
+        # ページ送り
+        if total_pages > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            
+            with col1:
+                if st.button("⬅️ 前へ", key="task_list_prev", disabled=page_index == 0):
+                    st.session_state.task_list_page = page_index - 1
+                    rerun_fragment()
+            
+            with col2:
+                st.caption(f"{page_index + 1} / {total_pages} ページ（全{total_tasks}件）")
+            
+            with col3:
+                if st.button("次へ ➡️", key="task_list_next", disabled=page_index >= total_pages - 1):
+                    st.session_state.task_list_page = page_index + 1
+                    rerun_fragment()
+    else:
+        st.info("タスクがありません")
 
 def show_projects():
     """プロジェクト管理表示"""
@@ -1190,10 +1164,11 @@ def show_projects():
                 st.progress(project['progress'] / 100, text=f"進捗: {project['progress']}%")
                 
                 # プロジェクト関連統計
-                project_tasks = [t for t in st.session_state.ai_tasks if t.get('project') == project['name']]
-                completed_tasks = [t for t in project_tasks if t['status'] == '完了']
+                counters = get_shared_board().counters
+                project_total = counters.project(project['name'])
+                project_completed = counters.project(project['name'], '完了')
                 
-                st.caption(f"📋 タスク: {len(completed_tasks)}/{len(project_tasks)} 完了")
+                st.caption(f"📋 タスク: {project_completed}/{project_total} 完了")
             
             with col2:
                 st.markdown("#### ステータス")
@@ -1220,6 +1195,11 @@ def main():
     # セッション状態初期化
     initialize_session_state()
     
+    # Reactボード向けの同期サーバー（プロセスにつき1回起動）
+    if BOARD_SERVER_CONFIG["enabled"]:
+        from board_server import start_board_server
+        start_board_server(get_shared_board())
+    
     # サイドバー
     st.sidebar.title("🚀 BizFlow AI")
     st.sidebar.markdown("---")
@@ -1245,10 +1225,11 @@ def main():
     # 修正版統計表示
     st.sidebar.markdown("### 📋 修正版統計")
     
-    todo_count = len([t for t in st.session_state.ai_tasks if t['status'] == 'To Do'])
-    progress_count = len([t for t in st.session_state.ai_tasks if t['status'] == '進行中'])
-    review_count = len([t for t in st.session_state.ai_tasks if t['status'] == 'レビュー中'])
-    completed_count = len([t for t in st.session_state.ai_tasks if t['status'] == '完了'])
+    counters = get_shared_board().counters
+    todo_count = counters.status('To Do')
+    progress_count = counters.status('進行中')
+    review_count = counters.status('レビュー中')
+    completed_count = counters.status('完了')
     
     st.sidebar.write(f"📋 To Do: {todo_count}件")
     st.sidebar.write(f"🔄 進行中: {progress_count}件") 
@@ -1256,7 +1237,7 @@ def main():
     st.sidebar.write(f"✅ 完了: {completed_count}件")
     
     # 進捗表示
-    total_tasks = len(st.session_state.ai_tasks)
+    total_tasks = counters.total
     completion_rate = completed_count / total_tasks if total_tasks > 0 else 0
     
     st.sidebar.markdown("### 📈 修正版効率")
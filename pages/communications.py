@@ -4,6 +4,18 @@ BizFlow AI MVP - コミュニケーション管理ページ
 
 import streamlit as st
 from datetime import datetime, timedelta
+from functools import partial
+from utils.ai_jobs import message_payload, message_target, show_job, show_task_preview, submit_job
+from utils.ai_scheduler import AI_PROCESSING_INTERVALS, get_ai_scheduler
+from utils.connectors import MESSAGES_COLLECTION, get_connector_manager
+from utils.database import DESCENDING, get_database, get_user_data
+from utils.sample_data import SAMPLE_MESSAGES
+
+# メッセージ一覧に表示する件数
+MESSAGE_LIMIT = 100
+
+# 返信生成で選択できるAIモデル -> ルーターのプロバイダー名
+AI_MODEL_PROVIDERS = {"Gemini": 'gemini', "Claude": 'claude', "GPT-4": 'openai'}
 
 def show():
     """コミュニケーション管理ページの表示"""
@@ -48,11 +60,19 @@ def show_message_list():
             ["今日", "昨日", "今週", "先週", "全期間"]
         )
     
+    manager = get_connector_manager()
+    # 取り込んだメッセージのAI処理を開始
+    get_ai_scheduler()
+    
     # 一括操作ボタン
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("🔄 メッセージ更新"):
-            st.success("メッセージを更新しました")
+            if manager.available:
+                manager.sync_now()
+                st.success("新着メッセージの取得を開始しました（取り込み後に一覧へ反映されます）")
+            else:
+                st.info("連携済みのサービスがありません（.env に SLACK_TOKEN などを設定してください）")
     with col2:
         if st.button("📧 一括既読"):
             st.success("表示中のメッセージを既読にしました")
@@ -65,72 +85,18 @@ def show_message_list():
     
     st.markdown("---")
     
-    # サンプルメッセージデータ
-    sample_messages = [
-        {
-            "id": "msg_1",
-            "source": "Slack",
-            "sender": "田中さん (開発チーム)",
-            "subject": "プロジェクトXのAPI仕様について",
-            "preview": "お疲れ様です。API仕様の件でご相談があります。認証部分の実装方針について...",
-            "timestamp": "2025-07-17 14:30",
-            "status": "未読",
-            "importance": "高",
-            "thread_count": 3,
-            "channel": "#project-x"
-        },
-        {
-            "id": "msg_2",
-            "source": "Gmail",
-            "sender": "client@example.com",
-            "subject": "提案書についてのフィードバック",
-            "preview": "先日お送りいただいた提案書を拝見いたしました。いくつか質問がございまして...",
-            "timestamp": "2025-07-17 10:15",
-            "status": "重要",
-            "importance": "高",
-            "thread_count": 1,
-            "channel": "メール"
-        },
-        {
-            "id": "msg_3",
-            "source": "Teams",
-            "sender": "山田さん (営業部)",
-            "subject": "来週のクライアント打ち合わせ",
-            "preview": "来週火曜日のクライアント打ち合わせの件でご相談です。議題の追加をお願いしたく...",
-            "timestamp": "2025-07-17 09:45",
-            "status": "未読",
-            "importance": "中",
-            "thread_count": 2,
-            "channel": "営業チーム"
-        },
-        {
-            "id": "msg_4",
-            "source": "Chatwork",
-            "sender": "佐藤さん (デザイン)",
-            "subject": "UI/UXデザインのレビュー依頼",
-            "preview": "新機能のデザインが完成しました。お時間のある時にレビューをお願いします...",
-            "timestamp": "2025-07-16 16:20",
-            "status": "返信済み",
-            "importance": "中",
-            "thread_count": 5,
-            "channel": "デザインチーム"
-        },
-        {
-            "id": "msg_5",
-            "source": "Gmail",
-            "sender": "support@service.com",
-            "subject": "月次レポートの送付",
-            "preview": "いつもお世話になっております。6月分の月次レポートをお送りいたします...",
-            "timestamp": "2025-07-16 12:00",
-            "status": "アーカイブ",
-            "importance": "低",
-            "thread_count": 1,
-            "channel": "メール"
-        }
-    ]
+    # 取り込み済みのメッセージ（外部サービス未連携の場合はサンプル）
+    messages = get_user_data(
+        get_database(), MESSAGES_COLLECTION, None, order_by=('received_at', DESCENDING), limit=MESSAGE_LIMIT
+    )
+    if messages:
+        st.caption(f"📥 取り込み済みメッセージ: 新しい順に{len(messages)}件（保存待ち {manager.pending_pages}ページ）")
+    else:
+        messages = SAMPLE_MESSAGES
+        st.caption("外部サービスからのメッセージがまだ無いため、サンプルを表示しています")
     
     # メッセージ表示
-    for message in sample_messages:
+    for message in messages:
         # フィルタリング
         if source_filter != "全て" and message["source"] != source_filter:
             continue
@@ -170,7 +136,7 @@ def show_message_list():
             
             with col2:
                 if st.button("🤖 要約", key=f"summary_{message['id']}"):
-                    show_ai_summary(message)
+                    request_ai_summary(message)
             
             with col3:
                 if st.button("📋 タスク化", key=f"task_{message['id']}"):
@@ -183,6 +149,15 @@ def show_message_list():
                 else:
                     if st.button("未読", key=f"unread_{message['id']}"):
                         st.info("未読にしました")
+            
+            # 要約・タスク化の進行状況と結果（ページを移動しても処理は継続）
+            message_jobs = st.session_state.get('message_jobs', {})
+            if (message['id'], 'message_summary') in message_jobs:
+                show_job(message_jobs[(message['id'], 'message_summary')], show_ai_summary, "AI要約")
+            if (message['id'], 'task_generation') in message_jobs:
+                show_job(
+                    message_jobs[(message['id'], 'task_generation')], show_created_task, "タスク化", show_task_preview
+                )
 
 def show_ai_reply_generator():
     """AI返信生成"""
@@ -223,7 +198,7 @@ def show_ai_reply_generator():
     with col2:
         ai_model = st.selectbox(
             "使用するAIモデル",
-            ["Gemini", "Claude", "GPT-4"]
+            list(AI_MODEL_PROVIDERS)
         )
         
         include_context = st.checkbox("プロジェクト文脈を含める", value=True)
@@ -234,52 +209,85 @@ def show_ai_reply_generator():
         placeholder="例: 来週の会議日程を提案してください、技術的な詳細は避けてください など"
     )
     
-    # AI返信生成ボタン
+    # AI返信生成ボタン（生成はワーカーで実行し、返信案はメッセージのレコードにも保存）
     if st.button("🤖 AI返信を生成"):
-        with st.spinner(f"{ai_model}が返信を生成中..."):
-            import time
-            time.sleep(2)
-        
-        # 生成された返信案
-        reply_drafts = generate_reply_drafts(message, reply_tone, reply_intent, custom_instructions)
-        
-        st.markdown("### 📝 生成された返信案")
-        
-        for i, draft in enumerate(reply_drafts, 1):
-            with st.expander(f"返信案 {i}: {draft['style']}", expanded=i==1):
-                st.text_area(
-                    f"返信内容 {i}:",
-                    value=draft['content'],
-                    height=150,
-                    key=f"draft_{i}"
-                )
-                
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    if st.button(f"この返信を使用", key=f"use_draft_{i}"):
-                        st.success("返信内容をクリップボードにコピーしました！")
-                
-                with col2:
-                    if st.button(f"編集", key=f"edit_draft_{i}"):
-                        st.info("編集機能は開発中です")
-                
-                with col3:
-                    if st.button(f"送信", key=f"send_draft_{i}"):
-                        send_reply(message, draft['content'])
+        job = submit_job(
+            'reply_drafts',
+            {
+                'message': message_payload(message),
+                'tone': reply_tone,
+                'intent': reply_intent,
+                'provider': AI_MODEL_PROVIDERS[ai_model],
+                'context': custom_instructions or None
+            },
+            target=message_target(message)
+        )
+        st.session_state.setdefault('reply_jobs', {})[message['id']] = job['id']
+    
+    reply_job_id = st.session_state.get('reply_jobs', {}).get(message['id'])
+    if reply_job_id is not None:
+        show_job(reply_job_id, partial(show_reply_drafts, message), "返信案の作成", show_reply_preview)
+
+def show_reply_preview(job):
+    """生成途中の返信案を表示"""
+    for reply in job['progress'].get('replies', []):
+        st.markdown(f"**{reply.get('version', '生成中...')}**")
+        st.write(reply.get('content', ''))
+
+def show_reply_drafts(message, job):
+    """生成された返信案の表示"""
+    reply_drafts = [
+        {'style': reply.get('version', ''), 'content': reply.get('content', '')}
+        for reply in job['result']['replies']
+    ]
+    
+    st.markdown("### 📝 生成された返信案")
+    
+    for i, draft in enumerate(reply_drafts, 1):
+        with st.expander(f"返信案 {i}: {draft['style']}", expanded=i==1):
+            st.text_area(
+                f"返信内容 {i}:",
+                value=draft['content'],
+                height=150,
+                key=f"draft_{job['id']}_{i}"
+            )
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                if st.button(f"この返信を使用", key=f"use_draft_{i}"):
+                    st.success("返信内容をクリップボードにコピーしました！")
+            
+            with col2:
+                if st.button(f"編集", key=f"edit_draft_{i}"):
+                    st.info("編集機能は開発中です")
+            
+            with col3:
+                if st.button(f"送信", key=f"send_draft_{i}"):
+                    send_reply(message, draft['content'])
 
 def show_integration_settings():
     """外部サービス連携設定"""
     
     st.markdown("### ⚙️ 外部サービス連携設定")
     
-    # 各サービスの設定状況
+    # 各サービスの設定状況（Slack / Teams / Gmail は取り込みの同期状況）
+    manager = get_connector_manager()
     services = [
-        {"name": "Slack", "status": "接続済み", "icon": "💬", "last_sync": "2025-07-17 15:00"},
-        {"name": "Microsoft Teams", "status": "未接続", "icon": "👥", "last_sync": "-"},
-        {"name": "Gmail", "status": "接続済み", "icon": "📧", "last_sync": "2025-07-17 14:45"},
+        {"name": "Slack", "key": "slack", "icon": "💬"},
+        {"name": "Microsoft Teams", "key": "teams", "icon": "👥"},
+        {"name": "Gmail", "key": "gmail", "icon": "📧"},
         {"name": "Chatwork", "status": "接続済み", "icon": "💼", "last_sync": "2025-07-17 14:30"}
     ]
+    for service in services:
+        if "key" not in service:
+            continue
+        sync_status = manager.status.get(service["key"])
+        service["status"] = "接続済み" if sync_status else "未接続"
+        service["sync_status"] = sync_status
+        service["last_sync"] = (
+            sync_status.last_sync.strftime("%Y-%m-%d %H:%M") if sync_status and sync_status.last_sync else "-"
+        )
     
     for service in services:
         with st.expander(f"{service['icon']} {service['name']} - {service['status']}"):
@@ -288,6 +296,11 @@ def show_integration_settings():
             with col1:
                 st.write(f"**ステータス:** {service['status']}")
                 st.write(f"**最終同期:** {service['last_sync']}")
+                sync_status = service.get("sync_status")
+                if sync_status:
+                    st.write(f"**取り込み:** {sync_status.state}（取得 {sync_status.fetched}件 / 新規保存 {sync_status.saved}件）")
+                    if sync_status.last_error:
+                        st.caption(f"⚠️ {sync_status.last_error[:200]}")
             
             with col2:
                 if service['status'] == "接続済み":
@@ -304,12 +317,16 @@ def show_integration_settings():
     # AI設定
     st.markdown("### 🤖 AI分析設定")
     
+    scheduler = get_ai_scheduler()
+    settings = scheduler.settings
+    timings = list(AI_PROCESSING_INTERVALS)
+    
     col1, col2 = st.columns(2)
     
     with col1:
-        auto_importance = st.checkbox("重要度の自動判定", value=True)
-        auto_summary = st.checkbox("長文メッセージの自動要約", value=True)
-        auto_task_extract = st.checkbox("タスクの自動抽出", value=False)
+        auto_importance = st.checkbox("重要度の自動判定", value=settings['auto_importance'])
+        auto_summary = st.checkbox("長文メッセージの自動要約", value=settings['auto_summary'])
+        auto_task_extract = st.checkbox("タスクの自動抽出", value=settings['auto_task_extract'])
     
     with col2:
         notification_threshold = st.selectbox(
@@ -319,96 +336,69 @@ def show_integration_settings():
         
         batch_processing = st.selectbox(
             "AI処理のタイミング",
-            ["リアルタイム", "5分毎", "15分毎", "1時間毎"]
+            timings,
+            index=timings.index(settings['timing']) if settings['timing'] in timings else 2,
+            help="取り込んだメッセージを間隔ごとにまとめてAIで処理します（リアルタイムは重要度「高」のみ即時）"
         )
     
+    stats = scheduler.stats()
+    st.caption(
+        f"⏱️ AI処理: 待機中 {stats['pending']}件 / 処理済み {stats['processed']}件 / "
+        f"AIリクエスト {stats['llm_calls']}回（1回あたり {stats['messages_per_call']:.1f}件）"
+        + ("" if scheduler.generate else " ・AI未設定のため処理は行われません")
+    )
+    if stats['last_error']:
+        st.caption(f"⚠️ 直近のAI処理エラー: {stats['last_error'][:200]}")
+    
     if st.button("設定を保存"):
+        scheduler.configure(
+            timing=batch_processing,
+            auto_importance=auto_importance,
+            auto_summary=auto_summary,
+            auto_task_extract=auto_task_extract
+        )
         st.success("設定を保存しました！")
 
-def generate_reply_drafts(message, tone, intent, custom_instructions):
-    """返信案を生成（サンプル実装）"""
-    
-    # サンプルの返信案
-    drafts = [
-        {
-            "style": "丁寧・詳細版",
-            "content": f"""お疲れ様です。
-
-{message['subject']}の件について、ご連絡いただきありがとうございます。
-
-内容を確認いたしました。こちらの件については、以下のように対応させていただきます：
-
-1. 詳細な検討を行い、来週までに回答いたします
-2. 必要に応じてチームメンバーと相談いたします
-3. 追加で確認が必要な点があれば、改めてご連絡いたします
-
-何かご不明な点がございましたら、お気軽にお声かけください。
-
-よろしくお願いいたします。"""
-        },
-        {
-            "style": "簡潔・ビジネス版",
-            "content": f"""お疲れ様です。
-
-{message['subject']}の件、承知いたしました。
-
-来週までに詳細を検討し、回答いたします。
-追加で確認事項があれば改めて連絡いたします。
+def request_ai_summary(message):
+    """AIによるメッセージ要約を依頼"""
+    job = submit_job('message_summary', {'message': message_payload(message)}, target=message_target(message))
+    st.session_state.setdefault('message_jobs', {})[(message['id'], 'message_summary')] = job['id']
 
-よろしくお願いいたします。"""
-        },
-        {
-            "style": "親しみやすい版",
-            "content": f"""お疲れ様です！
-
-{message['subject']}の件、確認しました。
+def show_ai_summary(job):
+    """AIによるメッセージ要約の表示"""
+    summary = job['result']['summary']
+    summary_result = f"""
+**📋 メッセージ要約:**
+{summary.get('要約', '')}
 
-いくつか検討したい点があるので、来週中には返事させてください。
-何か急ぎの件があれば、いつでも声をかけてくださいね。
+**🎯 求められていること:**
+{summary.get('求められていること', '')}
 
-ありがとうございます！"""
-        }
-    ]
-    
-    return drafts
+**⏰ 対応期限:**
+{summary.get('対応期限', '')}
 
-def show_ai_summary(message):
-    """AIによるメッセージ要約"""
-    
-    with st.spinner("AIがメッセージを要約中..."):
-        import time
-        time.sleep(1)
-    
-    summary_result = f"""
-    **📋 メッセージ要約:**
-    {message['sender']}から{message['subject']}について連絡。
-    
-    **🎯 求められていること:**
-    - 技術仕様の確認と回答
-    - 来週までの対応
-    
-    **⏰ 対応期限:**
-    来週金曜日まで
-    
-    **💡 推奨アクション:**
-    1. チームメンバーと技術的な点を相談
-    2. 詳細な回答を準備
-    3. 期限までに返信
-    """
+**💡 推奨アクション:**
+{summary.get('推奨アクション', '')}
+"""
     
     st.success(summary_result)
 
 def create_task_from_message(message):
-    """メッセージからタスクを作成"""
-    
+    """メッセージからタスクを作成（AIが生成し、完了後にタスク管理ページのボードへ追加）"""
+    job = submit_job(
+        'task_generation', {'message': message_payload(message), 'user': st.session_state.get('username', 'admin')},
+        target=message_target(message)
+    )
+    st.session_state.setdefault('message_jobs', {})[(message['id'], 'task_generation')] = job['id']
+
+def show_created_task(job):
+    """タスク化の結果を表示"""
     st.success(f"""
     📋 **新規タスクを作成しました:**
     
-    **タスク名:** {message['subject']}への対応
-    **担当事業:** 自動判定中...
-    **期限:** 来週金曜日
-    **優先度:** {message['importance']}
-    **メモ:** {message['sender']}からの{message['source']}メッセージに対応
+    **タスク名:** {job['result']['task_name']}
+    **期限:** {job['result']['task_data'].get('期限', '')}
+    **優先度:** {job['result']['task_data'].get('優先度', '')}
     
     タスク管理ページで詳細を確認できます。
     """)
@@ -3,10 +3,36 @@ BizFlow AI MVP - ダッシュボードページ
 """
 
 import streamlit as st
-from utils.database import get_user_data
+from utils.event_log import get_task_event_log
+from utils.query_cache import get_query_cache
+from utils.shared_board import get_shared_board
 from datetime import datetime, timedelta
 import pandas as pd
 
+def is_due_today(task, today):
+    """期限が今日のタスクか（「今日 18:00」のような表記と日付の表記の両方に対応）"""
+    due_date = str(task.get('due_date') or '')
+    return due_date.startswith('今日') or due_date.startswith(today.strftime('%Y-%m-%d'))
+
+def format_activity(event):
+    """イベントログの1件をアクティビティの表示文に変換"""
+    name = event['detail'].get('name', '')
+    detail = event['detail']
+    if event['type'] == 'task_created':
+        return f"📝 タスク「{name}」を作成"
+    if event['type'] == 'status_changed':
+        return f"{'✅' if detail.get('to') == '完了' else '🔄'} 「{name}」を{detail.get('from')}から{detail.get('to')}へ移動"
+    if event['type'] == 'subtask_toggled':
+        action = "完了" if detail.get('completed') else "未完了に変更"
+        return f"☑️ 「{name}」のサブタスク「{detail.get('subtask')}」を{action}"
+    if event['type'] == 'subtask_added':
+        return f"➕ 「{name}」にサブタスク「{detail.get('subtask')}」を追加"
+    if event['type'] == 'comment_added':
+        return f"💬 「{name}」にコメント: {detail.get('text', '')}"
+    if event['type'] == 'task_deleted':
+        return f"🗑️ タスク「{name}」を削除"
+    return f"✏️ 「{name}」を更新"
+
 def show():
     """ダッシュボードページの表示"""
     
@@ -17,15 +43,20 @@ def show():
     db = st.session_state.db
     user_id = st.session_state.get('username', 'admin')
     
+    # 共有タスクボードから今日が期限のタスクを取得
+    today = datetime.now()
+    today_tasks = [task for task in get_shared_board().all() if is_due_today(task, today)]
+    today_completed = len([t for t in today_tasks if t.get('status') == '完了'])
+    
     # 3列のレイアウト
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
             <h3>📋 今日のタスク</h3>
-            <h2 style="color: #1f77b4;">5件</h2>
-            <p>完了: 2件 | 残り: 3件</p>
+            <h2 style="color: #1f77b4;">{len(today_tasks)}件</h2>
+            <p>完了: {today_completed}件 | 残り: {len(today_tasks) - today_completed}件</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -47,6 +78,12 @@ def show():
         </div>
         """, unsafe_allow_html=True)
     
+    cache_stats = get_query_cache().stats()
+    st.caption(
+        f"🗄️ データ取得キャッシュ: ヒット率 {cache_stats['hit_rate']:.0%}"
+        f"（ヒット {cache_stats['hits']}件 / ミス {cache_stats['misses']}件 / 保存 {cache_stats['entries']}件）"
+    )
+    
     st.markdown("---")
     
     # AI提案セクション
@@ -125,15 +162,15 @@ def show():
     # 最近のアクティビティ
     st.markdown("### 📈 最近のアクティビティ")
     
-    activities = [
-        "✅ プロジェクトBの企画書を完成",
-        "💬 Slackで新規案件の相談を受信",
-        "📝 タスク「競合分析」を作成",
-        "🤖 AIによる優先度提案を実行"
-    ]
+    # タスクのイベントログから新しい順に取得
+    events = get_task_event_log().recent(limit=10)
+    if not events:
+        st.caption("まだアクティビティはありません")
     
-    for activity in activities:
-        st.markdown(f"- {activity}")
+    for event in events:
+        timestamp = datetime.fromtimestamp(event['at']).strftime('%m/%d %H:%M')
+        user = f"{event['user']} · " if event.get('user') else ""
+        st.markdown(f"- {format_activity(event)}（{user}{timestamp}）")
     
     # クイックアクションボタン
     st.markdown("---")
@@ -5,6 +5,11 @@ BizFlow AI MVP - プロジェクト管理ページ
 import streamlit as st
 from datetime import datetime, date
 import uuid
+from functools import partial
+from utils.ai_jobs import show_job, submit_job
+
+# AI分析結果を保存するコレクション
+PROJECTS_COLLECTION = 'projects'
 
 def show():
     """プロジェクト管理ページの表示"""
@@ -142,11 +147,20 @@ def show_project_list():
             
             with col3:
                 if st.button("🤖 進捗分析", key=f"ai_proj_{project['id']}"):
-                    show_ai_project_analysis(project)
+                    # 分析はワーカーで実行し、結果はプロジェクトのレコードにも保存
+                    job = submit_job(
+                        'project_analysis', {'project': project},
+                        target={'collection': PROJECTS_COLLECTION, 'doc_id': project['id']}
+                    )
+                    st.session_state.setdefault('project_analysis_jobs', {})[project['id']] = job['id']
             
             with col4:
                 if st.button("レポート", key=f"report_proj_{project['id']}"):
                     show_project_report(project)
+            
+            analysis_job_id = st.session_state.get('project_analysis_jobs', {}).get(project['id'])
+            if analysis_job_id is not None:
+                show_job(analysis_job_id, partial(show_ai_project_analysis, project), "AI進捗分析")
 
 def show_new_project_form():
     """新規プロジェクト作成フォーム"""
@@ -203,33 +217,26 @@ def show_project_tasks(project):
             f"⏸️ 保留: 1件\n\n"
             f"最新タスク: API仕様書作成 (進行中)")
 
-def show_ai_project_analysis(project):
-    """AIによるプロジェクト分析"""
-    
-    with st.spinner("AIがプロジェクトを分析中..."):
-        import time
-        time.sleep(2)
+def show_ai_project_analysis(project, job):
+    """AIによるプロジェクト分析結果の表示"""
     
     st.success(f"**{project['name']} AIプロジェクト分析結果:**")
     
+    analysis = job['result']['analysis']
     analysis_result = f"""
-    📊 **進捗状況:** 順調 ({project['progress']}%完了)
-    
-    🎯 **次のマイルストーン:**
-    - API設計完了 (予定: 来週)
-    - フロントエンド実装開始 (予定: 2週間後)
-    
-    ⚠️ **リスク要因:**
-    - チームメンバーの作業負荷が高い
-    - 外部API連携の技術的課題
-    
-    💡 **推奨アクション:**
-    1. チームミーティングでタスク分散を検討
-    2. 技術的課題の早期解決のための専門家相談
-    3. バッファ期間の確保
-    
-    📈 **成功確率:** 85%
-    """
+📊 **進捗状況:** {analysis.get('進捗状況', '')}
+
+🎯 **次のマイルストーン:**
+{analysis.get('次のマイルストーン', '')}
+
+⚠️ **リスク要因:**
+{analysis.get('リスク要因', '')}
+
+💡 **推奨アクション:**
+{analysis.get('推奨アクション', '')}
+
+📈 **成功確率:** {analysis.get('成功確率', '')}
+"""
     
     st.markdown(analysis_result)
 
@@ -0,0 +1,87 @@
+"""
+BizFlow AI MVP - AI一括処理
+AIリクエストのレート制限とリトライを行います（並列実行は utils/job_queue.py のワーカーで行います）
+"""
+
+import random
+import threading
+import time
+
+import streamlit as st
+from config.config import AI_MODELS
+
+# リトライ対象とみなす例外名（SDKごとに例外クラスが異なるため名前で判定）
+RETRYABLE_ERRORS = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable',
+    'DeadlineExceeded', 'InternalServerError', 'TimeoutError', 'ConnectionError', 'Timeout'
+}
+
+# リトライ対象とみなすHTTPステータス（requests の HTTPError 用）
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable_error(error):
+    """一時的なエラー（レート超過・タイムアウト等）かどうか
+
+    retryable 属性を持つ例外（全プロバイダーの失敗をまとめた例外など）はその値に従います。
+    """
+    retryable = getattr(error, 'retryable', None)
+    if isinstance(retryable, bool):
+        return retryable
+    if getattr(getattr(error, 'response', None), 'status_code', None) in RETRYABLE_STATUS_CODES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+class RateLimiter:
+    """トークンバケット方式のレート制限（スレッドセーフ）"""
+
+    def __init__(self, requests_per_minute):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンが取得できるまで待機"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@st.cache_resource
+def get_rate_limiter(model_name, requests_per_minute=60):
+    """名前ごとに全セッション共通のレート制限を取得"""
+    return RateLimiter(requests_per_minute)
+
+
+def get_provider_rate_limiter(provider=None):
+    """プロバイダー（APIキー）のレート制限を取得（AIジョブ・AI処理スケジューラーで同じ枠を共有）"""
+    provider = provider or AI_MODELS["primary"]
+    return get_rate_limiter(provider, AI_MODELS["models"][provider].get("requests_per_minute", 60))
+
+
+def call_with_retry(func, *args, retries=3, base_delay=1.0, max_delay=16.0,
+                    retry_on=is_retryable_error, rate_limiter=None):
+    """指数バックオフ（ジッター付き）でリトライしながら関数を呼び出す"""
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return func(*args)
+        except Exception as e:
+            if attempt >= retries or not retry_on(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
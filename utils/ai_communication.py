@@ -2,79 +2,183 @@
 BizFlow AI MVP - AI コミュニケーション支援
 """
 
+import re
+from functools import lru_cache
+
 import streamlit as st
-import google.generativeai as genai
-from config.config import AI_MODELS
+from config.config import AI_MODELS, MESSAGE_PRIORITY_RULES
+from utils.ai_stream import ReplyStreamParser, stream_text
+from utils.llm_cache import get_llm_cache, make_cache_key
+from utils.llm_client import get_llm_registry
+from utils.model_router import get_model_router
 import json
 from datetime import datetime
 
+class PriorityMatcher:
+    """重要度判定キーワードを正規表現1つにまとめた照合器（判定結果はメモ化）"""
+    
+    def __init__(self, urgent_keywords, high_priority_senders, today_keywords):
+        self._urgent = self._compile(urgent_keywords)
+        self._sender = self._compile(high_priority_senders, re.IGNORECASE)
+        self._today = self._compile(today_keywords, re.IGNORECASE)
+        self.score = lru_cache(maxsize=4096)(self._score)
+    
+    @classmethod
+    def from_rules(cls, rules):
+        return cls(rules['urgent_keywords'], rules['high_priority_senders'], rules['today_keywords'])
+    
+    @staticmethod
+    def _compile(keywords, flags=0):
+        if not keywords:
+            return None
+        # 長いキーワードを優先して照合
+        alternatives = sorted((re.escape(keyword) for keyword in keywords), key=len, reverse=True)
+        return re.compile("|".join(alternatives), flags)
+    
+    def _score(self, subject, preview, sender):
+        """重要度スコア（1:低 / 2:中 / 3:高）"""
+        if self._urgent and (self._urgent.search(subject) or self._urgent.search(preview)):
+            return 3
+        if self._today and self._today.search(preview):
+            return 3
+        if self._sender and self._sender.search(sender):
+            return 2
+        return 1
+    
+    def score_message(self, message):
+        return self.score(message.get('subject', ''), message.get('preview', ''), message.get('sender', ''))
+
+
+# 設定ファイルのルールから1度だけ構築
+DEFAULT_PRIORITY_MATCHER = PriorityMatcher.from_rules(MESSAGE_PRIORITY_RULES)
+
 class AICommunicationHelper:
-    def __init__(self):
+    # 返信プロンプトの版（プロンプトを変更したら更新し、古いキャッシュを無効化）
+    REPLY_PROMPT_VERSION = "2"
+    REPLY_MODEL_NAME = 'gemini-1.5-flash'
+    
+    PRIORITY_LABELS = {1: '低', 2: '中', 3: '高'}
+    
+    def __init__(self, priority_rules=None):
+        self.priority_matcher = (
+            PriorityMatcher.from_rules(priority_rules) if priority_rules else DEFAULT_PRIORITY_MATCHER
+        )
         self.setup_ai()
     
     def setup_ai(self):
         """AI APIの設定"""
         try:
-            # Gemini API設定
-            if AI_MODELS["models"]["gemini"]["api_key"] and AI_MODELS["models"]["gemini"]["api_key"] != "test-gemini-api-key-12345":
-                genai.configure(api_key=AI_MODELS["models"]["gemini"]["api_key"])
-                self.ai_available = True
-            else:
-                self.ai_available = False
+            # Gemini API設定（プロセス内で1回のみ）。Gemini以外のプロバイダーのみでも利用可能
+            gemini_available = get_llm_registry().configure_gemini(AI_MODELS["models"]["gemini"]["api_key"])
+            self.ai_available = gemini_available or get_model_router().available
         except Exception as e:
             self.ai_available = False
             st.error(f"AI設定エラー: {str(e)}")
     
     def analyze_message_priority(self, message):
         """メッセージの重要度を分析"""
+        return self.PRIORITY_LABELS[self.priority_matcher.score_message(message)]
+    
+    def analyze_many(self, messages):
+        """複数メッセージの重要度をまとめて分析"""
+        score = self.priority_matcher.score_message
+        return [self.PRIORITY_LABELS[score(message)] for message in messages]
+    
+    def generate_reply_suggestions(self, message, reply_tone='丁寧・フォーマル', context=None):
+        """AI返信案生成"""
+        try:
+            return self.request_reply_suggestions(message, reply_tone, context)
+        except Exception as e:
+            st.warning(f"AI生成中にエラーが発生しました: {str(e)}")
+            return self._generate_template_replies(message, reply_tone)
+    
+    def request_reply_suggestions(
+        self, message, reply_tone='丁寧・フォーマル', context=None, use_ai=True,
+        intent=None, provider=None, rate_limiter=None
+    ):
+        """AI返信案生成（AIのエラーはそのまま送出し、呼び出し元で再試行できるようにする）
         
-        # 緊急度判定キーワード
-        urgent_keywords = ['緊急', '至急', '今日中', 'ASAP', '急ぎ', '重要', '締切']
-        high_priority_senders = ['クライアント', '顧客', 'CEO', '重要']
+        provider を指定するとそのプロバイダーを優先します。rate_limiter はキャッシュに無く
+        AIへリクエストする場合のみ取得します。
+        """
         
-        importance_score = 1  # デフォルト：低
+        if not (use_ai and self.ai_available):
+            return self._generate_template_replies(message, reply_tone)
         
-        # キーワードチェック
-        for keyword in urgent_keywords:
-            if keyword in message.get('subject', '') or keyword in message.get('preview', ''):
-                importance_score = max(importance_score, 3)  # 高
+        # 同じメッセージ・トーン・意図の返信案はキャッシュから返す（プロンプト作成も省略）
+        cache = get_llm_cache()
+        cache_key = self._reply_cache_key(message, reply_tone, context, intent, provider)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        # 送信者チェック
-        sender = message.get('sender', '').lower()
-        for priority_sender in high_priority_senders:
-            if priority_sender.lower() in sender:
-                importance_score = max(importance_score, 2)  # 中
+        # Gemini用プロンプト作成
+        prompt = self._create_reply_prompt(message, reply_tone, context, intent)
         
-        # 時間的要素
-        if 'today' in message.get('preview', '').lower() or '今日' in message.get('preview', ''):
-            importance_score = max(importance_score, 3)
+        # AI API呼び出し（最も応答の速い正常なプロバイダーへ振り分け）
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response_text = get_model_router().generate(prompt, prefer=provider)
         
-        priority_labels = {1: '低', 2: '中', 3: '高'}
-        return priority_labels.get(importance_score, '低')
+        # 返信案をパース
+        replies = self._parse_ai_response(response_text)
+        if replies:
+            cache.set(cache_key, replies)
+        return replies
     
-    def generate_reply_suggestions(self, message, reply_tone='丁寧・フォーマル', context=None):
-        """AI返信案生成"""
+    def request_reply_stream(
+        self, message, reply_tone='丁寧・フォーマル', context=None, intent=None, provider=None, rate_limiter=None
+    ):
+        """AI返信案をストリーミング生成（生成途中の返信案リストを逐次返すジェネレーター）
         
-        if not self.ai_available:
-            return self._generate_template_replies(message, reply_tone)
+        最後に返すリストが確定した返信案です。AIのエラーはそのまま送出します。
+        Geminiが未設定の場合や Gemini 以外のプロバイダーを指定した場合は、ルーター経由で
+        一括生成した結果のみを返します。
+        """
         
-        try:
-            # Gemini用プロンプト作成
-            prompt = self._create_reply_prompt(message, reply_tone, context)
-            
-            # Gemini API呼び出し（実際のAPIキーが設定されている場合）
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            
-            # 返信案をパース
-            replies = self._parse_ai_response(response.text)
-            return replies
-            
-        except Exception as e:
-            st.warning(f"AI生成中にエラーが発生しました: {str(e)}")
-            return self._generate_template_replies(message, reply_tone)
+        if not self.ai_available or not get_llm_registry().gemini_configured or provider not in (None, 'gemini'):
+            yield self.request_reply_suggestions(
+                message, reply_tone, context, intent=intent, provider=provider, rate_limiter=rate_limiter
+            )
+            return
+        
+        cache = get_llm_cache()
+        cache_key = self._reply_cache_key(message, reply_tone, context, intent, provider)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        parser = ReplyStreamParser()
+        replies = []
+        prompt = self._create_reply_prompt(message, reply_tone, context, intent)
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        model = get_llm_registry().gemini_model(self.REPLY_MODEL_NAME)
+        for chunk in stream_text(model, prompt):
+            replies = parser.feed(chunk)
+            yield replies
+        
+        # 逐次パースで取り出せなかった場合は全文をJSONとして解釈
+        replies = replies or self._parse_ai_response(parser.text)
+        if replies:
+            cache.set(cache_key, replies)
+        yield replies
     
-    def _create_reply_prompt(self, message, tone, context):
+    def _reply_cache_key(self, message, tone, context, intent=None, provider=None):
+        """返信案のキャッシュキー"""
+        return make_cache_key(self.REPLY_MODEL_NAME, self.REPLY_PROMPT_VERSION, {
+            'sender': message.get('sender'),
+            'subject': message.get('subject'),
+            'preview': message.get('preview'),
+            'source': message.get('source'),
+            'tone': tone,
+            'context': context,
+            'intent': intent,
+            'provider': provider
+        })
+    
+    def _create_reply_prompt(self, message, tone, context, intent=None):
         """AI用プロンプト作成"""
         
         tone_instructions = {
@@ -83,6 +187,12 @@ class AICommunicationHelper:
             '簡潔・ビジネスライク': '要点を簡潔にまとめた効率的な返信'
         }
         
+        extra_requirements = ""
+        if intent:
+            extra_requirements += f"\n- 返信の意図: {intent}"
+        if context:
+            extra_requirements += f"\n- 追加の指示: {context}"
+        
         prompt = f"""
 あなたは優秀なビジネスアシスタントです。以下のメッセージに対する返信を作成してください。
 
@@ -96,7 +206,7 @@ class AICommunicationHelper:
 - トーン: {tone_instructions.get(tone, '丁寧・フォーマル')}
 - 3つの異なるバリエーションを作成
 - 各返信は100-200文字程度
-- 相手の質問やリクエストに適切に応答
+- 相手の質問やリクエストに適切に応答{extra_requirements}
 
 ## 出力形式
 以下のJSON形式で出力してください：
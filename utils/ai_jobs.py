@@ -0,0 +1,599 @@
+"""
+BizFlow AI MVP - AIジョブ
+タスク生成・メッセージ要約・プロジェクト分析・返信案作成をジョブキューのワーカーで実行し、
+結果を対象のタスク・メッセージ・プロジェクトのレコードへ反映します
+
+    task_generation   メッセージからタスクを生成し、共有ボードに追加
+    message_summary   メッセージを要約し、メッセージの ai_summary に保存
+    project_analysis  プロジェクトを分析し、プロジェクトの ai_analysis に保存
+    reply_drafts      返信案を作成し、メッセージの reply_drafts に保存
+
+画面ではジョブを登録して show_job で状態を表示するだけで、AIの応答を待ちません。
+"""
+
+import time
+from datetime import datetime
+
+import streamlit as st
+from config.config import AI_MODELS, JOB_QUEUE_CONFIG
+from utils.ai_batch import get_provider_rate_limiter
+from utils.ai_communication import AICommunicationHelper
+from utils.ai_stream import SectionStreamParser, stream_text
+from utils.connectors import MESSAGES_COLLECTION
+from utils.database import get_database
+from utils.job_queue import PRIORITY_HIGH, PRIORITY_NORMAL, JobWorkerPool, get_job_queue
+from utils.llm_cache import get_llm_cache, make_cache_key
+from utils.llm_client import get_llm_registry
+from utils.model_router import get_model_router
+from utils.query_cache import get_query_cache
+from utils.shared_board import get_shared_board
+
+# タスク生成プロンプトの版（プロンプトを変更したら更新し、古いキャッシュを無効化）
+TASK_PROMPT_VERSION = "1"
+TASK_MODEL_NAME = "gemini-1.5-flash"
+
+JOB_STATUS_LABELS = {
+    'queued': '⏳ 待機中',
+    'running': '🤖 処理中',
+    'succeeded': '✅ 完了',
+    'failed': '⚠️ 失敗',
+    'apply_failed': '⚠️ 反映失敗',
+    'cancelled': '取り消し'
+}
+
+
+def task_cache_key(message_info, summary_data=None):
+    """AIタスク生成結果のキャッシュキー"""
+    return make_cache_key(TASK_MODEL_NAME, TASK_PROMPT_VERSION, {
+        'sender': message_info.get('sender'),
+        'subject': message_info.get('subject'),
+        'time': message_info.get('time'),
+        'summary': summary_data
+    })
+
+def build_task_prompt(message_info, summary_data=None):
+    """AIタスク生成用プロンプト作成"""
+    # 要約データがある場合は活用
+    context = ""
+    if summary_data:
+        context = f"""
+        要約: {summary_data.get('要約', '')}
+        分類: {summary_data.get('分類', '')}
+        アクション: {summary_data.get('アクション', '')}
+        緊急度: {summary_data.get('緊急度', '')}
+        """
+
+    return f"""
+あなたは優秀なタスク管理アシスタントです。以下のメッセージから最適なタスクを生成してください。
+
+## メッセージ情報
+送信者: {message_info['sender']}
+件名: {message_info['subject']}
+時刻: {message_info['time']}
+{context}
+
+## タスク生成要件
+以下の形式で出力してください：
+
+**タスク名:**
+[簡潔で分かりやすいタスク名]
+
+**詳細説明:**
+[タスクの具体的な内容と要求事項]
+
+**期限:**
+[具体的な期限日時、不明な場合は「明日 17:00」]
+
+**優先度:**
+[高/中/低]
+
+**カテゴリ:**
+[コミュニケーション/プロジェクト作業/会議/レビュー/調査]
+
+**推定時間:**
+[タスク完了までの推定時間]
+
+**サブタスク:**
+[実行すべきステップを3つまで、改行区切り]
+
+**完了条件:**
+[タスクが完了したと判断する条件]
+    """
+
+def template_task_response(message_info):
+    """テンプレートタスク生成（AI利用不可時）"""
+    return f"""
+**タスク名:**
+{message_info['subject']}への対応
+
+**詳細説明:**
+{message_info['sender']}さんからの{message_info['subject']}に関して適切に対応する
+
+**期限:**
+明日 17:00
+
+**優先度:**
+中
+
+**カテゴリ:**
+コミュニケーション
+
+**推定時間:**
+30分
+
+**サブタスク:**
+メッセージ内容の確認
+必要な資料の準備
+返信または対応の実行
+
+**完了条件:**
+適切な返信を送信し、相手からの確認を得る
+    """
+
+def parse_ai_response(response_text):
+    """AI応答をパース"""
+    sections = response_text.split("**")
+    parsed_data = {}
+
+    for i in range(1, len(sections), 2):
+        if i + 1 < len(sections):
+            key = sections[i].strip().replace(':', '')
+            value = sections[i + 1].strip()
+            parsed_data[key] = value
+
+    return parsed_data
+
+def build_message_task(message_info, task_data):
+    """生成結果からボードに追加するタスクを作成"""
+    # サブタスクの処理
+    subtasks = [
+        {'id': i, 'name': line.strip(), 'completed': False}
+        for i, line in enumerate(
+            (line for line in task_data.get('サブタスク', '').split('\n') if line.strip()), start=1
+        )
+    ]
+
+    return {
+        'name': task_data.get('タスク名', f"{message_info['subject']}への対応"),
+        'description': task_data.get('詳細説明', ''),
+        'status': 'To Do',
+        'priority': task_data.get('優先度', '中'),
+        'project': task_data.get('カテゴリ', 'コミュニケーション'),
+        'assignee': '自分',
+        'due_date': task_data.get('期限', '明日 17:00'),
+        'estimated_time': task_data.get('推定時間', '30分'),
+        'created_from_message': True,
+        'source_message': message_info,
+        'subtasks': subtasks,
+        'comments': [],
+        'tags': ['AI生成', 'コミュニケーション'],
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        'completion_criteria': task_data.get('完了条件', '')
+    }
+
+def build_summary_prompt(message):
+    """メッセージ要約用プロンプト作成"""
+    return f"""
+あなたは優秀なビジネスアシスタントです。以下のメッセージを要約してください。
+
+## メッセージ情報
+送信者: {message.get('sender', '')}
+件名: {message.get('subject', '')}
+内容: {message.get('body') or message.get('preview', '')}
+
+## 出力形式
+**要約:**
+[1〜2文の要約]
+
+**求められていること:**
+[箇条書き]
+
+**対応期限:**
+[期限、不明な場合は「未定」]
+
+**推奨アクション:**
+[番号付きで3つまで]
+    """
+
+def template_summary_response(message):
+    """テンプレート要約（AI利用不可時）"""
+    return f"""
+**要約:**
+{message.get('sender', '')}から{message.get('subject', '')}について連絡。
+
+**求められていること:**
+- 技術仕様の確認と回答
+- 来週までの対応
+
+**対応期限:**
+来週金曜日まで
+
+**推奨アクション:**
+1. チームメンバーと技術的な点を相談
+2. 詳細な回答を準備
+3. 期限までに返信
+    """
+
+def build_project_analysis_prompt(project):
+    """プロジェクト分析用プロンプト作成"""
+    return f"""
+あなたは経験豊富なプロジェクトマネージャーです。以下のプロジェクトを分析してください。
+
+## プロジェクト情報
+名前: {project.get('name', '')}
+概要: {project.get('description', '')}
+目標: {project.get('goal', '')}
+フェーズ: {project.get('phase', '')}
+期間: {project.get('start_date', '')} ～ {project.get('end_date', '')}
+進捗: {project.get('progress', 0)}%
+チーム: {', '.join(project.get('team_members', []))}
+
+## 出力形式
+**進捗状況:**
+[順調/注意/遅延 と進捗の評価]
+
+**次のマイルストーン:**
+[箇条書き]
+
+**リスク要因:**
+[箇条書き]
+
+**推奨アクション:**
+[番号付きで3つまで]
+
+**成功確率:**
+[0〜100%]
+    """
+
+def template_project_analysis(project):
+    """テンプレートのプロジェクト分析（AI利用不可時）"""
+    return f"""
+**進捗状況:**
+順調 ({project.get('progress', 0)}%完了)
+
+**次のマイルストーン:**
+- API設計完了 (予定: 来週)
+- フロントエンド実装開始 (予定: 2週間後)
+
+**リスク要因:**
+- チームメンバーの作業負荷が高い
+- 外部API連携の技術的課題
+
+**推奨アクション:**
+1. チームミーティングでタスク分散を検討
+2. 技術的課題の早期解決のための専門家相談
+3. バッファ期間の確保
+
+**成功確率:**
+85%
+    """
+
+
+class AIJob:
+    """AIジョブの基底クラス
+
+    run はワーカー（別プロセスの場合もある）で実行し、結果はJSONで返します。
+    ストリーミングできる場合は生成途中の結果を progress で報告し、画面に逐次表示します。
+    AIへのリクエストが最後の試行でも失敗した場合は fallback（テンプレート）の結果で完了します。
+    apply はアプリのプロセスで実行し、結果を対象のレコードへ反映します。
+    """
+
+    kind = None
+    prompt_version = "1"
+    priority = PRIORITY_NORMAL
+    # 結果のうち応答テキストをパースした項目の名前
+    result_key = None
+
+    def __init__(
+        self, generate=None, db=None, board=None, llm_cache=None, query_cache=None, rate_limiter=None, stream=None
+    ):
+        # generate(prompt) -> 応答テキスト（AIが利用できない場合はNone）
+        self.generate = generate
+        # stream(prompt) -> 応答テキストの断片（ストリーミングできない場合はNone）
+        self.stream = stream
+        self.db = db
+        self.board = board
+        self.llm_cache = llm_cache
+        self.query_cache = query_cache
+        self.rate_limiter = rate_limiter
+
+    def idempotency_key(self, payload):
+        """同じ入力の未完了のジョブを1件にまとめるためのキー（完了後は同じ入力でも新しいジョブを登録）"""
+        return f"{self.kind}:{make_cache_key(self.kind, self.prompt_version, payload)}"
+
+    def cache_key(self, payload):
+        return make_cache_key(TASK_MODEL_NAME, f"{self.kind}-{self.prompt_version}", payload)
+
+    def build_prompt(self, payload):
+        raise NotImplementedError
+
+    def template(self, payload):
+        """AIを利用できない場合の応答テキスト"""
+        raise NotImplementedError
+
+    def parse(self, response_text):
+        """応答テキスト -> ジョブの結果"""
+        return {self.result_key: parse_ai_response(response_text)}
+
+    def run(self, payload, progress=None):
+        """AIへ1回リクエスト（キャッシュ済みの応答を優先し、失敗時の再試行はジョブキューに任せる）"""
+        if self.generate is None:
+            return self.fallback(payload)
+        cache_key = self.cache_key(payload)
+        response_text = self.llm_cache.get(cache_key) if self.llm_cache is not None else None
+        if response_text is None:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            response_text = self.request(self.build_prompt(payload), progress)
+            if self.llm_cache is not None:
+                self.llm_cache.set(cache_key, response_text)
+        return self.parse(response_text)
+
+    def request(self, prompt, progress=None):
+        """応答テキストを取得（ストリーミングできる場合は途中までのセクションを progress で報告）"""
+        chunks = self.stream(prompt) if self.stream is not None and progress is not None else None
+        if chunks is None:
+            return self.generate(prompt)
+        parser = SectionStreamParser()
+        for chunk in chunks:
+            progress({self.result_key: parser.feed(chunk)})
+        return parser.text
+
+    def fallback(self, payload):
+        return {**self.parse(self.template(payload)), 'fallback': True}
+
+    def apply(self, job, result):
+        return result
+
+    def update_record(self, target, updates, create=False):
+        """対象のドキュメントに結果を保存（サンプルデータなど存在しない場合は create=True のときのみ作成）"""
+        if not target or self.db is None:
+            return
+        reference = self.db.collection(target['collection']).document(target['doc_id'])
+        if reference.get().exists:
+            reference.update(updates)
+        elif create:
+            reference.set(updates)
+        else:
+            return
+        if self.query_cache is not None:
+            self.query_cache.invalidate(target['collection'])
+
+
+class TaskGenerationJob(AIJob):
+    """メッセージからタスクを生成し、共有ボードに追加"""
+
+    kind = 'task_generation'
+    prompt_version = TASK_PROMPT_VERSION
+    result_key = 'task_data'
+
+    def cache_key(self, payload):
+        return task_cache_key(payload['message'], payload.get('summary'))
+
+    def build_prompt(self, payload):
+        return build_task_prompt(payload['message'], payload.get('summary'))
+
+    def template(self, payload):
+        return template_task_response(payload['message'])
+
+    def apply(self, job, result):
+        """タスクを追加してメッセージと紐付け（紐付けに失敗した場合は追加したタスクを削除し、再試行できるようにする）"""
+        message = job['payload']['message']
+        user = job['payload'].get('user', 'AI')
+        task = self.board.add(build_message_task(message, result['task_data']), user=user)
+        try:
+            self.update_record(job['target'], {'task_id': task['id']})
+        except Exception:
+            self.board.delete(task['id'], user=user)
+            raise
+        return {**result, 'task_id': task['id'], 'task_name': task['name']}
+
+
+class MessageSummaryJob(AIJob):
+    """メッセージを要約し、メッセージのレコードに保存"""
+
+    kind = 'message_summary'
+    priority = PRIORITY_HIGH
+    result_key = 'summary'
+
+    def build_prompt(self, payload):
+        return build_summary_prompt(payload['message'])
+
+    def template(self, payload):
+        return template_summary_response(payload['message'])
+
+    def apply(self, job, result):
+        summary = result['summary']
+        self.update_record(job['target'], {'ai_summary': summary.get('要約', ''), 'ai_summary_detail': summary})
+        return result
+
+
+class ProjectAnalysisJob(AIJob):
+    """プロジェクトを分析し、プロジェクトのレコードに保存"""
+
+    kind = 'project_analysis'
+    result_key = 'analysis'
+
+    def build_prompt(self, payload):
+        return build_project_analysis_prompt(payload['project'])
+
+    def template(self, payload):
+        return template_project_analysis(payload['project'])
+
+    def apply(self, job, result):
+        self.update_record(
+            job['target'], {'ai_analysis': result['analysis'], 'ai_analyzed_at': time.time()}, create=True
+        )
+        return result
+
+
+class ReplyDraftsJob(AIJob):
+    """返信案を作成し、メッセージのレコードに保存"""
+
+    kind = 'reply_drafts'
+    priority = PRIORITY_HIGH
+    result_key = 'replies'
+
+    def __init__(self, *args, helper=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = helper
+
+    def _helper(self):
+        if self.helper is None:
+            self.helper = AICommunicationHelper()
+        return self.helper
+
+    def run(self, payload, progress=None):
+        # 返信案はキャッシュ・プロバイダーの選択を含めて AICommunicationHelper に任せる
+        # （レート制限はキャッシュに無くAIへリクエストする場合のみ）
+        replies = []
+        for replies in self._helper().request_reply_stream(
+            payload['message'], payload['tone'], payload.get('context'),
+            intent=payload.get('intent'), provider=payload.get('provider'), rate_limiter=self.rate_limiter
+        ):
+            if progress is not None:
+                progress({'replies': replies})
+        if not replies:
+            raise ValueError("AIの応答から返信案を取り出せませんでした")
+        return {'replies': replies}
+
+    def fallback(self, payload):
+        replies = self._helper().request_reply_suggestions(payload['message'], payload['tone'], use_ai=False)
+        return {'replies': replies, 'fallback': True}
+
+    def apply(self, job, result):
+        self.update_record(job['target'], {'reply_drafts': result['replies']})
+        return result
+
+
+AI_JOB_CLASSES = {
+    job_class.kind: job_class
+    for job_class in (TaskGenerationJob, MessageSummaryJob, ProjectAnalysisJob, ReplyDraftsJob)
+}
+
+
+def build_job_handlers(**dependencies):
+    """ジョブ種別 -> ハンドラー"""
+    return {kind: job_class(**dependencies) for kind, job_class in AI_JOB_CLASSES.items()}
+
+
+def build_worker_pool(queue, workers, board=None, apply=True, kinds=None):
+    """AIジョブのワーカーを構築（board を渡さないプロセスでは結果を反映しない）"""
+    router = get_model_router()
+    registry = get_llm_registry()
+    registry.configure_gemini(AI_MODELS["models"]["gemini"]["api_key"])
+
+    def stream(prompt):
+        # Geminiが設定されていない場合はルーター経由で一括取得
+        if not registry.gemini_configured:
+            return None
+        return stream_text(registry.gemini_model(TASK_MODEL_NAME), prompt)
+
+    handlers = build_job_handlers(
+        generate=router.generate if router.available else None,
+        stream=stream,
+        db=get_database(),
+        board=board,
+        llm_cache=get_llm_cache(),
+        query_cache=get_query_cache(),
+        rate_limiter=get_provider_rate_limiter()
+    )
+    return JobWorkerPool(
+        queue, handlers, workers=workers, poll_interval=JOB_QUEUE_CONFIG["poll_interval"], apply=apply, kinds=kinds
+    )
+
+
+@st.cache_resource
+def get_job_workers():
+    """アプリのプロセスでAIジョブのワーカーを起動（プロセスにつき1回）"""
+    pool = build_worker_pool(get_job_queue(), JOB_QUEUE_CONFIG["workers"], board=get_shared_board())
+    pool.start()
+    return pool
+
+
+def message_payload(message):
+    """ジョブに渡すメッセージの項目"""
+    return {
+        'id': message.get('id'),
+        'source': message.get('source'),
+        'sender': message.get('sender'),
+        'subject': message.get('subject'),
+        'preview': message.get('preview'),
+        'body': message.get('body'),
+        'channel': message.get('channel'),
+        'time': message.get('time') or message.get('timestamp')
+    }
+
+
+def message_target(message):
+    """取り込み済みメッセージのレコード（サンプルメッセージの場合はNone）"""
+    return {'collection': MESSAGES_COLLECTION, 'doc_id': message['id']} if message.get('id') else None
+
+
+def submit_job(kind, payload, target=None, priority=None, fresh=False):
+    """AIジョブを登録して返す（同じ入力のジョブが未完了の場合はそのジョブ、fresh=True の場合は常に新しいジョブ）"""
+    handler = get_job_workers().handlers[kind]
+    return get_job_queue().enqueue(
+        kind,
+        payload,
+        priority=handler.priority if priority is None else priority,
+        idempotency_key=None if fresh else handler.idempotency_key(payload),
+        target=target
+    )
+
+
+def show_job_state(job, render, label, render_progress=None):
+    """ジョブの状態を表示し、結果の反映まで完了していれば render(job) で結果を表示
+
+    render_progress を渡すと、処理中のジョブの途中経過（job['progress']）を render_progress(job) で表示します。
+    """
+    if job is None:
+        st.warning(f"{label}: ジョブが見つかりません（保存期間を過ぎた可能性があります）")
+    elif job['status'] in ('failed', 'apply_failed'):
+        # 結果の反映に失敗したジョブは result が不完全なため render は呼ばない
+        st.error(f"{label}に失敗しました: {job['error']}")
+    elif job['status'] == 'cancelled':
+        st.info(f"{label}は取り消されました")
+    elif job['finished']:
+        render(job)
+    elif job['status'] == 'queued':
+        ahead = get_job_queue().position(job['id'])
+        retry = f"（再試行 {job['attempts']}/{job['max_attempts']}）" if job['attempts'] else ""
+        st.info(f"{JOB_STATUS_LABELS['queued']} {label}: 先に{ahead}件のジョブがあります{retry}" if ahead
+                else f"{JOB_STATUS_LABELS['queued']} {label}: まもなく開始します{retry}")
+    elif job['status'] == 'running':
+        st.info(f"{JOB_STATUS_LABELS['running']} {label}: AIが処理中です（ページを移動しても処理は続きます）")
+        if job.get('progress') and render_progress is not None:
+            render_progress(job)
+    else:
+        st.info(f"{JOB_STATUS_LABELS['running']} {label}: 結果を反映しています...")
+
+
+def show_task_preview(job):
+    """生成途中のタスク（task_generation ジョブの途中経過）を表示"""
+    task_data = job['progress'].get('task_data', {})
+    st.markdown(f"**{task_data.get('タスク名', '生成中...')}**\n\n{task_data.get('詳細説明', '')}")
+
+
+def _poll_job(job_id, render, label, render_progress=None):
+    job = get_job_queue().get(job_id)
+    if job is not None and job['finished']:
+        # 完了したらアプリ全体を再実行し、結果を反映したレコードで再描画（ポーリングも終了）
+        st.rerun()
+    show_job_state(job, render, label, render_progress)
+
+
+# 未完了のジョブは一定間隔で部分再実行して状態を更新（フラグメント未対応のバージョンでは手動更新）
+_fragment = getattr(st, 'fragment', None)
+_poll_job_fragment = _fragment(run_every=JOB_QUEUE_CONFIG["poll_interval"])(_poll_job) if _fragment else None
+
+
+def show_job(job_id, render, label, render_progress=None):
+    """ジョブの状態を表示（未完了の間は自動で再確認して途中経過を表示し、完了後は render(job) で結果を表示）"""
+    job = get_job_queue().get(job_id)
+    if job is None or job['finished'] or _poll_job_fragment is None:
+        show_job_state(job, render, label, render_progress)
+        if job is not None and not job['finished']:
+            st.button("🔄 状態を更新", key=f"refresh_job_{job_id}")
+        return
+    _poll_job_fragment(job_id, render, label, render_progress)
@@ -0,0 +1,418 @@
+"""
+BizFlow AI MVP - AI処理スケジューラー
+取り込んだメッセージを連携設定の「AI処理のタイミング」ごとにまとめ、
+重要度判定・要約・タスク抽出を1回のAIリクエストで複数件まとめて実行します
+
+    リアルタイム  重要度「高」のメッセージは realtime_delay 秒だけ待ってすぐに処理し、
+                  それ以外は realtime_fallback_interval ごとにまとめて処理
+    5分毎 など    全てのメッセージを間隔ごとにまとめて処理
+
+max_batch_size 件が溜まった場合は間隔を待たずに処理します。
+結果はメッセージのレコード（ai_summary・ai_category・importance など）に保存し、
+タスク抽出が有効な場合は共有ボードにタスクを追加します。
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import streamlit as st
+from config.config import AI_SCHEDULER_CONFIG
+from utils.ai_batch import call_with_retry, get_provider_rate_limiter
+from utils.connectors import MESSAGES_COLLECTION, get_connector_manager
+from utils.database import get_database
+from utils.llm_cache import get_llm_cache, make_cache_key
+from utils.model_router import get_model_router
+from utils.query_cache import get_query_cache
+from utils.shared_board import get_shared_board
+
+# 連携設定の選択肢 -> 処理間隔（秒、0はリアルタイム）
+AI_PROCESSING_INTERVALS = {
+    "リアルタイム": 0,
+    "5分毎": 300,
+    "15分毎": 900,
+    "1時間毎": 3600
+}
+
+SETTINGS_COLLECTION = 'settings'
+SETTINGS_DOC_ID = 'ai_processing'
+
+DEFAULT_SETTINGS = {
+    'timing': AI_SCHEDULER_CONFIG["default_timing"],
+    'auto_importance': True,
+    'auto_summary': True,
+    'auto_task_extract': False
+}
+
+# 一括分析プロンプトの版（プロンプトを変更したら更新し、古いキャッシュを無効化）
+BATCH_PROMPT_VERSION = "1"
+BATCH_MODEL_NAME = "ai-batch"
+
+PRIORITIES = ('高', '中', '低')
+
+logger = logging.getLogger(__name__)
+
+
+def build_batch_prompt(messages, settings):
+    """複数メッセージをまとめて分析するプロンプト"""
+    fields = ['"index": メッセージ番号', '"category": 緊急対応/企画相談/定期報告/質問/その他']
+    if settings['auto_importance']:
+        fields.append('"priority": 高/中/低')
+    if settings['auto_summary']:
+        fields.append('"summary": 50文字以内の要約')
+    if settings['auto_task_extract']:
+        fields.append(
+            '"task": 対応が必要な場合は {"name": タスク名, "description": 詳細, "priority": 高/中/低, '
+            '"estimated_time": 推定時間}、不要な場合は null'
+        )
+
+    entries = "\n\n".join(
+        f"[{index}] 送信元: {message.get('source')} / 送信者: {message.get('sender')}\n"
+        f"件名: {message.get('subject')}\n本文: {message.get('body') or message.get('preview', '')}"
+        for index, message in enumerate(messages, 1)
+    )
+    return f"""
+あなたは業務メッセージの分析アシスタントです。以下の{len(messages)}件のメッセージをそれぞれ分析してください。
+
+## 出力形式
+JSONのみを出力してください。results にはメッセージごとに1件ずつ、次の項目を含めます：
+{chr(10).join('- ' + field for field in fields)}
+
+{{"results": [{{"index": 1, ...}}, ...]}}
+
+## メッセージ
+{entries}
+"""
+
+
+def parse_batch_response(response_text, count):
+    """一括分析の応答を index 順の結果リストに変換（欠けている結果はNone）"""
+    start = response_text.find('{')
+    end = response_text.rfind('}') + 1
+    data = json.loads(response_text[start:end])
+    results = [None] * count
+    for result in data.get('results', []):
+        index = result.get('index')
+        if isinstance(index, int) and 1 <= index <= count:
+            results[index - 1] = result
+    return results
+
+
+class AIBatchScheduler:
+    """取り込んだメッセージのAI処理をマイクロバッチにまとめるスケジューラー"""
+
+    def __init__(self, db, generate=None, board=None, settings=None, query_cache=None, llm_cache=None,
+                 rate_limiter=None, max_batch_size=20, realtime_delay=2.0, realtime_fallback_interval=300.0,
+                 max_attempts=3):
+        self.db = db
+        # generate(prompt) -> 応答テキスト（AIが利用できない場合はNone）
+        self.generate = generate
+        self.board = board
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.query_cache = query_cache
+        self.llm_cache = llm_cache
+        self.rate_limiter = rate_limiter
+        self.max_batch_size = max_batch_size
+        self.realtime_delay = realtime_delay
+        self.realtime_fallback_interval = realtime_fallback_interval
+        self.max_attempts = max_attempts
+
+        self._cond = threading.Condition()
+        # ドキュメントID -> (メッセージ, 試行回数)
+        self._urgent = OrderedDict()
+        self._pending = OrderedDict()
+        # 各レーンの処理予定時刻（空の場合はNone）
+        self._urgent_due = None
+        self._pending_due = None
+        self._stop = False
+        self._thread = None
+
+        self.llm_calls = 0
+        self.processed = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.tasks_created = 0
+        self.last_run = None
+        self.last_error = None
+
+    @classmethod
+    def from_config(cls, db, config=AI_SCHEDULER_CONFIG, **kwargs):
+        """AI_SCHEDULER_CONFIG とデータベースに保存済みの連携設定からスケジューラーを構築"""
+        saved = db.collection(SETTINGS_COLLECTION).document(SETTINGS_DOC_ID).get()
+        return cls(
+            db,
+            settings=saved.data if saved.exists else None,
+            max_batch_size=config["max_batch_size"],
+            realtime_delay=config["realtime_delay"],
+            realtime_fallback_interval=config["realtime_fallback_interval"],
+            max_attempts=config["max_attempts"],
+            **kwargs
+        )
+
+    @property
+    def interval(self):
+        return AI_PROCESSING_INTERVALS.get(self.settings['timing'], AI_PROCESSING_INTERVALS["15分毎"])
+
+    @property
+    def realtime(self):
+        return self.interval == 0
+
+    @property
+    def pending_count(self):
+        return len(self._urgent) + len(self._pending)
+
+    def configure(self, **settings):
+        """連携設定を変更して保存（処理待ちのメッセージの予定時刻も新しい間隔で計算し直す）"""
+        with self._cond:
+            self.settings = {**self.settings, **settings}
+            now = time.monotonic()
+            if self._pending:
+                self._pending_due = now + self._lane_interval()
+            if self._urgent and not self.realtime:
+                # リアルタイム以外では重要度「高」も通常の間隔で処理
+                self._pending.update(self._urgent)
+                self._urgent.clear()
+                self._urgent_due = None
+                self._pending_due = now + self._lane_interval()
+            self._cond.notify_all()
+        self.db.collection(SETTINGS_COLLECTION).document(SETTINGS_DOC_ID).set(dict(self.settings))
+
+    def _lane_interval(self):
+        return self.realtime_fallback_interval if self.realtime else self.interval
+
+    # キュー
+
+    def enqueue(self, saved):
+        """新たに保存したメッセージ [(ドキュメントID, メッセージ), ...] を処理待ちに追加"""
+        with self._cond:
+            now = time.monotonic()
+            for doc_id, message in saved:
+                self._add(doc_id, message, 0, now)
+            self._cond.notify_all()
+
+    def _add(self, doc_id, message, attempts, now):
+        if self.realtime and message.get('importance') == '高':
+            self._urgent[doc_id] = (message, attempts)
+            if self._urgent_due is None:
+                self._urgent_due = now + self.realtime_delay
+        else:
+            self._pending[doc_id] = (message, attempts)
+            if self._pending_due is None:
+                self._pending_due = now + self._lane_interval()
+
+    def _take_due(self, now):
+        """処理予定時刻を過ぎたレーンの全メッセージと、上限件数に達した分のメッセージを取り出す"""
+        urgent, self._urgent_due = self._take(self._urgent, self._urgent_due, now)
+        pending, self._pending_due = self._take(self._pending, self._pending_due, now)
+        return urgent + pending
+
+    def _take(self, lane, due, now):
+        if not lane:
+            return [], None
+        if now >= due:
+            items = list(lane.items())
+            lane.clear()
+            return items, None
+        # 予定時刻前は上限件数ちょうどのバッチだけを取り出し、端数は予定時刻まで待つ
+        count = len(lane) - len(lane) % self.max_batch_size
+        items = [lane.popitem(last=False) for _ in range(count)]
+        return items, due if lane else None
+
+    def flush(self):
+        """処理待ちのメッセージを間隔を待たずに全て処理"""
+        with self._cond:
+            items = list(self._urgent.items()) + list(self._pending.items())
+            self._urgent.clear()
+            self._pending.clear()
+            self._urgent_due = self._pending_due = None
+        self._process(items)
+
+    # 処理スレッド
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ai-batch-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop:
+                    items = self._take_due(time.monotonic())
+                    if items:
+                        break
+                    deadlines = [due for due in (self._urgent_due, self._pending_due) if due is not None]
+                    self._cond.wait(max(0.0, min(deadlines) - time.monotonic()) if deadlines else None)
+                if self._stop:
+                    return
+            self._process(items)
+
+    def _process(self, items):
+        for start in range(0, len(items), self.max_batch_size):
+            batch = items[start:start + self.max_batch_size]
+            try:
+                self.process_batch(batch)
+            except Exception as error:
+                # 1バッチの失敗で処理スレッドを止めず、再試行回数の範囲で処理待ちに戻す
+                logger.exception("AIバッチ処理に失敗しました")
+                self.failures += 1
+                self.last_error = str(error)
+                self._requeue([(doc_id, message, attempts + 1) for doc_id, (message, attempts) in batch])
+        self.last_run = datetime.now()
+
+    def _requeue(self, entries):
+        """再試行回数が残っているメッセージ [(ドキュメントID, メッセージ, 試行回数), ...] を処理待ちに戻す"""
+        with self._cond:
+            now = time.monotonic()
+            for doc_id, message, attempts in entries:
+                if attempts < self.max_attempts:
+                    self._add(doc_id, message, attempts, now)
+            self._cond.notify_all()
+
+    def _cache_key(self, message):
+        return make_cache_key(BATCH_MODEL_NAME, BATCH_PROMPT_VERSION, {
+            'sender': message.get('sender'),
+            'subject': message.get('subject'),
+            'body': message.get('body') or message.get('preview'),
+            'settings': {key: value for key, value in self.settings.items() if key != 'timing'}
+        })
+
+    def process_batch(self, items):
+        """メッセージをまとめて分析し、結果を保存（AIリクエストは最大1回）"""
+        if not items or self.generate is None:
+            return
+        settings = dict(self.settings)
+        results = {}
+        uncached = []
+        for doc_id, (message, attempts) in items:
+            cached = self.llm_cache.get(self._cache_key(message)) if self.llm_cache is not None else None
+            if cached is not None:
+                results[doc_id] = cached
+                self.cache_hits += 1
+            else:
+                uncached.append((doc_id, message, attempts))
+
+        if uncached:
+            try:
+                response_text = call_with_retry(
+                    self.generate, build_batch_prompt([message for _, message, _ in uncached], settings),
+                    rate_limiter=self.rate_limiter
+                )
+                self.llm_calls += 1
+                parsed = parse_batch_response(response_text, len(uncached))
+            except Exception:
+                self.failures += 1
+                parsed = [None] * len(uncached)
+            retry = []
+            for (doc_id, message, attempts), result in zip(uncached, parsed):
+                if result is None:
+                    retry.append((doc_id, message, attempts + 1))
+                    continue
+                results[doc_id] = result
+                if self.llm_cache is not None:
+                    self.llm_cache.set(self._cache_key(message), result)
+            if retry:
+                self._requeue(retry)
+
+        if results:
+            messages = {doc_id: message for doc_id, (message, _) in items}
+            self._save_results(results, messages, settings)
+
+    def _save_results(self, results, messages, settings):
+        collection = self.db.collection(MESSAGES_COLLECTION)
+        operations = []
+        task_requests = []
+        for doc_id, result in results.items():
+            updates = {'ai_category': result.get('category'), 'ai_processed_at': time.time()}
+            if settings['auto_importance'] and result.get('priority') in PRIORITIES:
+                updates['importance'] = result['priority']
+            if settings['auto_summary'] and result.get('summary'):
+                updates['ai_summary'] = result['summary']
+            task = result.get('task') if settings['auto_task_extract'] else None
+            if task and self.board is not None:
+                task_requests.append((doc_id, task))
+            operations.append(('update', collection.document(doc_id), updates))
+        # メッセージの更新を先に保存（失敗した場合はタスクを作成しない）
+        self.db.bulk_write(operations)
+        self.processed += len(operations)
+        try:
+            if task_requests:
+                self._create_tasks(task_requests, messages, collection)
+        finally:
+            if self.query_cache is not None:
+                self.query_cache.invalidate(MESSAGES_COLLECTION)
+
+    def _create_tasks(self, task_requests, messages, collection):
+        """タスクを作成してメッセージと紐付け（紐付けに失敗した場合は作成したタスクを削除）"""
+        created = []
+        try:
+            for doc_id, task in task_requests:
+                created.append((doc_id, self._create_task(task, messages[doc_id])))
+            self.db.bulk_write([
+                ('update', collection.document(doc_id), {'task_id': task['id']}) for doc_id, task in created
+            ])
+        except Exception:
+            for _, task in created:
+                self.board.delete(task['id'], user='AI')
+            self.tasks_created -= len(created)
+            raise
+
+    def _create_task(self, task, message):
+        self.tasks_created += 1
+        priority = task.get('priority')
+        return self.board.add({
+            'name': task.get('name') or f"{message.get('subject')}への対応",
+            'description': task.get('description', ''),
+            'status': 'To Do',
+            'priority': priority if priority in PRIORITIES else message.get('importance', '中'),
+            'project': 'その他',
+            'assignee': '自分',
+            'due_date': '未設定',
+            'estimated_time': task.get('estimated_time', ''),
+            'created_from_message': True,
+            'source_message': {'sender': message.get('sender'), 'subject': message.get('subject')},
+            'subtasks': [],
+            'comments': []
+        }, user='AI')
+
+    def stats(self):
+        """処理件数とAIリクエスト数（1リクエストあたりの処理件数）"""
+        analyzed = self.processed - self.cache_hits
+        return {
+            'pending': self.pending_count,
+            'processed': self.processed,
+            'llm_calls': self.llm_calls,
+            'cache_hits': self.cache_hits,
+            'failures': self.failures,
+            'tasks_created': self.tasks_created,
+            'messages_per_call': analyzed / self.llm_calls if self.llm_calls else 0.0,
+            'last_run': self.last_run,
+            'last_error': self.last_error
+        }
+
+
+@st.cache_resource
+def get_ai_scheduler():
+    """AI処理スケジューラーを取得し、取り込んだメッセージの処理を開始（プロセスにつき1回）"""
+    router = get_model_router()
+    scheduler = AIBatchScheduler.from_config(
+        get_database(),
+        generate=router.generate if router.available else None,
+        board=get_shared_board(),
+        query_cache=get_query_cache(),
+        llm_cache=get_llm_cache(),
+        rate_limiter=get_provider_rate_limiter()
+    )
+    scheduler.start()
+    get_connector_manager().subscribe(scheduler.enqueue)
+    return scheduler
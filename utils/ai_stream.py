@@ -0,0 +1,136 @@
+"""
+BizFlow AI MVP - AIストリーミング応答
+生成途中のテキストを受け取りながら、セクション形式・JSON形式の応答を逐次パースします
+"""
+
+import json
+import re
+
+
+def stream_text(model, prompt):
+    """モデルのストリーミング応答をテキスト断片として返すジェネレーター"""
+    response = model.generate_content(prompt, stream=True)
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # セーフティフィルタ等でテキストを含まない断片
+            continue
+        if text:
+            yield text
+
+
+class SectionStreamParser:
+    """「**キー:**」区切りの応答を逐次パース（ai_jobs.parse_ai_response と同じ形式）"""
+
+    def __init__(self):
+        self.sections = {}
+        self._buffer = ""
+        self._pos = 0
+        self._key = None
+        self._value_start = 0
+
+    def feed(self, chunk):
+        """断片を追加し、現時点までのセクションを返す"""
+        self._buffer += chunk
+        while True:
+            start = self._buffer.find('**', self._pos)
+            if start == -1:
+                break
+            end = self._buffer.find('**', start + 2)
+            if end == -1:
+                # キーの閉じ記号がまだ届いていない
+                break
+            if self._key is not None:
+                self.sections[self._key] = self._buffer[self._value_start:start].strip()
+            self._key = self._buffer[start + 2:end].strip().replace(':', '')
+            self._value_start = self._pos = end + 2
+        return self.snapshot()
+
+    def snapshot(self):
+        """確定済みセクション＋入力途中のセクション"""
+        data = dict(self.sections)
+        if self._key is not None:
+            # 次のキーの開始記号の一部が末尾に届いている場合は除外
+            data[self._key] = self._buffer[self._value_start:].rstrip('*').strip()
+        return data
+
+    @property
+    def text(self):
+        return self._buffer
+
+
+class ReplyStreamParser:
+    """{"replies": [{"version": ..., "content": ...}]} 形式の応答を逐次パース"""
+
+    FIELD_PATTERN = re.compile(r'"(version|content)"\s*:\s*"')
+
+    def __init__(self):
+        self.replies = []
+        self._buffer = ""
+        self._pos = 0
+        self._field = None
+        self._value_start = 0
+        self._scan = 0
+
+    def feed(self, chunk):
+        """断片を追加し、現時点までの返信案を返す"""
+        self._buffer += chunk
+        while True:
+            if self._field is None:
+                match = self.FIELD_PATTERN.search(self._buffer, self._pos)
+                if not match:
+                    break
+                self._field = match.group(1)
+                self._value_start = self._scan = self._pos = match.end()
+
+            end = self._find_string_end()
+            if end == -1:
+                break
+            self._set_field(self._field, self._decode(self._buffer[self._value_start:end]))
+            self._field = None
+            self._pos = end + 1
+        return self.snapshot()
+
+    def _find_string_end(self):
+        """文字列の閉じ引用符の位置（未到着なら-1）"""
+        index = self._scan
+        while index < len(self._buffer):
+            char = self._buffer[index]
+            if char == '\\':
+                if index + 1 >= len(self._buffer):
+                    break
+                index += 2
+                continue
+            if char == '"':
+                return index
+            index += 1
+        self._scan = index
+        return -1
+
+    def _set_field(self, field, value, replies=None):
+        replies = self.replies if replies is None else replies
+        if not replies or field in replies[-1]:
+            replies.append({})
+        replies[-1][field] = value
+
+    @staticmethod
+    def _decode(raw):
+        """JSON文字列をデコード（途中で切れたエスケープにも対応）"""
+        if (len(raw) - len(raw.rstrip('\\'))) % 2:
+            raw = raw[:-1]
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw.replace('\\n', '\n').replace('\\"', '"')
+
+    def snapshot(self):
+        """確定済みの返信案＋入力途中の返信案"""
+        replies = [dict(reply) for reply in self.replies]
+        if self._field is not None:
+            self._set_field(self._field, self._decode(self._buffer[self._value_start:]), replies)
+        return replies
+
+    @property
+    def text(self):
+        return self._buffer
@@ -0,0 +1,582 @@
+"""
+BizFlow AI MVP - 外部サービス連携
+config.EXTERNAL_SERVICES の Slack / Gmail / Teams から新着メッセージを差分取得し、
+共通の形式に変換してデータベースの messages コレクションへ保存します
+
+取り込みはStreamlitのスクリプトとは別のスレッドで動作します:
+    取得スレッド（サービスごと） -> 上限付きキュー -> 書き込みスレッド（1つ） -> データベース
+書き込みが追いつかない間はキューが埋まり、取得スレッドは次のページを取得せずに待機します。
+同期カーソル（どこまで取得したか）はメッセージと同じ書き込みで保存するため、
+途中で停止しても保存済みの位置から再開できます（再取得したメッセージは保存済みのものを上書きしません）。
+"""
+
+import hashlib
+import html
+import json
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+import requests
+import streamlit as st
+from config.config import CONNECTOR_CONFIG, EXTERNAL_SERVICES
+from utils.ai_communication import DEFAULT_PRIORITY_MATCHER, AICommunicationHelper
+from utils.database import get_database
+from utils.query_cache import get_query_cache
+
+# 保存先のコレクション
+MESSAGES_COLLECTION = 'messages'
+CURSORS_COLLECTION = 'connector_cursors'
+
+PREVIEW_LENGTH = 200
+
+
+class ConnectorError(Exception):
+    """外部サービスのAPIエラー"""
+
+    def __init__(self, message, status_code=None):
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class RateLimitedError(ConnectorError):
+    """リクエスト数の制限（retry_after 秒後に再試行）"""
+
+    def __init__(self, source, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"{source} のリクエスト制限に達しました（{retry_after:.0f}秒後に再試行）", 429)
+
+
+def message_doc_id(service, external_id):
+    """サービス内のIDから保存用のドキュメントIDを作成（同じメッセージは常に同じID）"""
+    return f"{service}_{hashlib.sha1(external_id.encode()).hexdigest()[:24]}"
+
+
+def format_timestamp(epoch):
+    return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M")
+
+
+def strip_html(text):
+    return html.unescape(re.sub(r'<[^>]+>', '', text or '')).strip()
+
+
+class Connector:
+    """外部サービス連携の基底クラス
+
+    sync(cursor) は (取得したメッセージ, そこまでを保存した後のカーソル) を1ページずつ返すジェネレーターです。
+    カーソルはJSONに変換できる値で、初回はNoneが渡されます。normalize() は1件を共通の形式に変換します。
+    """
+
+    name = ''
+    source = ''
+
+    def __init__(self, settings, timeout=10):
+        self.settings = settings
+        self.timeout = timeout
+        # 接続を再利用するためセッションを保持
+        self.session = requests.Session()
+
+    def _request(self, method, url, **kwargs):
+        response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        if response.status_code == 429:
+            raise RateLimitedError(self.source, float(response.headers.get('Retry-After', 30)))
+        if response.status_code >= 400:
+            raise ConnectorError(
+                f"{self.source} APIエラー（{response.status_code}）: {response.text[:200]}", response.status_code
+            )
+        return response.json()
+
+    def sync(self, cursor):
+        raise NotImplementedError
+
+    def normalize(self, raw):
+        raise NotImplementedError
+
+    def build_message(self, external_id, sender, subject, body, received_at, channel, thread_count=1):
+        """共通形式のメッセージ（重要度はキーワードで判定）"""
+        preview = body[:PREVIEW_LENGTH]
+        message = {
+            'source': self.source,
+            'service': self.name,
+            'external_id': external_id,
+            'sender': sender,
+            'subject': subject or preview.split('\n', 1)[0][:80],
+            'preview': preview,
+            'body': body,
+            'channel': channel,
+            'received_at': received_at,
+            'timestamp': format_timestamp(received_at),
+            'status': '未読',
+            'thread_count': thread_count
+        }
+        score = DEFAULT_PRIORITY_MATCHER.score_message(message)
+        message['importance'] = AICommunicationHelper.PRIORITY_LABELS[score]
+        return message
+
+
+class SlackConnector(Connector):
+    """Slack（conversations.history をチャンネルごとに前回の最新時刻以降から取得）"""
+
+    name = 'slack'
+    source = 'Slack'
+
+    def __init__(self, settings, timeout=10):
+        super().__init__(settings, timeout)
+        self.api_base = settings.get('api_base', 'https://slack.com/api').rstrip('/')
+        self.session.headers.update({'Authorization': f"Bearer {settings['token']}"})
+        self._channel_names = {}
+
+    def _call(self, method, **params):
+        data = self._request('GET', f"{self.api_base}/{method}", params=params)
+        if not data.get('ok'):
+            raise ConnectorError(f"Slack APIエラー: {data.get('error')}")
+        return data
+
+    def channels(self):
+        """取得対象のチャンネルID（未設定の場合はボットが参加しているチャンネル）"""
+        if self.settings.get('channels'):
+            return list(self.settings['channels'])
+        data = self._call('users.conversations', types='public_channel,private_channel', limit=200)
+        for channel in data.get('channels', []):
+            self._channel_names[channel['id']] = channel.get('name')
+        return [channel['id'] for channel in data.get('channels', [])]
+
+    def sync(self, cursor):
+        latest = dict((cursor or {}).get('latest', {}))
+        for channel in self.channels():
+            oldest = latest.get(channel, '0')
+            newest = oldest
+            page_cursor = None
+            while True:
+                params = {'channel': channel, 'oldest': oldest, 'limit': 200}
+                if page_cursor:
+                    params['cursor'] = page_cursor
+                data = self._call('conversations.history', **params)
+                messages = [
+                    {**message, 'channel': channel}
+                    for message in data.get('messages', [])
+                    if message.get('type') == 'message' and not message.get('subtype')
+                ]
+                newest = max([newest] + [message['ts'] for message in messages], key=float)
+                page_cursor = (data.get('response_metadata') or {}).get('next_cursor')
+                if not page_cursor:
+                    break
+                # チャンネルの途中のページでは前回の位置のまま（再開時はチャンネルの先頭から取り直す）
+                yield messages, {'latest': dict(latest)}
+            latest[channel] = newest
+            yield messages, {'latest': dict(latest)}
+
+    def normalize(self, raw):
+        channel = raw['channel']
+        return self.build_message(
+            external_id=f"{channel}:{raw['ts']}",
+            sender=raw.get('user_profile', {}).get('real_name') or raw.get('user') or raw.get('username', ''),
+            subject='',
+            body=raw.get('text', ''),
+            received_at=float(raw['ts']),
+            channel=f"#{self._channel_names.get(channel, channel)}",
+            thread_count=raw.get('reply_count', 0) + 1
+        )
+
+
+class GmailConnector(Connector):
+    """Gmail（初回は直近のメッセージ一覧、以降は history.list で前回の historyId 以降の追加分を取得）
+
+    credentials にはアクセストークン、または token / access_token を含むJSONを指定します。
+    """
+
+    name = 'gmail'
+    source = 'Gmail'
+
+    def __init__(self, settings, timeout=10):
+        super().__init__(settings, timeout)
+        self.api_base = settings.get('api_base', 'https://gmail.googleapis.com/gmail/v1/users/me').rstrip('/')
+        self.session.headers.update({'Authorization': f"Bearer {self._access_token(settings['credentials'])}"})
+
+    @staticmethod
+    def _access_token(credentials):
+        try:
+            data = json.loads(credentials)
+        except ValueError:
+            return credentials
+        return data.get('token') or data.get('access_token')
+
+    def _get(self, path, **params):
+        return self._request('GET', f"{self.api_base}/{path}", params=params)
+
+    def _fetch_messages(self, message_ids):
+        messages = []
+        for message_id in message_ids:
+            try:
+                messages.append(
+                    self._get(f"messages/{message_id}", format='metadata', metadataHeaders=['From', 'Subject'])
+                )
+            except ConnectorError as error:
+                # 一覧・履歴の取得後に削除されたメッセージは飛ばす
+                if error.status_code != 404:
+                    raise
+        return messages
+
+    def _get_history(self, history_id, page_token=None):
+        params = {'startHistoryId': history_id, 'historyTypes': 'messageAdded', 'labelId': 'INBOX'}
+        if page_token:
+            params['pageToken'] = page_token
+        return self._get('history', **params)
+
+    def sync(self, cursor):
+        history_id = (cursor or {}).get('history_id')
+        if history_id is not None:
+            try:
+                data = self._get_history(history_id)
+            except ConnectorError as error:
+                # 古すぎる historyId は history.list が404を返すため、一覧から取り直す
+                if error.status_code != 404:
+                    raise
+            else:
+                yield from self._sync_history(history_id, data)
+                return
+        yield from self._sync_initial()
+
+    def _sync_initial(self):
+        # 一覧の取得中に届いたメッセージを取りこぼさないよう、先に現在の historyId を控える
+        history_id = self._get('profile')['historyId']
+        query = f"in:inbox newer_than:{self.settings.get('initial_days', 7)}d"
+        page_token = None
+        while True:
+            params = {'q': query, 'maxResults': 100}
+            if page_token:
+                params['pageToken'] = page_token
+            data = self._get('messages', **params)
+            messages = self._fetch_messages(message['id'] for message in data.get('messages', []))
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                yield messages, {'history_id': history_id}
+                return
+            yield messages, None
+
+    def _sync_history(self, history_id, data):
+        while True:
+            message_ids = dict.fromkeys(
+                added['message']['id']
+                for record in data.get('history', [])
+                for added in record.get('messagesAdded', [])
+            )
+            messages = self._fetch_messages(message_ids)
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                yield messages, {'history_id': data.get('historyId', history_id)}
+                return
+            yield messages, {'history_id': history_id}
+            data = self._get_history(history_id, page_token)
+
+    def normalize(self, raw):
+        headers = {header['name']: header['value'] for header in raw.get('payload', {}).get('headers', [])}
+        return self.build_message(
+            external_id=raw['id'],
+            sender=headers.get('From', ''),
+            subject=headers.get('Subject', ''),
+            body=html.unescape(raw.get('snippet', '')),
+            received_at=int(raw.get('internalDate', 0)) / 1000,
+            channel='メール'
+        )
+
+
+class TeamsConnector(Connector):
+    """Microsoft Teams（Graph API のチャンネルメッセージの差分クエリ）
+
+    アプリケーションの認証情報（クライアントクレデンシャル）でアクセストークンを取得します。
+    """
+
+    name = 'teams'
+    source = 'Teams'
+
+    def __init__(self, settings, timeout=10):
+        super().__init__(settings, timeout)
+        self.api_base = settings.get('api_base', 'https://graph.microsoft.com/v1.0').rstrip('/')
+        self.login_base = settings.get('login_base', 'https://login.microsoftonline.com').rstrip('/')
+        self._token = None
+        self._token_expires_at = 0.0
+
+    def _access_token(self):
+        if self._token is None or time.time() >= self._token_expires_at:
+            tenant_id = self.settings.get('tenant_id', 'common')
+            data = self._request('POST', f"{self.login_base}/{tenant_id}/oauth2/v2.0/token", data={
+                'grant_type': 'client_credentials',
+                'client_id': self.settings['client_id'],
+                'client_secret': self.settings['client_secret'],
+                'scope': 'https://graph.microsoft.com/.default'
+            })
+            self._token = data['access_token']
+            # 期限の1分前に更新
+            self._token_expires_at = time.time() + int(data.get('expires_in', 3600)) - 60
+        return self._token
+
+    def _get(self, url):
+        try:
+            return self._request('GET', url, headers={'Authorization': f"Bearer {self._access_token()}"})
+        except ConnectorError as error:
+            if error.status_code != 401:
+                raise
+            # トークンが失効していた場合は取り直して1回だけ再試行
+            self._token = None
+            return self._request('GET', url, headers={'Authorization': f"Bearer {self._access_token()}"})
+
+    def sync(self, cursor):
+        delta_links = dict((cursor or {}).get('delta', {}))
+        for channel in self.settings.get('channels', []):
+            team_id, channel_id = channel.split('/', 1)
+            url = delta_links.get(channel) or f"{self.api_base}/teams/{team_id}/channels/{channel_id}/messages/delta"
+            while url:
+                data = self._get(url)
+                messages = [
+                    {**message, 'channel': channel}
+                    for message in data.get('value', [])
+                    if message.get('messageType') == 'message' and not message.get('deletedDateTime')
+                ]
+                url = data.get('@odata.nextLink')
+                if not url:
+                    delta_links[channel] = data.get('@odata.deltaLink', delta_links.get(channel))
+                yield messages, {'delta': dict(delta_links)}
+
+    def normalize(self, raw):
+        sender = ((raw.get('from') or {}).get('user') or {}).get('displayName', '')
+        received_at = datetime.fromisoformat(raw['createdDateTime'].replace('Z', '+00:00')).timestamp()
+        return self.build_message(
+            external_id=f"{raw['channel']}:{raw['id']}",
+            sender=sender,
+            subject=raw.get('subject') or '',
+            body=strip_html((raw.get('body') or {}).get('content')),
+            received_at=received_at,
+            channel=raw['channel'].split('/', 1)[1]
+        )
+
+
+CONNECTOR_CLASSES = {
+    'slack': SlackConnector,
+    'gmail': GmailConnector,
+    'teams': TeamsConnector
+}
+
+
+class ConnectorStatus:
+    """サービスごとの同期状況"""
+
+    def __init__(self, connector):
+        self.name = connector.name
+        self.source = connector.source
+        self.state = '待機中'
+        self.last_sync = None
+        self.last_error = None
+        self.fetched = 0
+        self.saved = 0
+
+
+class ConnectorManager:
+    """取得スレッド・書き込みスレッドで外部サービスのメッセージを取り込む"""
+
+    def __init__(self, connectors, db, query_cache=None, poll_interval=60.0, queue_size=8,
+                 write_batch_size=200, max_backoff=300.0):
+        self.connectors = {connector.name: connector for connector in connectors}
+        self.db = db
+        self.query_cache = query_cache
+        self.poll_interval = poll_interval
+        self.write_batch_size = write_batch_size
+        self.max_backoff = max_backoff
+        # (サービス名, メッセージ, 保存後のカーソル) の上限付きキュー
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._wake = {name: threading.Event() for name in self.connectors}
+        self._stop = threading.Event()
+        self._threads = []
+        self._listeners = []
+        self.status = {name: ConnectorStatus(connector) for name, connector in self.connectors.items()}
+
+    @classmethod
+    def from_config(cls, db, services=EXTERNAL_SERVICES, config=CONNECTOR_CONFIG, **kwargs):
+        """EXTERNAL_SERVICES で有効なサービスの連携を構築"""
+        connectors = [
+            CONNECTOR_CLASSES[name](settings, timeout=config["request_timeout"])
+            for name, settings in services.items()
+            if settings.get('enabled') and name in CONNECTOR_CLASSES
+        ]
+        return cls(
+            connectors, db,
+            poll_interval=config["poll_interval"],
+            queue_size=config["queue_size"],
+            write_batch_size=config["write_batch_size"],
+            max_backoff=config["max_backoff"],
+            **kwargs
+        )
+
+    @property
+    def available(self):
+        return bool(self.connectors)
+
+    @property
+    def pending_pages(self):
+        """取得済み・未保存のページ数"""
+        return self._queue.qsize()
+
+    def start(self):
+        """取得・書き込みスレッドを起動（デーモンスレッド）"""
+        if self._threads:
+            return
+        self._threads.append(threading.Thread(target=self._write_loop, name="connector-writer", daemon=True))
+        for name in self.connectors:
+            self._threads.append(threading.Thread(
+                target=self._fetch_loop, args=(name,), name=f"connector-{name}", daemon=True
+            ))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for event in self._wake.values():
+            event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def sync_now(self, name=None):
+        """待機中の取得スレッドをすぐに同期させる"""
+        for connector_name in ([name] if name else self.connectors):
+            self._wake[connector_name].set()
+
+    def subscribe(self, listener):
+        """新着メッセージを保存するたびに listener([(ドキュメントID, メッセージ), ...]) を呼び出す"""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def load_cursor(self, name):
+        return self.db.collection(CURSORS_COLLECTION).document(name).get().get('cursor')
+
+    # 取得スレッド
+
+    def _put(self, item):
+        """キューに空きができるまで待機（停止時は中断）"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch_loop(self, name):
+        connector = self.connectors[name]
+        status = self.status[name]
+        backoff = 1.0
+        cursor = None
+        cursor_loaded = False
+        while not self._stop.is_set():
+            try:
+                if not cursor_loaded:
+                    cursor = self.load_cursor(name)
+                    cursor_loaded = True
+                status.state = '同期中'
+                for raw_messages, next_cursor in connector.sync(cursor):
+                    messages = [connector.normalize(raw) for raw in raw_messages]
+                    status.fetched += len(messages)
+                    if not self._put((name, messages, next_cursor)):
+                        return
+                    if next_cursor is not None:
+                        cursor = next_cursor
+                status.state = '待機中'
+                status.last_sync = datetime.now()
+                status.last_error = None
+                backoff = 1.0
+                wait = self.poll_interval
+            except RateLimitedError as error:
+                status.state = '制限中'
+                status.last_error = str(error)
+                wait = error.retry_after
+            except Exception as error:
+                status.state = 'エラー'
+                status.last_error = str(error)
+                wait = backoff
+                backoff = min(backoff * 2, self.max_backoff)
+            self._wake[name].wait(wait)
+            self._wake[name].clear()
+
+    # 書き込みスレッド
+
+    def _write_loop(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            # 溜まっているページをまとめて1回で書き込む
+            count = len(batch[0][1])
+            while count < self.write_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                count += len(batch[-1][1])
+            self._write_with_retry(batch)
+
+    def _write_with_retry(self, batch):
+        """保存できるまで再試行（後続のページのカーソルが先に保存されて取りこぼさないよう、順序を保つ）"""
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                saved = self.write(batch)
+            except Exception as error:
+                for name, _, _ in batch:
+                    self.status[name].last_error = f"保存エラー: {error}"
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            if saved:
+                for listener in list(self._listeners):
+                    try:
+                        listener(saved)
+                    except Exception:
+                        # 通知先のエラーで取り込みを止めない
+                        pass
+            return
+
+    def write(self, pages):
+        """ページのメッセージとカーソルを1回の書き込みで保存し、新たに保存した (ドキュメントID, メッセージ) を返す
+
+        保存済みのメッセージは上書きしません。
+        """
+        messages = {}
+        cursors = {}
+        for name, page_messages, cursor in pages:
+            for message in page_messages:
+                messages[message_doc_id(name, message['external_id'])] = message
+            if cursor is not None:
+                cursors[name] = cursor
+
+        collection = self.db.collection(MESSAGES_COLLECTION)
+        # 既読などの状態が変わっている保存済みメッセージは残す
+        existing = {snapshot.id for snapshot in collection.get_all(messages) if snapshot.exists}
+        cursor_collection = self.db.collection(CURSORS_COLLECTION)
+        operations = [
+            ('set', collection.document(doc_id), message)
+            for doc_id, message in messages.items()
+            if doc_id not in existing
+        ] + [
+            ('set', cursor_collection.document(name), {'cursor': cursor, 'updated_at': time.time()})
+            for name, cursor in cursors.items()
+        ]
+        if operations:
+            self.db.bulk_write(operations)
+        if self.query_cache is not None and len(messages) > len(existing):
+            self.query_cache.invalidate(MESSAGES_COLLECTION)
+
+        saved = [(doc_id, message) for doc_id, message in messages.items() if doc_id not in existing]
+        for _, message in saved:
+            self.status[message['service']].saved += 1
+        return saved
+
+
+@st.cache_resource
+def get_connector_manager():
+    """外部サービス連携を取得し、有効なサービスがあれば取り込みを開始（プロセスにつき1回）"""
+    manager = ConnectorManager.from_config(get_database(), query_cache=get_query_cache())
+    if manager.available:
+        manager.start()
+    return manager
@@ -1,3 +1,213 @@
+"""
+BizFlow AI MVP - データベース
+開発用のダミーデータベースと、永続化用のSQLiteデータベースを提供します
+"""
+
+import heapq
+import json
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from types import MappingProxyType
+
+import streamlit as st
+from config.config import DATABASE_CONFIG
+from utils.query_cache import get_query_cache, make_query_key
+
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+# where句で利用できる比較演算子
+QUERY_OPERATORS = {
+    '==': lambda field_value, value: field_value == value,
+    '!=': lambda field_value, value: field_value != value,
+    '<': lambda field_value, value: field_value is not None and field_value < value,
+    '<=': lambda field_value, value: field_value is not None and field_value <= value,
+    '>': lambda field_value, value: field_value is not None and field_value > value,
+    '>=': lambda field_value, value: field_value is not None and field_value >= value,
+    'in': lambda field_value, value: field_value in value,
+    'array_contains': lambda field_value, value: isinstance(field_value, list) and value in field_value,
+}
+
+# ULIDで使用するCrockford Base32の文字（辞書順と数値の大小が一致）
+ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+class DocumentIdGenerator:
+    """作成順に並ぶドキュメントIDを生成（ULID形式: ミリ秒時刻48bit＋乱数80bit、26文字）
+    
+    同じミリ秒内では乱数部を1ずつ増やすため、同一プロセス内では必ず単調増加します。
+    プロセス間では乱数部により衝突せず、ミリ秒単位で作成順に並びます。
+    """
+    
+    RANDOM_BITS = 80
+    
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_time = 0
+        self._last_random = 0
+    
+    def __call__(self):
+        with self._lock:
+            now = int(self._clock() * 1000)
+            if now <= self._last_time:
+                # 同じミリ秒内（または時刻の巻き戻り）は前回の値を引き継いで増やす
+                now = self._last_time
+                self._last_random += 1
+                if self._last_random >> self.RANDOM_BITS:
+                    now += 1
+                    self._last_random = secrets.randbits(self.RANDOM_BITS - 1)
+            else:
+                # 上位1bitを空けておき、同じミリ秒内で増やしても桁あふれしないようにする
+                self._last_random = secrets.randbits(self.RANDOM_BITS - 1)
+            self._last_time = now
+            value = (now << self.RANDOM_BITS) | self._last_random
+        
+        chars = []
+        for _ in range(26):
+            chars.append(ID_ALPHABET[value & 31])
+            value >>= 5
+        return "".join(reversed(chars))
+
+generate_document_id = DocumentIdGenerator()
+
+class Query:
+    """コレクションへのクエリ（条件・並び順・件数・取得フィールドをバックエンドで処理）"""
+    
+    def __init__(self, collection, filters=(), orders=(), limit=None, offset=0, fields=None):
+        self.collection = collection
+        self.filters = tuple(filters)
+        self.orders = tuple(orders)
+        self.limit_count = limit
+        self.offset_count = offset
+        self.fields = fields
+    
+    def _copy(self, **changes):
+        params = {
+            'filters': self.filters,
+            'orders': self.orders,
+            'limit': self.limit_count,
+            'offset': self.offset_count,
+            'fields': self.fields
+        }
+        params.update(changes)
+        return Query(self.collection, **params)
+    
+    def where(self, field, op, value):
+        if op not in QUERY_OPERATORS:
+            raise ValueError(f"未対応の演算子です: {op}")
+        return self._copy(filters=self.filters + ((field, op, value),))
+    
+    def order_by(self, field, direction=ASCENDING):
+        return self._copy(orders=self.orders + ((field, direction),))
+    
+    def limit(self, count):
+        return self._copy(limit=count)
+    
+    def offset(self, count):
+        return self._copy(offset=count)
+    
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+    
+    def stream(self):
+        """条件に一致するドキュメントを取得"""
+        return self.collection._run_query(self)
+
+class QueryMixin:
+    """コレクションからクエリを組み立てるメソッド"""
+    
+    def where(self, field, op, value):
+        return Query(self).where(field, op, value)
+    
+    def order_by(self, field, direction=ASCENDING):
+        return Query(self).order_by(field, direction)
+    
+    def limit(self, count):
+        return Query(self).limit(count)
+    
+    def offset(self, count):
+        return Query(self).offset(count)
+    
+    def select(self, fields):
+        return Query(self).select(fields)
+
+def _index_key(value):
+    """索引のキー（リスト・辞書はJSON文字列に変換）"""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return value
+
+def _project(document, fields):
+    """指定フィールドのみを取り出す"""
+    if fields is None:
+        return document
+    return {field: document[field] for field in fields if field in document}
+
+class DocumentSnapshot:
+    """ドキュメントのスナップショット（ドキュメントごとにクラスを生成しない軽量オブジェクト）"""
+    
+    __slots__ = ('id', '_data')
+    
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+    
+    @property
+    def exists(self):
+        return self._data is not None
+    
+    @property
+    def data(self):
+        """コピーせずに参照できる読み取り専用ビュー"""
+        return MappingProxyType(self._data if self._data is not None else {})
+    
+    def get(self, field, default=None):
+        return self._data.get(field, default) if self._data is not None else default
+    
+    def to_dict(self):
+        """変更可能なコピーを取得"""
+        return dict(self._data) if self._data is not None else {}
+
+class WriteBatch:
+    """複数ドキュメントへの書き込みをまとめて1度にコミット（全て反映されるか、全く反映されない）"""
+    
+    def __init__(self, db):
+        self.db = db
+        self.operations = []
+    
+    def set(self, reference, document):
+        self.operations.append(('set', reference, document))
+        return self
+    
+    def update(self, reference, updates):
+        self.operations.append(('update', reference, updates))
+        return self
+    
+    def delete(self, reference):
+        self.operations.append(('delete', reference, None))
+        return self
+    
+    def commit(self):
+        """まとめた書き込みを反映"""
+        operations, self.operations = self.operations, []
+        if operations:
+            self.db._commit_batch(operations)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 例外発生時はコミットしない
+        if exc_type is None:
+            self.commit()
+        else:
+            self.operations = []
+
 class DummyDatabase:
     """開発用のダミーデータベース（Firebase接続できない場合）"""
     
@@ -8,78 +218,509 @@ class DummyDatabase:
             'contacts': {},
             'messages': {}
         }
+        # (コレクション名, フィールド名) -> 値 -> {ドキュメントID: None}
+        self.indexes = {}
+        self._lock = threading.RLock()
     
     def collection(self, collection_name):
-        return DummyCollection(self.data, collection_name)
+        return DummyCollection(self, collection_name)
+    
+    def batch(self):
+        return WriteBatch(self)
+    
+    def bulk_write(self, operations):
+        """大量の書き込みをまとめて反映（operations: [(種別, 参照, 内容), ...]）"""
+        self._commit_batch(operations)
+    
+    def _commit_batch(self, operations):
+        with self._lock:
+            # 反映途中で失敗した場合に戻せるよう、対象ドキュメントを退避
+            backup = {}
+            for _, reference, _ in operations:
+                key = (reference.collection_name, reference.doc_id)
+                if key not in backup:
+                    document = self._documents(reference.collection_name).get(reference.doc_id)
+                    backup[key] = None if document is None else dict(document)
+            try:
+                for kind, reference, payload in operations:
+                    if kind == 'set':
+                        self._write(reference.collection_name, reference.doc_id, payload)
+                    elif kind == 'update':
+                        self._update(reference.collection_name, reference.doc_id, payload)
+                    else:
+                        self._delete(reference.collection_name, reference.doc_id)
+            except Exception:
+                for (collection_name, doc_id), document in backup.items():
+                    if document is None:
+                        self._delete(collection_name, doc_id)
+                    else:
+                        self._write(collection_name, doc_id, document)
+                raise
+    
+    def _documents(self, collection_name):
+        return self.data.setdefault(collection_name, {})
+    
+    def _index(self, collection_name, field):
+        """フィールドの等価索引を取得（初回利用時に構築し、以降は書き込み時に更新）"""
+        key = (collection_name, field)
+        if key not in self.indexes:
+            index = {}
+            for doc_id, document in self._documents(collection_name).items():
+                if field in document:
+                    index.setdefault(_index_key(document[field]), {})[doc_id] = None
+            self.indexes[key] = index
+        return self.indexes[key]
+    
+    def _unindex(self, collection_name, doc_id, document):
+        for (indexed_collection, field), index in self.indexes.items():
+            if indexed_collection != collection_name or field not in document:
+                continue
+            bucket = index.get(_index_key(document[field]))
+            if bucket is not None:
+                bucket.pop(doc_id, None)
+    
+    def _reindex(self, collection_name, doc_id, document):
+        for (indexed_collection, field), index in self.indexes.items():
+            if indexed_collection == collection_name and field in document:
+                index.setdefault(_index_key(document[field]), {})[doc_id] = None
+    
+    def _write(self, collection_name, doc_id, document):
+        with self._lock:
+            documents = self._documents(collection_name)
+            if doc_id in documents:
+                self._unindex(collection_name, doc_id, documents[doc_id])
+            documents[doc_id] = document
+            self._reindex(collection_name, doc_id, document)
+    
+    def _update(self, collection_name, doc_id, updates):
+        with self._lock:
+            document = self._documents(collection_name).get(doc_id)
+            if document is None:
+                return
+            self._unindex(collection_name, doc_id, document)
+            document.update(updates)
+            self._reindex(collection_name, doc_id, document)
+    
+    def _delete(self, collection_name, doc_id):
+        with self._lock:
+            document = self._documents(collection_name).pop(doc_id, None)
+            if document is not None:
+                self._unindex(collection_name, doc_id, document)
 
-class DummyCollection:
+class DummyCollection(QueryMixin):
     """ダミーコレクション"""
     
-    def __init__(self, data, collection_name):
-        self.data = data
+    def __init__(self, db, collection_name):
+        self.db = db
+        self.data = db.data
         self.collection_name = collection_name
     
     def add(self, document):
         """ドキュメントを追加"""
-        doc_id = f"doc_{len(self.data[self.collection_name]) + 1}"
-        self.data[self.collection_name][doc_id] = document
-        return type('obj', (object,), {'id': doc_id})
+        doc_id = generate_document_id()
+        self.db._write(self.collection_name, doc_id, document)
+        return DocumentSnapshot(doc_id, document)
+    
+    def add_many(self, documents):
+        """複数のドキュメントをまとめて追加"""
+        with self.db._lock:
+            return [self.add(document) for document in documents]
     
     def document(self, doc_id):
-        return DummyDocument(self.data, self.collection_name, doc_id)
+        return DummyDocument(self.db, self.collection_name, doc_id)
     
-    def stream(self):
-        """全てのドキュメントを取得"""
-        results = []
-        for doc_id, doc_data in self.data[self.collection_name].items():
-            doc = type('obj', (object,), {
-                'id': doc_id,
-                'to_dict': lambda: doc_data
-            })
-            results.append(doc)
-        return results
+    def get_all(self, doc_ids):
+        """複数のドキュメントをまとめて取得（doc_ids の順）"""
+        with self.db._lock:
+            documents = self.db._documents(self.collection_name)
+            return [DocumentSnapshot(doc_id, documents.get(doc_id)) for doc_id in doc_ids]
+    
+    def stream(self, page_size=None):
+        """全てのドキュメントを順に返すジェネレーター
+        
+        メモリ上のデータをそのまま参照するため page_size は他のバックエンドとの互換用です。
+        """
+        documents = self.db._documents(self.collection_name)
+        with self.db._lock:
+            doc_ids = list(documents)
+        for doc_id in doc_ids:
+            doc_data = documents.get(doc_id)
+            if doc_data is not None:
+                yield DocumentSnapshot(doc_id, doc_data)
+    
+    def _run_query(self, query):
+        """クエリを実行（等価条件は索引を利用）"""
+        with self.db._lock:
+            documents = self.db._documents(self.collection_name)
+            filters = list(query.filters)
+            
+            # 最初の等価条件で候補を索引から絞り込む
+            equality = next((f for f in filters if f[1] == '==' and f[0] != 'id'), None)
+            if equality is not None:
+                filters.remove(equality)
+                candidate_ids = list(self.db._index(self.collection_name, equality[0]).get(_index_key(equality[2]), {}))
+            else:
+                candidate_ids = list(documents)
+            
+            rows = []
+            for doc_id in candidate_ids:
+                document = documents[doc_id]
+                if all(
+                    QUERY_OPERATORS[op](doc_id if field == 'id' else document.get(field), value)
+                    for field, op, value in filters
+                ):
+                    rows.append((doc_id, document))
+        
+        end = None if query.limit_count is None else query.offset_count + query.limit_count
+        
+        # IDのみの並び順で件数指定がある場合は、必要な件数だけを取り出す（最新N件など）
+        if end is not None and len(query.orders) == 1 and query.orders[0][0] == 'id':
+            select_rows = heapq.nlargest if query.orders[0][1] == DESCENDING else heapq.nsmallest
+            rows = select_rows(end, rows, key=lambda row: row[0])
+            query = query._copy(orders=())
+        
+        # 並び順（後ろの条件から安定ソート）
+        for field, direction in reversed(query.orders):
+            rows.sort(
+                key=lambda row: _sort_key(row[0] if field == 'id' else row[1].get(field)),
+                reverse=direction == DESCENDING
+            )
+        
+        return [
+            DocumentSnapshot(doc_id, _project(document, query.fields))
+            for doc_id, document in rows[query.offset_count:end]
+        ]
+
+def _sort_key(value):
+    """None を先頭にして比較できるようにする"""
+    return (value is not None, value if value is not None else 0)
 
 class DummyDocument:
     """ダミードキュメント"""
     
-    def __init__(self, data, collection_name, doc_id):
-        self.data = data
+    def __init__(self, db, collection_name, doc_id):
+        self.db = db
+        self.data = db.data
         self.collection_name = collection_name
         self.doc_id = doc_id
     
     def set(self, document):
         """ドキュメントを設定"""
-        self.data[self.collection_name][self.doc_id] = document
+        self.db._write(self.collection_name, self.doc_id, document)
     
     def get(self):
         """ドキュメントを取得"""
-        doc_data = self.data[self.collection_name].get(self.doc_id, {})
-        return type('obj', (object,), {
-            'exists': bool(doc_data),
-            'to_dict': lambda: doc_data
-        })
+        return DocumentSnapshot(self.doc_id, self.db._documents(self.collection_name).get(self.doc_id))
     
     def update(self, updates):
         """ドキュメントを更新"""
-        if self.doc_id in self.data[self.collection_name]:
-            self.data[self.collection_name][self.doc_id].update(updates)
+        self.db._update(self.collection_name, self.doc_id, updates)
     
     def delete(self):
         """ドキュメントを削除"""
-        if self.doc_id in self.data[self.collection_name]:
-            del self.data[self.collection_name][self.doc_id]
+        self.db._delete(self.collection_name, self.doc_id)
+
+class SQLiteDatabase:
+    """SQLiteデータベース（WALモード・コネクションプール付き）"""
+    
+    # 検索用に列として保持するフィールド
+    INDEXED_FIELDS = ('status', 'project', 'user_id')
+    
+    def __init__(self, path, pool_size=5):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self._pool = queue.Queue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        
+        with self.connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "collection TEXT NOT NULL, doc_id TEXT NOT NULL, data TEXT NOT NULL, "
+                "status TEXT, project TEXT, user_id TEXT, "
+                "PRIMARY KEY (collection, doc_id))"
+            )
+            for field in self.INDEXED_FIELDS:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_documents_{field} ON documents (collection, {field})"
+                )
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """プールからコネクションを借りる"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+    
+    @contextmanager
+    def transaction(self):
+        """書き込みトランザクション"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
+    def collection(self, collection_name):
+        return SQLiteCollection(self, collection_name)
+    
+    def batch(self):
+        return WriteBatch(self)
+    
+    def bulk_write(self, operations):
+        """大量の書き込みをまとめて反映（operations: [(種別, 参照, 内容), ...]）"""
+        self._commit_batch(operations)
+    
+    def _commit_batch(self, operations):
+        with self.transaction() as conn:
+            for kind, reference, payload in operations:
+                if kind == 'set':
+                    reference._write(conn, payload)
+                elif kind == 'update':
+                    reference._update(conn, payload)
+                else:
+                    reference._delete(conn)
+
+# where句の演算子とSQLの対応
+SQL_OPERATORS = {'==': '=', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+class SQLiteCollection(QueryMixin):
+    """SQLiteコレクション"""
+    
+    def __init__(self, db, collection_name):
+        self.db = db
+        self.collection_name = collection_name
+    
+    def add(self, document):
+        """ドキュメントを追加"""
+        doc_id = generate_document_id()
+        self.document(doc_id).set(document)
+        return DocumentSnapshot(doc_id, document)
+    
+    def add_many(self, documents):
+        """複数のドキュメントを1トランザクションで追加"""
+        snapshots = [DocumentSnapshot(generate_document_id(), document) for document in documents]
+        with self.db.transaction() as conn:
+            for snapshot in snapshots:
+                self.document(snapshot.id)._write(conn, snapshot._data)
+        return snapshots
+    
+    def document(self, doc_id):
+        return SQLiteDocument(self.db, self.collection_name, doc_id)
+    
+    def get_all(self, doc_ids, chunk_size=500):
+        """複数のドキュメントをまとめて取得（doc_ids の順）"""
+        doc_ids = list(doc_ids)
+        found = {}
+        with self.db.connection() as conn:
+            for start in range(0, len(doc_ids), chunk_size):
+                chunk = doc_ids[start:start + chunk_size]
+                rows = conn.execute(
+                    f"SELECT doc_id, data FROM documents WHERE collection = ? "
+                    f"AND doc_id IN ({', '.join('?' * len(chunk))})",
+                    [self.collection_name, *chunk]
+                ).fetchall()
+                found.update((doc_id, json.loads(data)) for doc_id, data in rows)
+        return [DocumentSnapshot(doc_id, found.get(doc_id)) for doc_id in doc_ids]
+    
+    def stream(self, page_size=500):
+        """全てのドキュメントを順に返すジェネレーター（rowid によるページ単位の取得）"""
+        last_rowid = 0
+        while True:
+            with self.db.connection() as conn:
+                rows = conn.execute(
+                    "SELECT rowid, doc_id, data FROM documents "
+                    "WHERE collection = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (self.collection_name, last_rowid, page_size)
+                ).fetchall()
+            for rowid, doc_id, data in rows:
+                yield DocumentSnapshot(doc_id, json.loads(data))
+            if len(rows) < page_size:
+                return
+            last_rowid = rows[-1][0]
+    
+    def _column(self, field):
+        """フィールドに対応するSQL式（索引列があれば利用）"""
+        if field == 'id':
+            return "doc_id", []
+        if field in SQLiteDatabase.INDEXED_FIELDS:
+            return field, []
+        return "json_extract(data, ?)", [f"$.{field}"]
+    
+    def _run_query(self, query):
+        """クエリをSQLに変換して実行"""
+        conditions = ["collection = ?"]
+        params = [self.collection_name]
+        
+        for field, op, value in query.filters:
+            column, column_params = self._column(field)
+            if op == 'in':
+                conditions.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params += column_params + [_index_value(v) for v in value]
+            elif op == 'array_contains':
+                conditions.append("EXISTS (SELECT 1 FROM json_each(data, ?) WHERE json_each.value = ?)")
+                params += [f"$.{field}", value]
+            else:
+                conditions.append(f"{column} {SQL_OPERATORS[op]} ?")
+                params += column_params + [_index_value(value)]
+        
+        if query.fields is None:
+            select = "data"
+            select_params = []
+        else:
+            # 取得フィールドのみをJSONとして組み立てる
+            select = "json_object(" + ", ".join("?, json_extract(data, ?)" for _ in query.fields) + ")"
+            select_params = [param for field in query.fields for param in (field, f"$.{field}")]
+        
+        sql = f"SELECT doc_id, {select} FROM documents WHERE {' AND '.join(conditions)}"
+        
+        order_clauses = []
+        for field, direction in query.orders:
+            column, column_params = self._column(field)
+            order_clauses.append(f"{column} {'DESC' if direction == DESCENDING else 'ASC'}")
+            params += column_params
+        if not query.orders or query.orders[-1][0] != 'id':
+            # IDは一意のため、IDで並べる場合は主キーの索引をそのまま利用できる
+            order_clauses.append("rowid")
+        sql += " ORDER BY " + ", ".join(order_clauses)
+        
+        if query.limit_count is not None or query.offset_count:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if query.limit_count is None else query.limit_count, query.offset_count]
+        
+        with self.db.connection() as conn:
+            rows = conn.execute(sql, select_params + params).fetchall()
+        return [DocumentSnapshot(doc_id, json.loads(data)) for doc_id, data in rows]
+
+class SQLiteDocument:
+    """SQLiteドキュメント"""
+    
+    def __init__(self, db, collection_name, doc_id):
+        self.db = db
+        self.collection_name = collection_name
+        self.doc_id = doc_id
+    
+    def _write(self, conn, document):
+        # INSERT OR REPLACE は行を削除して追加し直すため rowid が変わり、rowid 順の stream・クエリで
+        # 更新したドキュメントが重複・欠落する。既存の行は rowid を保ったまま上書きする
+        conn.execute(
+            "INSERT INTO documents (collection, doc_id, data, status, project, user_id) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (collection, doc_id) DO UPDATE SET "
+            "data = excluded.data, status = excluded.status, project = excluded.project, user_id = excluded.user_id",
+            (
+                self.collection_name, self.doc_id, json.dumps(document, ensure_ascii=False, default=str),
+                *(_index_value(document.get(field)) for field in SQLiteDatabase.INDEXED_FIELDS)
+            )
+        )
+    
+    def _read(self, conn):
+        row = conn.execute(
+            "SELECT data FROM documents WHERE collection = ? AND doc_id = ?",
+            (self.collection_name, self.doc_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _update(self, conn, updates):
+        document = self._read(conn)
+        if document is not None:
+            document.update(updates)
+            self._write(conn, document)
+    
+    def _delete(self, conn):
+        conn.execute(
+            "DELETE FROM documents WHERE collection = ? AND doc_id = ?",
+            (self.collection_name, self.doc_id)
+        )
+    
+    def set(self, document):
+        """ドキュメントを設定"""
+        with self.db.transaction() as conn:
+            self._write(conn, document)
+    
+    def get(self):
+        """ドキュメントを取得"""
+        with self.db.connection() as conn:
+            return DocumentSnapshot(self.doc_id, self._read(conn))
+    
+    def update(self, updates):
+        """ドキュメントを更新"""
+        with self.db.transaction() as conn:
+            self._update(conn, updates)
+    
+    def delete(self):
+        """ドキュメントを削除"""
+        with self.db.transaction() as conn:
+            self._delete(conn)
+
+def _index_value(value):
+    """索引列に格納する値（文字列以外はJSON化）"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+@st.cache_resource
+def get_database():
+    """設定に応じたデータベースを取得（全セッション共通）"""
+    if DATABASE_CONFIG["backend"] == "sqlite":
+        return SQLiteDatabase(DATABASE_CONFIG["sqlite_path"], pool_size=DATABASE_CONFIG["pool_size"])
+    if DATABASE_CONFIG["backend"] == "firestore":
+        from utils.firestore_database import FirestoreDatabase
+        return FirestoreDatabase.from_config(DATABASE_CONFIG)
+    return DummyDatabase()
 
 # データベースヘルパー関数
-def get_user_data(db, collection_name, user_id):
-    """ユーザーのデータを取得"""
-    try:
-        docs = db.collection(collection_name).stream()
+def get_user_data(db, collection_name, user_id, filters=None, order_by=None, limit=None, offset=0, fields=None,
+                  use_cache=True):
+    """ユーザーのデータを取得（条件・並び順・件数・取得フィールドはデータベース側で処理）
+    
+    filters: [(フィールド, 演算子, 値), ...]
+    order_by: フィールド名、または (フィールド名, ASCENDING/DESCENDING)
+    結果はクエリキャッシュに保存し、*_user_data による書き込みで無効化されます。
+    """
+    def load():
+        query = db.collection(collection_name)
+        if user_id is not None:
+            query = query.where('user_id', '==', user_id)
+        for field, op, value in filters or []:
+            query = query.where(field, op, value)
+        if order_by:
+            field, direction = (order_by, ASCENDING) if isinstance(order_by, str) else order_by
+            query = query.order_by(field, direction=direction)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        if fields is not None:
+            query = query.select(fields)
+        
         results = []
-        for doc in docs:
+        for doc in query.stream():
             doc_data = doc.to_dict()
             doc_data['id'] = doc.id
             results.append(doc_data)
         return results
+    
+    try:
+        if not use_cache:
+            return load()
+        key = make_query_key(user_id, filters, order_by, limit, offset, fields)
+        # キャッシュ済みの結果を呼び出し側で変更しても影響しないようコピーを返す
+        return [dict(row) for row in get_query_cache().get_or_load(collection_name, key, load)]
     except Exception as e:
         st.error(f"データ取得エラー: {str(e)}")
         return []
@@ -92,6 +733,8 @@ def save_user_data(db, collection_name, doc_id, data):
     except Exception as e:
         st.error(f"データ保存エラー: {str(e)}")
         return False
+    finally:
+        get_query_cache().invalidate(collection_name)
 
 def update_user_data(db, collection_name, doc_id, updates):
     """ユーザーのデータを更新"""
@@ -101,6 +744,8 @@ def update_user_data(db, collection_name, doc_id, updates):
     except Exception as e:
         st.error(f"データ更新エラー: {str(e)}")
         return False
+    finally:
+        get_query_cache().invalidate(collection_name)
 
 def delete_user_data(db, collection_name, doc_id):
     """ユーザーのデータを削除"""
@@ -109,4 +754,46 @@ def delete_user_data(db, collection_name, doc_id):
         return True
     except Exception as e:
         st.error(f"データ削除エラー: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+    finally:
+        get_query_cache().invalidate(collection_name)
+
+def save_many_user_data(db, collection_name, documents):
+    """複数のデータをまとめて保存（documents: {ドキュメントID: データ}）"""
+    try:
+        collection = db.collection(collection_name)
+        db.bulk_write([
+            ('set', collection.document(doc_id), data) for doc_id, data in documents.items()
+        ])
+        return True
+    except Exception as e:
+        st.error(f"データ保存エラー: {str(e)}")
+        return False
+    finally:
+        get_query_cache().invalidate(collection_name)
+
+def update_many_user_data(db, collection_name, updates):
+    """複数のデータをまとめて更新（updates: {ドキュメントID: 更新内容}）"""
+    try:
+        collection = db.collection(collection_name)
+        db.bulk_write([
+            ('update', collection.document(doc_id), changes) for doc_id, changes in updates.items()
+        ])
+        return True
+    except Exception as e:
+        st.error(f"データ更新エラー: {str(e)}")
+        return False
+    finally:
+        get_query_cache().invalidate(collection_name)
+
+def delete_many_user_data(db, collection_name, doc_ids):
+    """複数のデータをまとめて削除"""
+    try:
+        collection = db.collection(collection_name)
+        db.bulk_write([('delete', collection.document(doc_id), None) for doc_id in doc_ids])
+        return True
+    except Exception as e:
+        st.error(f"データ削除エラー: {str(e)}")
+        return False
+    finally:
+        get_query_cache().invalidate(collection_name)
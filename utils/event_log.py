@@ -0,0 +1,144 @@
+"""
+BizFlow AI MVP - タスクイベントログ
+タスクの追加・更新・削除を追記専用のログに記録し、定期的なスナップショットで古いイベントを圧縮します
+"""
+
+import threading
+import time
+
+import streamlit as st
+from config.config import EVENT_LOG_CONFIG
+
+
+def apply_event(tasks, event):
+    """イベントをタスクの辞書（ID -> タスク）に適用"""
+    if event['type'] == 'task_created':
+        tasks[event['task_id']] = event['changes']
+    elif event['type'] == 'task_deleted':
+        tasks.pop(event['task_id'], None)
+    elif event['task_id'] in tasks:
+        tasks[event['task_id']] = {**tasks[event['task_id']], **event['changes']}
+    return tasks
+
+
+class TaskEventLog:
+    """タスク変更の追記専用ログ
+
+    オフセットはイベントごとに1ずつ増えます。snapshot_interval 件ごとにボード全体のスナップショットを取り、
+    retained_snapshots 個より古いスナップショットとそれ以前のイベントを破棄します。
+    """
+
+    def __init__(self, snapshot_interval=500, retained_snapshots=2):
+        self.snapshot_interval = snapshot_interval
+        self.retained_snapshots = retained_snapshots
+        self._lock = threading.Lock()
+        # start_offset より後のイベント（オフセット順）
+        self._events = []
+        # {'offset': スナップショット時点のオフセット, 'tasks': {ID: タスク}}
+        self._snapshots = []
+        self.start_offset = 0
+        self.offset = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def append(self, event_type, task_id, user=None, changes=None, detail=None):
+        """イベントを追記"""
+        with self._lock:
+            self.offset += 1
+            event = {
+                'offset': self.offset,
+                'type': event_type,
+                'task_id': task_id,
+                'user': user,
+                'at': time.time(),
+                # 再生用の変更内容（作成時はタスク全体）
+                'changes': changes or {},
+                # 表示用の補足（移動前後のステータス・コメント本文など）
+                'detail': detail or {}
+            }
+            self._events.append(event)
+            return event
+
+    def needs_snapshot(self):
+        last_offset = self._snapshots[-1]['offset'] if self._snapshots else None
+        return last_offset is None or self.offset - last_offset >= self.snapshot_interval
+
+    def snapshot(self, tasks):
+        """現在のオフセットのスナップショットを保存し、古いイベントを圧縮
+
+        タスクは変更時に置き換わる（コピーオンライト）ため、辞書の浅いコピーで十分です。
+        """
+        with self._lock:
+            self._snapshots.append({'offset': self.offset, 'tasks': dict(tasks)})
+            if len(self._snapshots) > self.retained_snapshots:
+                del self._snapshots[:-self.retained_snapshots]
+                # 最も古いスナップショット以前のイベントは再生に不要
+                oldest = self._snapshots[0]['offset']
+                del self._events[:oldest - self.start_offset]
+                self.start_offset = oldest
+
+    def since(self, offset, limit=None):
+        """指定したオフセットより後のイベント（圧縮済みの範囲を含む場合はNone）"""
+        with self._lock:
+            if offset < self.start_offset:
+                return None
+            start = offset - self.start_offset
+            stop = None if limit is None else start + limit
+            return self._events[start:stop]
+
+    def catch_up(self, offset):
+        """クライアントが最新状態に追いつくための (スナップショット, イベント)
+
+        オフセット以降のイベントが残っていればスナップショットはNone、
+        圧縮済みの場合は最新のスナップショットとそれ以降のイベントを返します。
+        """
+        events = self.since(offset)
+        if events is not None:
+            return None, events
+        with self._lock:
+            snapshot = self._snapshots[-1]
+            return snapshot, self._events[snapshot['offset'] - self.start_offset:]
+
+    def recent(self, limit=20, event_types=None):
+        """新しい順のイベント"""
+        with self._lock:
+            events = []
+            for event in reversed(self._events):
+                if event_types is None or event['type'] in event_types:
+                    events.append(event)
+                    if len(events) >= limit:
+                        break
+            return events
+
+    def replay(self):
+        """最新のスナップショットとそれ以降のイベントから現在のタスクを復元"""
+        with self._lock:
+            if self._snapshots:
+                tasks = dict(self._snapshots[-1]['tasks'])
+                base = self._snapshots[-1]['offset']
+            else:
+                tasks = {}
+                base = self.start_offset
+            events = self._events[base - self.start_offset:]
+        for event in events:
+            apply_event(tasks, event)
+        return tasks
+
+    def stats(self):
+        """保持しているイベント・スナップショットの件数"""
+        return {
+            'offset': self.offset,
+            'start_offset': self.start_offset,
+            'events': len(self._events),
+            'snapshots': len(self._snapshots)
+        }
+
+
+@st.cache_resource
+def get_task_event_log():
+    """全セッション共通のタスクイベントログを取得"""
+    return TaskEventLog(
+        snapshot_interval=EVENT_LOG_CONFIG["snapshot_interval"],
+        retained_snapshots=EVENT_LOG_CONFIG["retained_snapshots"]
+    )
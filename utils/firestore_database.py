@@ -0,0 +1,255 @@
+"""
+BizFlow AI MVP - Firestoreデータベース
+config.FIREBASE_CONFIG の認証情報で Firestore に接続し、DummyDatabase / SQLiteDatabase と
+同じコレクション・ドキュメントのインターフェースを提供します
+
+ローカルのエミュレーターで動作確認する場合:
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 DATABASE_BACKEND=firestore streamlit run main.py
+    python benchmarks/database_backends.py --firestore-emulator localhost:8080
+"""
+
+import os
+
+import firebase_admin
+from firebase_admin import credentials
+from firebase_admin import firestore as firebase_firestore
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.bulk_writer import BulkWriterUpdateOperation
+from google.rpc import code_pb2
+
+from config.config import FIREBASE_CONFIG
+from utils.database import DocumentSnapshot, QueryMixin, WriteBatch, generate_document_id
+
+# Firestoreの1バッチ（アトミックな書き込み）あたりの最大件数
+MAX_BATCH_WRITES = 500
+
+# ドキュメントIDを表すフィールドパス
+DOCUMENT_ID = '__name__'
+
+# where句の演算子（Firestoreの表記に変換）
+FIRESTORE_OPERATORS = {
+    '==': '==',
+    '!=': '!=',
+    '<': '<',
+    '<=': '<=',
+    '>': '>',
+    '>=': '>=',
+    'in': 'in',
+    'array_contains': 'array-contains',
+}
+
+def create_firestore_client(emulator_host=None, config=FIREBASE_CONFIG):
+    """Firestoreクライアントを生成（エミュレーター利用時は認証情報なしで接続）"""
+    if emulator_host:
+        os.environ.setdefault("FIRESTORE_EMULATOR_HOST", emulator_host)
+        return firestore.Client(project=config.get("project_id") or "demo-bizflow")
+    
+    # firebase_admin のアプリはプロセスで1つだけ初期化する
+    try:
+        app = firebase_admin.get_app()
+    except ValueError:
+        app = firebase_admin.initialize_app(credentials.Certificate(dict(config)))
+    return firebase_firestore.client(app)
+
+class FirestoreDatabase:
+    """Firestoreデータベース（クライアントと接続をプロセス内で共有）"""
+    
+    def __init__(self, client, page_size=500, bulk_retries=5):
+        self.client = client
+        self.page_size = page_size
+        self.bulk_retries = bulk_retries
+    
+    @classmethod
+    def from_config(cls, config):
+        """DATABASE_CONFIG からデータベースを構築"""
+        client = create_firestore_client(config.get("firestore_emulator_host"))
+        return cls(client, page_size=config.get("firestore_page_size", 500))
+    
+    def collection(self, collection_name):
+        return FirestoreCollection(self, collection_name)
+    
+    def batch(self):
+        return WriteBatch(self)
+    
+    def _commit_batch(self, operations):
+        """まとめた書き込みをアトミックに反映
+        
+        他のバックエンドと同様、存在しないドキュメントの更新は飛ばします。更新を含む場合は
+        トランザクション内で対象の有無を確認してから書き込みます。
+        """
+        if len(operations) > MAX_BATCH_WRITES:
+            raise ValueError(f"1回のバッチで書き込めるのは{MAX_BATCH_WRITES}件までです")
+        if not any(kind == 'update' for kind, _, _ in operations):
+            batch = self.client.batch()
+            self._stage(batch, operations)
+            batch.commit()
+            return
+        
+        @firestore.transactional
+        def commit(transaction):
+            refs = [reference.ref for kind, reference, _ in operations if kind == 'update']
+            existing = {
+                snapshot.reference.path
+                for snapshot in self.client.get_all(refs, transaction=transaction)
+                if snapshot.exists
+            }
+            # 同じバッチ内で先に作成・削除されたドキュメントも反映して判定する
+            staged = []
+            for kind, reference, payload in operations:
+                if kind == 'set':
+                    existing.add(reference.ref.path)
+                elif kind == 'delete':
+                    existing.discard(reference.ref.path)
+                elif reference.ref.path not in existing:
+                    continue
+                staged.append((kind, reference, payload))
+            self._stage(transaction, staged)
+        
+        commit(self.client.transaction())
+    
+    @staticmethod
+    def _stage(writer, operations):
+        """バッチまたはトランザクションに書き込みを積む"""
+        for kind, reference, payload in operations:
+            if kind == 'set':
+                writer.set(reference.ref, payload)
+            elif kind == 'update':
+                writer.update(reference.ref, payload)
+            else:
+                writer.delete(reference.ref)
+    
+    def bulk_write(self, operations):
+        """BulkWriter で大量の書き込みを並列に反映
+        
+        バッチと異なりアトミックではありません。存在しないドキュメントの更新は再試行せずに飛ばし、
+        その他の失敗は bulk_retries 回まで再試行して、それでも失敗したものがあれば例外を送出します。
+        """
+        failures = []
+        
+        def on_write_error(failure, writer):
+            if failure.code == code_pb2.NOT_FOUND and isinstance(failure.operation, BulkWriterUpdateOperation):
+                return False
+            if failure.attempts < self.bulk_retries:
+                return True
+            failures.append(failure)
+            return False
+        
+        writer = self.client.bulk_writer()
+        writer.on_write_error(on_write_error)
+        self._stage(writer, operations)
+        # 全ての書き込みの完了を待つ
+        writer.close()
+        
+        if failures:
+            raise RuntimeError(f"{len(failures)}件の書き込みに失敗しました（{failures[0].message}）")
+
+class FirestoreCollection(QueryMixin):
+    """Firestoreコレクション"""
+    
+    def __init__(self, db, collection_name):
+        self.db = db
+        self.collection_name = collection_name
+        self.ref = db.client.collection(collection_name)
+    
+    def add(self, document):
+        """ドキュメントを追加"""
+        doc_id = generate_document_id()
+        self.ref.document(doc_id).set(document)
+        return DocumentSnapshot(doc_id, document)
+    
+    def add_many(self, documents):
+        """複数のドキュメントをまとめて追加（MAX_BATCH_WRITES 件ごとにアトミックに反映）"""
+        snapshots = [DocumentSnapshot(generate_document_id(), document) for document in documents]
+        for start in range(0, len(snapshots), MAX_BATCH_WRITES):
+            self.db._commit_batch([
+                ('set', self.document(snapshot.id), snapshot._data)
+                for snapshot in snapshots[start:start + MAX_BATCH_WRITES]
+            ])
+        return snapshots
+    
+    def document(self, doc_id):
+        return FirestoreDocument(self.db, self.collection_name, doc_id)
+    
+    def get_all(self, doc_ids):
+        """複数のドキュメントを1回のリクエストで取得（doc_ids の順）"""
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return []
+        found = {
+            snapshot.id: snapshot.to_dict()
+            for snapshot in self.db.client.get_all([self.ref.document(doc_id) for doc_id in doc_ids])
+        }
+        return [DocumentSnapshot(doc_id, found.get(doc_id)) for doc_id in doc_ids]
+    
+    def stream(self, page_size=None):
+        """全てのドキュメントを順に返すジェネレーター（ドキュメントIDによるページ単位の取得）"""
+        page_size = page_size or self.db.page_size
+        query = self.ref.order_by(DOCUMENT_ID).limit(page_size)
+        last_snapshot = None
+        while True:
+            page = query if last_snapshot is None else query.start_after(last_snapshot)
+            # ページを読み切ってから返し、利用側の処理中に読み取りストリームを開いたままにしない
+            snapshots = list(page.stream())
+            for snapshot in snapshots:
+                yield DocumentSnapshot(snapshot.id, snapshot.to_dict())
+            if len(snapshots) < page_size:
+                return
+            last_snapshot = snapshots[-1]
+    
+    def _run_query(self, query):
+        """クエリをFirestoreのクエリに変換して実行
+        
+        等価条件と別フィールドの並び順を組み合わせる場合は、Firestore側に複合インデックスが必要です。
+        """
+        firestore_query = self.ref
+        for field, op, value in query.filters:
+            if field == 'id':
+                field = DOCUMENT_ID
+                value = [self.ref.document(v) for v in value] if op == 'in' else self.ref.document(value)
+            firestore_query = firestore_query.where(filter=FieldFilter(field, FIRESTORE_OPERATORS[op], value))
+        
+        for field, direction in query.orders:
+            firestore_query = firestore_query.order_by(
+                DOCUMENT_ID if field == 'id' else field, direction=direction
+            )
+        
+        if query.offset_count:
+            firestore_query = firestore_query.offset(query.offset_count)
+        if query.limit_count is not None:
+            firestore_query = firestore_query.limit(query.limit_count)
+        if query.fields is not None:
+            firestore_query = firestore_query.select(query.fields)
+        
+        return [DocumentSnapshot(snapshot.id, snapshot.to_dict()) for snapshot in firestore_query.stream()]
+
+class FirestoreDocument:
+    """Firestoreドキュメント"""
+    
+    def __init__(self, db, collection_name, doc_id):
+        self.db = db
+        self.collection_name = collection_name
+        self.doc_id = doc_id
+        self.ref = db.client.collection(collection_name).document(doc_id)
+    
+    def set(self, document):
+        """ドキュメントを設定"""
+        self.ref.set(document)
+    
+    def get(self):
+        """ドキュメントを取得"""
+        return DocumentSnapshot(self.doc_id, self.ref.get().to_dict())
+    
+    def update(self, updates):
+        """ドキュメントを更新"""
+        try:
+            self.ref.update(updates)
+        except NotFound:
+            # 他のバックエンドと同様、存在しないドキュメントの更新は無視する
+            pass
+    
+    def delete(self):
+        """ドキュメントを削除"""
+        self.ref.delete()
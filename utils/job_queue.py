@@ -0,0 +1,509 @@
+"""
+BizFlow AI MVP - 永続ジョブキュー
+時間のかかる処理（AIによるタスク生成・要約・返信案作成など）をSQLiteに保存したジョブとして
+ワーカーで実行します。画面の操作をブロックせず、ページを移動しても処理は継続されます。
+
+    queued → running → succeeded → （反映）完了 / apply_failed
+               │        └→ failed
+               │ 失敗時は指数バックオフで queued に戻して再試行（max_attempts 回まで）
+
+- priority の大きいジョブから順に実行
+- 同じ idempotency_key の未完了のジョブは1件だけ登録（完了までの間は既存のジョブを返す）
+- ワーカーはリース（lease_seconds）付きでジョブを取得し、プロセスが停止した場合も
+  リース切れ後に他のワーカーが再実行
+- 実行結果はジョブに保存し、アプリのプロセスで対象のタスク・メッセージへ反映（apply）
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import streamlit as st
+from config.config import JOB_QUEUE_CONFIG
+
+# 優先度（大きいほど先に実行）
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+# apply_failed: AIの実行は成功したが、結果をタスク・メッセージへ反映できなかったジョブ
+FINISHED_STATUSES = ('succeeded', 'failed', 'apply_failed', 'cancelled')
+
+JSON_COLUMNS = ('payload', 'result', 'target', 'progress')
+
+# 後から追加した列（既存のキューファイルには ALTER TABLE で追加）
+ADDED_COLUMNS = {
+    'progress': 'TEXT',
+    'apply_expires_at': 'REAL'
+}
+
+
+class JobQueue:
+    """SQLiteに保存するジョブキュー（複数スレッド・複数プロセスから利用可能）"""
+
+    def __init__(self, db_path, max_attempts=3, lease_seconds=300.0, base_delay=2.0, max_delay=300.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._local = threading.local()
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "kind TEXT NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "priority INTEGER NOT NULL DEFAULT 0, "
+                "idempotency_key TEXT UNIQUE, "
+                "status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "max_attempts INTEGER NOT NULL, "
+                "run_after REAL NOT NULL, "
+                "lease_owner TEXT, "
+                "lease_expires_at REAL, "
+                "result TEXT, "
+                "progress TEXT, "
+                "error TEXT, "
+                "target TEXT, "
+                "apply_owner TEXT, "
+                "apply_expires_at REAL, "
+                "applied_at REAL, "
+                "created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, run_after, id)")
+
+    @classmethod
+    def from_config(cls, config=JOB_QUEUE_CONFIG):
+        return cls(config["path"], max_attempts=config["max_attempts"], lease_seconds=config["lease_seconds"])
+
+    def _connection(self):
+        # sqlite3 の接続はスレッドごとに作成
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """書き込みロックを先に取得するトランザクション（複数プロセス間でも取得処理が競合しない）"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _to_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        job['finished'] = job['status'] in FINISHED_STATUSES and (
+            job['status'] != 'succeeded' or job['applied_at'] is not None
+        )
+        return job
+
+    @staticmethod
+    def _dumps(value):
+        return None if value is None else json.dumps(value, ensure_ascii=False, default=str)
+
+    def subscribe(self, listener):
+        """ジョブの状態が変わるたびに listener(job) を呼び出す（このプロセス内の変更のみ）"""
+        with self._listeners_lock:
+            self._listeners.append(listener)
+
+    def _notify(self, job):
+        if job is None:
+            return
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(job)
+
+    def enqueue(self, kind, payload, priority=PRIORITY_NORMAL, idempotency_key=None, target=None,
+                max_attempts=None, delay=0.0):
+        """ジョブを登録（同じ idempotency_key の未完了のジョブがある場合はそのジョブを返す）
+
+        既存のジョブが完了済み（結果の反映・失敗・キャンセルを含む）の場合は、キーを新しいジョブに移して
+        最初から実行します（タスクを削除した後の再生成など）。
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if idempotency_key is not None:
+                row = conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+                if row is not None:
+                    existing = self._to_job(row)
+                    if not existing['finished']:
+                        return existing
+                    conn.execute("UPDATE jobs SET idempotency_key = NULL WHERE id = ?", (row['id'],))
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, payload, priority, idempotency_key, status, max_attempts, run_after, "
+                "target, created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (kind, self._dumps(payload), priority, idempotency_key,
+                 max_attempts or self.max_attempts, now + delay, self._dumps(target), now, now)
+            ).lastrowid
+            job = self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        self._notify(job)
+        return job
+
+    def claim(self, worker_id, kinds=None):
+        """実行可能なジョブを1件取得して running にする（無い場合はNone）"""
+        now = time.time()
+        with self._transaction() as conn:
+            # リースが切れたジョブ（ワーカーが停止した場合）を再実行の対象に戻す
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                "error = 'ワーカーが応答しませんでした', lease_owner = NULL, updated_at = ? "
+                "WHERE status = 'running' AND lease_expires_at <= ?",
+                (now, now)
+            )
+            sql = "SELECT * FROM jobs WHERE status = 'queued' AND run_after <= ?"
+            params = [now]
+            if kinds:
+                sql += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+                params.extend(kinds)
+            row = conn.execute(sql + " ORDER BY priority DESC, run_after, id LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row['id'])
+            )
+            job = self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone())
+        self._notify(job)
+        return job
+
+    def report_progress(self, job_id, worker_id, progress):
+        """実行中のジョブの途中経過を保存し、リースを延長（リースを失っていた場合はFalse）"""
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET progress = ?, lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (self._dumps(progress), now + self.lease_seconds, now, job_id, worker_id)
+            ).rowcount
+        return bool(updated)
+
+    def complete(self, job_id, worker_id, result):
+        """ジョブの成功を記録（リースを失っていた場合はFalse）"""
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, progress = NULL, error = NULL, "
+                "lease_owner = NULL, updated_at = ? WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (self._dumps(result), now, job_id, worker_id)
+            ).rowcount
+            job = self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        if updated:
+            self._notify(job)
+        return bool(updated)
+
+    def fail(self, job_id, worker_id, error, retryable=True):
+        """ジョブの失敗を記録（試行回数が残っていれば待機後に再実行）"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            if retryable and row['attempts'] < row['max_attempts']:
+                delay = min(self.max_delay, self.base_delay * 2 ** (row['attempts'] - 1))
+                status, run_after = 'queued', now + delay
+            else:
+                status, run_after = 'failed', now
+            conn.execute(
+                "UPDATE jobs SET status = ?, run_after = ?, error = ?, progress = NULL, lease_owner = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (status, run_after, str(error), now, job_id)
+            )
+            job = self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        self._notify(job)
+        return True
+
+    def claim_unapplied(self, owner, limit=20):
+        """成功済みで結果が未反映のジョブを取得（同じジョブを複数のプロセスで反映しない）
+
+        反映中のまま lease_seconds を過ぎたジョブ（反映中にプロセスが停止した場合）は再び取得の対象にします。
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'succeeded' AND applied_at IS NULL "
+                "AND (apply_owner IS NULL OR apply_expires_at IS NULL OR apply_expires_at <= ?) "
+                "ORDER BY priority DESC, id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE jobs SET apply_owner = ?, apply_expires_at = ?, updated_at = ? WHERE id = ?",
+                    [(owner, now + self.lease_seconds, now, row['id']) for row in rows]
+                )
+        return [self._to_job(row) for row in rows]
+
+    def mark_applied(self, job_id, result=None):
+        """結果の反映を記録（result を渡すと反映時に作成したタスクIDなどで結果を置き換え）"""
+        now = time.time()
+        with self._transaction() as conn:
+            if result is not None:
+                conn.execute("UPDATE jobs SET result = ? WHERE id = ?", (self._dumps(result), job_id))
+            conn.execute("UPDATE jobs SET applied_at = ?, updated_at = ? WHERE id = ?", (now, now, job_id))
+            job = self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        self._notify(job)
+
+    def mark_apply_failed(self, job_id, error):
+        """結果の反映の失敗を記録（apply_failed として完了し、画面にはエラーを表示）"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'apply_failed', error = ?, apply_owner = NULL, updated_at = ? WHERE id = ?",
+                (str(error), now, job_id)
+            )
+            job = self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        self._notify(job)
+
+    def cancel(self, job_id):
+        """待機中のジョブを取り消し（実行中・完了済みの場合はFalse）"""
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (now, job_id)
+            ).rowcount
+            job = self._to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        if updated:
+            self._notify(job)
+        return bool(updated)
+
+    def get(self, job_id):
+        """ジョブの状態を取得（無い場合はNone）"""
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row)
+
+    def find(self, idempotency_key):
+        """idempotency_key からジョブを取得"""
+        row = self._connection().execute(
+            "SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+        return self._to_job(row)
+
+    def list_jobs(self, status=None, kind=None, limit=50):
+        """新しい順にジョブを取得"""
+        sql = "SELECT * FROM jobs WHERE 1 = 1"
+        params = []
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        if kind is not None:
+            sql += " AND kind = ?"
+            params.append(kind)
+        rows = self._connection().execute(sql + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def position(self, job_id):
+        """待機中のジョブより先に実行されるジョブの数"""
+        job = self.get(job_id)
+        if job is None or job['status'] != 'queued':
+            return 0
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND "
+            "(priority > ? OR (priority = ? AND (run_after < ? OR (run_after = ? AND id < ?))))",
+            (job['priority'], job['priority'], job['run_after'], job['run_after'], job_id)
+        ).fetchone()[0]
+
+    def wait(self, job_id, timeout=None, poll_interval=0.2):
+        """ジョブが完了（結果の反映まで）するまで待機して状態を返す"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['finished']:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def stats(self):
+        """状態ごとのジョブ数"""
+        counts = {status: 0 for status in ('queued', 'running') + FINISHED_STATUSES}
+        for status, count in self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def purge(self, older_than_seconds):
+        """完了から一定時間が経過したジョブを削除"""
+        cutoff = time.time() - older_than_seconds
+        with self._transaction() as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND (status IN ('failed', 'apply_failed', 'cancelled') "
+                "OR (status = 'succeeded' AND applied_at IS NOT NULL))",
+                (cutoff,)
+            ).rowcount
+
+
+class JobWorkerPool:
+    """ジョブを取得して実行するワーカースレッド群
+
+    handlers: 種別 -> run(payload, progress) と apply(job, result) を持つオブジェクト。
+    progress(partial) で途中経過をジョブに保存すると、画面は完了前に部分的な結果を表示できます。
+    run で発生した例外は再試行し、retryable 属性が False の例外は即座に失敗とします。
+    handler に fallback(payload) がある場合は、失敗とする代わりにその結果で完了します。
+    apply=True の場合は、別プロセスのワーカーが実行したジョブも含めて結果を反映します。
+    """
+
+    def __init__(
+        self, queue, handlers, workers=2, poll_interval=1.0, apply=True, kinds=None, name="job-worker",
+        progress_interval=0.5
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.apply = apply
+        self.kinds = list(kinds) if kinds is not None else list(handlers)
+        self.name = name
+        self.owner = f"{name}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._wakeup = threading.Condition()
+        self._stop = False
+        self._threads = []
+        self.executed = 0
+        self.failures = 0
+        self.applied = 0
+        # このプロセスで登録されたジョブはポーリングを待たずに実行
+        queue.subscribe(self._on_change)
+
+    def _on_change(self, job):
+        if job['status'] == 'queued' or (job['status'] == 'succeeded' and job['applied_at'] is None):
+            with self._wakeup:
+                self._wakeup.notify()
+
+    def start(self):
+        """ワーカーを起動（workers=0 の場合は結果の反映のみ行うスレッドを1つ起動）"""
+        if self._threads:
+            return
+        self._stop = False
+        for index in range(max(self.workers, 1)):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        with self._wakeup:
+            self._stop = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        worker_id = f"{self.owner}-{threading.current_thread().name}"
+        while not self._stop:
+            busy = False
+            if self.apply:
+                busy = self.apply_finished() > 0
+            if self.workers:
+                job = self.queue.claim(worker_id, self.kinds)
+                if job is not None:
+                    self.execute(job, worker_id)
+                    busy = True
+            if not busy:
+                with self._wakeup:
+                    if not self._stop:
+                        self._wakeup.wait(self.poll_interval)
+
+    def execute(self, job, worker_id):
+        """ジョブを1件実行して結果を記録"""
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self.queue.fail(job['id'], worker_id, f"未対応のジョブ種別です: {job['kind']}", retryable=False)
+            return
+        try:
+            result = handler.run(job['payload'], progress=self._progress_reporter(job, worker_id))
+        except Exception as e:
+            self.failures += 1
+            retryable = getattr(e, 'retryable', True)
+            fallback = getattr(handler, 'fallback', None)
+            if fallback is None or (retryable and job['attempts'] < job['max_attempts']):
+                self.queue.fail(job['id'], worker_id, e, retryable=retryable)
+                return
+            # 最後の試行でも失敗した場合は代替の結果（テンプレートなど）で完了
+            try:
+                result = fallback(job['payload'])
+            except Exception as fallback_error:
+                self.queue.fail(job['id'], worker_id, fallback_error, retryable=False)
+                return
+        self.executed += 1
+        self.queue.complete(job['id'], worker_id, result)
+
+    def _progress_reporter(self, job, worker_id):
+        """途中経過を保存する関数（書き込みは progress_interval 秒に1回まで）"""
+        last_reported = [0.0]
+
+        def report(partial):
+            now = time.monotonic()
+            if now - last_reported[0] < self.progress_interval:
+                return
+            last_reported[0] = now
+            self.queue.report_progress(job['id'], worker_id, partial)
+
+        return report
+
+    def apply_finished(self):
+        """実行済みジョブの結果を対象のレコードへ反映し、反映した件数を返す"""
+        jobs = self.queue.claim_unapplied(self.owner)
+        for job in jobs:
+            handler = self.handlers.get(job['kind'])
+            try:
+                result = handler.apply(job, job['result']) if handler is not None else None
+            except Exception as e:
+                self.failures += 1
+                self.queue.mark_apply_failed(job['id'], f"結果の反映に失敗しました: {e}")
+                continue
+            self.queue.mark_applied(job['id'], result)
+            self.applied += 1
+        return len(jobs)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'executed': self.executed,
+            'failures': self.failures,
+            'applied': self.applied,
+            **self.queue.stats()
+        }
+
+
+@st.cache_resource
+def get_job_queue():
+    """ジョブキューを取得（プロセスにつき1回）"""
+    queue = JobQueue.from_config(JOB_QUEUE_CONFIG)
+    queue.purge(JOB_QUEUE_CONFIG["retention_days"] * 86400)
+    return queue
@@ -0,0 +1,169 @@
+"""
+BizFlow AI MVP - LLM応答キャッシュ
+同じ入力に対するAI応答を再利用し、API呼び出しを削減します
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import streamlit as st
+from config.config import CACHE_CONFIG
+
+
+def normalize_field(value):
+    """キャッシュキー用に値を正規化（全角/半角・空白の揺れを吸収）"""
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize('NFKC', value).split())
+    if isinstance(value, dict):
+        return {str(k): normalize_field(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_field(v) for v in value]
+    return value
+
+
+def make_cache_key(model, template_version, fields):
+    """(モデル, プロンプトテンプレート版, 正規化済み入力) のハッシュを生成"""
+    payload = json.dumps(
+        {'model': model, 'template': template_version, 'fields': normalize_field(fields)},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """LLM応答キャッシュ（メモリLRU＋SQLiteディスク層、TTL付き）
+
+    ディスク層は開いた時と prune_interval 回の保存ごとに期限切れの行を削除し、
+    disk_max_entries 件を超えた分は有効期限の早い（古い）順に削除します。
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=86400, db_path=None, disk_max_entries=10000, prune_interval=100):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self.prune_interval = prune_interval
+        # 前回の削除以降の保存回数
+        self._writes = 0
+        self._lock = threading.Lock()
+        # キー -> (有効期限, 値)
+        self._memory = OrderedDict()
+        self._conn = None
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_expires_at ON llm_cache (expires_at)")
+            self._conn.commit()
+            with self._lock:
+                self._prune()
+
+    def get(self, key):
+        """キャッシュから値を取得（無い・期限切れの場合はNone）"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl_seconds=None):
+        """キャッシュに値を保存"""
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+                self._conn.commit()
+                self._writes += 1
+                if self._writes >= self.prune_interval:
+                    self._prune()
+
+    def _prune(self):
+        """ディスク層の期限切れの行と、上限を超えた古い行を削除（ロック取得中に呼び出す）"""
+        self._writes = 0
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+        self._conn.commit()
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """キャッシュを全削除"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def stats(self):
+        """ヒット・ミス数の統計"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._memory)
+        }
+
+
+@st.cache_resource
+def get_llm_cache():
+    """全セッション共通のLLM応答キャッシュを取得"""
+    return LLMResponseCache(
+        max_entries=CACHE_CONFIG["llm_max_entries"],
+        ttl_seconds=CACHE_CONFIG["llm_ttl_seconds"],
+        db_path=CACHE_CONFIG["llm_db_path"],
+        disk_max_entries=CACHE_CONFIG["llm_disk_max_entries"],
+        prune_interval=CACHE_CONFIG["llm_prune_interval"]
+    )
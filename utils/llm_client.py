@@ -0,0 +1,58 @@
+"""
+BizFlow AI MVP - LLMクライアント管理
+API設定とモデルオブジェクトをプロセス内で共有し、リクエストごとの再生成を避けます
+"""
+
+import threading
+
+import streamlit as st
+
+# テスト用のダミーAPIキー（設定済みとはみなさない）
+DUMMY_GEMINI_API_KEY = "test-gemini-api-key-12345"
+
+
+class LLMClientRegistry:
+    """プロセス全体で共有するLLMクライアントのレジストリ"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gemini_api_key = None
+        self._models = {}
+
+    def configure_gemini(self, api_key):
+        """Gemini APIを設定（同じAPIキーでの再設定は行わない）"""
+        if not api_key or api_key == DUMMY_GEMINI_API_KEY:
+            return False
+
+        with self._lock:
+            if self._gemini_api_key != api_key:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                self._gemini_api_key = api_key
+                # APIキーが変わった場合は古い設定のモデルを破棄
+                self._models.clear()
+        return True
+
+    @property
+    def gemini_configured(self):
+        return self._gemini_api_key is not None
+
+    def gemini_model(self, model_name='gemini-1.5-flash'):
+        """Geminiモデルを取得（モデル名ごとに1インスタンスを再利用）
+
+        モデルオブジェクトは最初の呼び出しで生成したAPIクライアントを保持するため、
+        再利用することで接続も使い回されます。
+        """
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                import google.generativeai as genai
+                model = genai.GenerativeModel(model_name)
+                self._models[model_name] = model
+        return model
+
+
+@st.cache_resource
+def get_llm_registry():
+    """全セッション共通のLLMクライアントレジストリを取得"""
+    return LLMClientRegistry()
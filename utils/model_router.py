@@ -0,0 +1,292 @@
+"""
+BizFlow AI MVP - AIモデルルーター
+config.AI_MODELS の各プロバイダーのレイテンシとエラー率を計測し、
+最も速く正常なプロバイダーへリクエストを振り分けます（遅延時は次候補へヘッジ）
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+import streamlit as st
+from config.config import AI_MODELS
+from utils.ai_batch import is_retryable_error
+from utils.llm_client import DUMMY_GEMINI_API_KEY, get_llm_registry
+
+
+class AllProvidersFailedError(Exception):
+    """全てのプロバイダーでリクエストが失敗"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        detail = ", ".join(f"{name}: {error}" for name, error in errors) or "利用可能なプロバイダーがありません"
+        super().__init__(f"AIリクエストに失敗しました（{detail}）")
+
+    @property
+    def retryable(self):
+        """全てのプロバイダーのエラーが一時的なもの（レート超過・タイムアウト等）であれば再試行可能"""
+        return bool(self.errors) and all(is_retryable_error(error) for _, error in self.errors)
+
+
+class GeminiProvider:
+    """Google Gemini"""
+
+    def __init__(self, api_key, model_name):
+        self.name = 'gemini'
+        self.api_key = api_key
+        self.model_name = model_name
+
+    def generate(self, prompt):
+        registry = get_llm_registry()
+        registry.configure_gemini(self.api_key)
+        return registry.gemini_model(self.model_name).generate_content(prompt).text
+
+
+class ClaudeProvider:
+    """Anthropic Claude（Messages API）"""
+
+    API_URL = "https://api.anthropic.com/v1/messages"
+
+    def __init__(self, api_key, model_name, timeout=60):
+        self.name = 'claude'
+        self.model_name = model_name
+        self.timeout = timeout
+        # 接続を再利用するためセッションを保持
+        self.session = requests.Session()
+        self.session.headers.update({
+            'x-api-key': api_key,
+            'anthropic-version': '2023-06-01',
+            'content-type': 'application/json'
+        })
+
+    def generate(self, prompt):
+        response = self.session.post(self.API_URL, timeout=self.timeout, json={
+            'model': self.model_name,
+            'max_tokens': 2048,
+            'messages': [{'role': 'user', 'content': prompt}]
+        })
+        response.raise_for_status()
+        return "".join(block.get('text', '') for block in response.json().get('content', []))
+
+
+class OpenAIProvider:
+    """OpenAI（Chat Completions API）"""
+
+    API_URL = "https://api.openai.com/v1/chat/completions"
+
+    def __init__(self, api_key, model_name, timeout=60):
+        self.name = 'openai'
+        self.model_name = model_name
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({'Authorization': f"Bearer {api_key}"})
+
+    def generate(self, prompt):
+        response = self.session.post(self.API_URL, timeout=self.timeout, json={
+            'model': self.model_name,
+            'messages': [{'role': 'user', 'content': prompt}]
+        })
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
+
+class StubProvider:
+    """ローカル検証用のスタブ（レイテンシ・失敗を注入可能）
+
+    latency は秒数または秒数を返す関数です。fail=True の場合は ConnectionError（一時的なエラー）を、
+    例外を渡した場合はその例外を送出します。
+    """
+
+    def __init__(self, name, response="", latency=0.0, fail=False):
+        self.name = name
+        self.response = response
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        time.sleep(latency)
+        if isinstance(self.fail, Exception):
+            raise self.fail
+        if self.fail:
+            raise ConnectionError(f"{self.name} stub failure")
+        return self.response or f"[{self.name}] {prompt}"
+
+
+PROVIDER_CLASSES = {
+    'gemini': GeminiProvider,
+    'claude': ClaudeProvider,
+    'openai': OpenAIProvider
+}
+
+
+class ProviderStats:
+    """プロバイダーごとの直近リクエストのレイテンシ・エラー率"""
+
+    def __init__(self, window=100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.last_called_at = 0.0
+
+    def record(self, latency, ok):
+        with self._lock:
+            self._samples.append((latency, ok))
+            self.last_called_at = time.monotonic()
+
+    @property
+    def count(self):
+        return len(self._samples)
+
+    @property
+    def error_rate(self):
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def percentile(self, q):
+        """成功したリクエストのレイテンシのパーセンタイル（データが無い場合はNone）"""
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    @property
+    def p50(self):
+        return self.percentile(0.5)
+
+    @property
+    def p95(self):
+        return self.percentile(0.95)
+
+
+class ModelRouter:
+    """レイテンシを考慮したAIプロバイダーのルーター（フェイルオーバー・ヘッジ付き）"""
+
+    def __init__(self, providers, hedge_after=5.0, max_error_rate=0.5,
+                 cooldown=60.0, window=100, max_workers=8):
+        # providers は優先順（primary, secondary, ...）
+        self.providers = list(providers)
+        self.hedge_after = hedge_after
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.stats = {provider.name: ProviderStats(window) for provider in self.providers}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    @classmethod
+    def from_config(cls, config=AI_MODELS, model_names=None, **kwargs):
+        """AI_MODELS からAPIキーが設定済みのプロバイダーでルーターを構築"""
+        model_names = model_names or {}
+        order = [config.get('primary'), config.get('secondary')]
+        order += [name for name in config['models'] if name not in order]
+
+        providers = []
+        for name in order:
+            settings = config['models'].get(name)
+            api_key = settings and settings.get('api_key')
+            if not api_key or api_key == DUMMY_GEMINI_API_KEY or name not in PROVIDER_CLASSES:
+                continue
+            providers.append(PROVIDER_CLASSES[name](api_key, model_names.get(name, settings['model_name'])))
+        return cls(providers, **kwargs)
+
+    @property
+    def available(self):
+        return bool(self.providers)
+
+    def is_healthy(self, provider):
+        stats = self.stats[provider.name]
+        if stats.error_rate <= self.max_error_rate:
+            return True
+        # 一定時間経過後は回復確認のため再度候補に含める
+        return time.monotonic() - stats.last_called_at >= self.cooldown
+
+    def rank(self, prefer=None):
+        """リクエスト先の候補順（正常・p50が速い順。未計測のものは設定順で優先）
+
+        prefer にプロバイダー名を渡すと、そのプロバイダーが正常であれば先頭にします。
+        """
+        def sort_key(indexed):
+            priority, provider = indexed
+            p50 = self.stats[provider.name].p50
+            healthy = self.is_healthy(provider)
+            return (not healthy, not (healthy and provider.name == prefer), 0.0 if p50 is None else p50, priority)
+
+        return [provider for _, provider in sorted(enumerate(self.providers), key=sort_key)]
+
+    def hedge_deadline(self, provider):
+        """次候補へヘッジするまでの待ち時間"""
+        p95 = self.stats[provider.name].p95
+        return self.hedge_after if p95 is None else max(p95, self.hedge_after / 4)
+
+    def _timed_call(self, provider, prompt):
+        start = time.monotonic()
+        try:
+            result = provider.generate(prompt)
+        except Exception:
+            self.stats[provider.name].record(time.monotonic() - start, False)
+            raise
+        self.stats[provider.name].record(time.monotonic() - start, True)
+        return result
+
+    def generate(self, prompt, prefer=None):
+        """最適なプロバイダーでテキストを生成（prefer で優先するプロバイダーを指定可）"""
+        candidates = self.rank(prefer)
+        errors = []
+        running = {}
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            provider = candidates[next_index]
+            next_index += 1
+            running[self._executor.submit(self._timed_call, provider, prompt)] = provider
+            return provider
+
+        if not candidates:
+            raise AllProvidersFailedError(errors)
+
+        current = launch()
+        while running:
+            timeout = self.hedge_deadline(current) if next_index < len(candidates) else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 応答が遅いため次候補にも同時にリクエスト
+                current = launch()
+                continue
+
+            for future in done:
+                provider = running.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append((provider.name, e))
+
+            # 失敗した場合はすぐに次候補へフェイルオーバー
+            if next_index < len(candidates):
+                current = launch()
+
+        raise AllProvidersFailedError(errors)
+
+    def health(self):
+        """プロバイダーごとの統計"""
+        return {
+            provider.name: {
+                'p50': self.stats[provider.name].p50,
+                'p95': self.stats[provider.name].p95,
+                'error_rate': self.stats[provider.name].error_rate,
+                'requests': self.stats[provider.name].count,
+                'healthy': self.is_healthy(provider)
+            }
+            for provider in self.providers
+        }
+
+
+@st.cache_resource
+def get_model_router():
+    """全セッション共通のモデルルーターを取得"""
+    return ModelRouter.from_config(AI_MODELS, model_names={'gemini': 'gemini-1.5-flash'})
@@ -0,0 +1,164 @@
+"""
+BizFlow AI MVP - クエリキャッシュ
+データベースの読み取り結果を (コレクション, クエリ) 単位でキャッシュし、書き込み時に無効化します
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import streamlit as st
+from config.config import CACHE_CONFIG
+
+
+def make_query_key(*parts):
+    """クエリ条件からキャッシュキーを生成"""
+    return json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class SQLiteInvalidationBus:
+    """同じマシン上の他プロセスへ無効化を通知する簡易Pub/Sub（SQLiteの追記ログ）"""
+
+    def __init__(self, db_path, retention_seconds=3600):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.retention_seconds = retention_seconds
+        # 自プロセスが発行した通知を受け取らないための識別子
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_invalidations ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT NOT NULL, "
+            "origin TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        # 起動前の通知は不要なため、現時点の末尾から購読する
+        self._last_id = self._conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM query_invalidations"
+        ).fetchone()[0]
+
+    def publish(self, collection_name):
+        """コレクションの無効化を通知"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO query_invalidations (collection, origin, created_at) VALUES (?, ?, ?)",
+                (collection_name, self.origin, now)
+            )
+            self._conn.execute(
+                "DELETE FROM query_invalidations WHERE created_at < ?",
+                (now - self.retention_seconds,)
+            )
+
+    def poll(self):
+        """前回以降に他プロセスから通知されたコレクション名"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, collection, origin FROM query_invalidations WHERE id > ? ORDER BY id",
+                (self._last_id,)
+            ).fetchall()
+            if rows:
+                self._last_id = rows[-1][0]
+        return {collection for _, collection, origin in rows if origin != self.origin}
+
+
+class QueryCache:
+    """読み取り結果のLRUキャッシュ（書き込み時にコレクション単位で無効化）"""
+
+    def __init__(self, max_entries=256, invalidation_bus=None, poll_interval=1.0):
+        self.max_entries = max_entries
+        self.invalidation_bus = invalidation_bus
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # (コレクション, キー) -> 結果
+        self._entries = OrderedDict()
+        # コレクションごとの世代（読み込み中に無効化された結果を保存しないため）
+        self._generations = {}
+        self._polled_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sync(self):
+        """他プロセスからの無効化通知を反映（poll_interval ごと）"""
+        if self.invalidation_bus is None:
+            return
+        now = time.monotonic()
+        if now - self._polled_at < self.poll_interval:
+            return
+        self._polled_at = now
+        for collection_name in self.invalidation_bus.poll():
+            self._invalidate_local(collection_name)
+
+    def get_or_load(self, collection_name, key, loader):
+        """キャッシュ済みの結果を返し、無ければ loader() で読み込んで保存"""
+        self._sync()
+        entry_key = (collection_name, key)
+        with self._lock:
+            if entry_key in self._entries:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return self._entries[entry_key]
+            self.misses += 1
+            generation = self._generations.get(collection_name, 0)
+
+        value = loader()
+
+        with self._lock:
+            if self._generations.get(collection_name, 0) == generation:
+                self._entries[entry_key] = value
+                self._entries.move_to_end(entry_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def _invalidate_local(self, collection_name):
+        with self._lock:
+            self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+            for entry_key in [k for k in self._entries if k[0] == collection_name]:
+                del self._entries[entry_key]
+            self.invalidations += 1
+
+    def invalidate(self, collection_name):
+        """コレクションのキャッシュを無効化（他プロセスにも通知）"""
+        self._invalidate_local(collection_name)
+        if self.invalidation_bus is not None:
+            self.invalidation_bus.publish(collection_name)
+
+    def clear(self):
+        with self._lock:
+            for collection_name in self._generations:
+                self._generations[collection_name] += 1
+            self._entries.clear()
+
+    def stats(self):
+        """ヒット・ミス数の統計"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+
+@st.cache_resource
+def get_query_cache():
+    """全セッション共通のクエリキャッシュを取得"""
+    bus_path = CACHE_CONFIG["query_invalidation_path"]
+    return QueryCache(
+        max_entries=CACHE_CONFIG["query_max_entries"],
+        invalidation_bus=SQLiteInvalidationBus(bus_path) if bus_path else None,
+        poll_interval=CACHE_CONFIG["query_poll_interval"]
+    )
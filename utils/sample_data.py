@@ -0,0 +1,164 @@
+"""
+BizFlow AI MVP - サンプルデータ
+共有ボードの初期タスク（イベントログが空の場合に使用）と、外部サービス未連携時に表示するメッセージ
+"""
+
+SAMPLE_TASKS = [
+    {
+        'id': 1,
+        'name': '田中さんへの緊急返信',
+        'description': '【緊急】プレゼン資料確認への返信対応。修正箇所の特定と迅速な対応が必要。',
+        'status': 'To Do',
+        'priority': '高',
+        'project': 'プロジェクトX',
+        'assignee': '自分',
+        'due_date': '今日 18:00',
+        'estimated_time': '15分',
+        'created_from_message': True,
+        'source_message': {'sender': '田中一郎', 'subject': '【緊急】プレゼン資料確認'},
+        'subtasks': [
+            {'id': 1, 'name': 'メッセージ内容の詳細確認', 'completed': False},
+            {'id': 2, 'name': 'プレゼン資料の確認', 'completed': False},
+            {'id': 3, 'name': '修正箇所の特定と対応', 'completed': False}
+        ],
+        'comments': [],
+        'tags': ['緊急', 'プレゼン', 'コミュニケーション'],
+        'created_at': '2025-07-19 14:30',
+        'completion_criteria': '田中さんへの返信送信完了'
+    },
+    {
+        'id': 2,
+        'name': 'マーケティング企画への回答',
+        'description': '山田花子さんからのキャンペーン企画相談への対応。ターゲット層分析とKPI設定を含む包括的な回答が必要。',
+        'status': '進行中',
+        'priority': '中',
+        'project': 'マーケティング戦略',
+        'assignee': '自分',
+        'due_date': '明日 17:00',
+        'estimated_time': '45分',
+        'created_from_message': True,
+        'source_message': {'sender': '山田花子', 'subject': 'キャンペーン企画の件'},
+        'subtasks': [
+            {'id': 1, 'name': 'ターゲット層の分析', 'completed': True},
+            {'id': 2, 'name': '予算配分の検討', 'completed': False},
+            {'id': 3, 'name': 'KPI設定の提案', 'completed': False}
+        ],
+        'comments': [
+            {'author': '自分', 'text': 'ターゲット層の分析完了。20代女性を中心に検討。', 'timestamp': '2025-07-19 15:30'}
+        ],
+        'tags': ['企画', 'マーケティング', 'コミュニケーション'],
+        'created_at': '2025-07-19 13:15',
+        'completion_criteria': '企画提案の回答送信完了'
+    },
+    {
+        'id': 3,
+        'name': 'クライアント向けプロポーザル作成',
+        'description': '新規クライアント向けの提案資料作成。要件整理からデザイン調整まで含む完全版の作成。',
+        'status': 'レビュー中',
+        'priority': '高',
+        'project': 'プロジェクトX',
+        'assignee': '自分',
+        'due_date': '明後日 12:00',
+        'estimated_time': '3時間',
+        'created_from_message': False,
+        'subtasks': [
+            {'id': 1, 'name': '要件整理', 'completed': True},
+            {'id': 2, 'name': 'コンテンツ作成', 'completed': True},
+            {'id': 3, 'name': 'デザイン調整', 'completed': True},
+            {'id': 4, 'name': '最終レビュー', 'completed': False}
+        ],
+        'comments': [
+            {'author': '自分', 'text': 'プロポーザルのドラフト完成。レビュー待ち。', 'timestamp': '2025-07-19 16:00'}
+        ],
+        'tags': ['プロポーザル', '営業', 'ドキュメント'],
+        'created_at': '2025-07-18 09:00',
+        'completion_criteria': 'プロポーザル完成・提出完了'
+    },
+    {
+        'id': 4,
+        'name': 'システム進捗報告の確認',
+        'description': '佐藤次郎さんからの進捗報告内容の確認と返信。システム更新の進行状況を把握し適切にフィードバック。',
+        'status': '完了',
+        'priority': '低',
+        'project': 'システム開発',
+        'assignee': '自分',
+        'due_date': '今日 17:00',
+        'estimated_time': '10分',
+        'created_from_message': True,
+        'source_message': {'sender': '佐藤次郎', 'subject': '進捗報告'},
+        'subtasks': [
+            {'id': 1, 'name': '進捗内容の確認', 'completed': True},
+            {'id': 2, 'name': '質問事項の整理', 'completed': True},
+            {'id': 3, 'name': '確認返信の送信', 'completed': True}
+        ],
+        'comments': [
+            {'author': '自分', 'text': '80%進捗確認。予定通り完了見込み。', 'timestamp': '2025-07-19 11:30'}
+        ],
+        'tags': ['進捗', 'システム', '報告'],
+        'created_at': '2025-07-19 11:00',
+        'completion_criteria': '進捗確認と返信完了'
+    }
+]
+
+SAMPLE_MESSAGES = [
+    {
+        "id": "msg_1",
+        "source": "Slack",
+        "sender": "田中さん (開発チーム)",
+        "subject": "プロジェクトXのAPI仕様について",
+        "preview": "お疲れ様です。API仕様の件でご相談があります。認証部分の実装方針について...",
+        "timestamp": "2025-07-17 14:30",
+        "status": "未読",
+        "importance": "高",
+        "thread_count": 3,
+        "channel": "#project-x"
+    },
+    {
+        "id": "msg_2",
+        "source": "Gmail",
+        "sender": "client@example.com",
+        "subject": "提案書についてのフィードバック",
+        "preview": "先日お送りいただいた提案書を拝見いたしました。いくつか質問がございまして...",
+        "timestamp": "2025-07-17 10:15",
+        "status": "重要",
+        "importance": "高",
+        "thread_count": 1,
+        "channel": "メール"
+    },
+    {
+        "id": "msg_3",
+        "source": "Teams",
+        "sender": "山田さん (営業部)",
+        "subject": "来週のクライアント打ち合わせ",
+        "preview": "来週火曜日のクライアント打ち合わせの件でご相談です。議題の追加をお願いしたく...",
+        "timestamp": "2025-07-17 09:45",
+        "status": "未読",
+        "importance": "中",
+        "thread_count": 2,
+        "channel": "営業チーム"
+    },
+    {
+        "id": "msg_4",
+        "source": "Chatwork",
+        "sender": "佐藤さん (デザイン)",
+        "subject": "UI/UXデザインのレビュー依頼",
+        "preview": "新機能のデザインが完成しました。お時間のある時にレビューをお願いします...",
+        "timestamp": "2025-07-16 16:20",
+        "status": "返信済み",
+        "importance": "中",
+        "thread_count": 5,
+        "channel": "デザインチーム"
+    },
+    {
+        "id": "msg_5",
+        "source": "Gmail",
+        "sender": "support@service.com",
+        "subject": "月次レポートの送付",
+        "preview": "いつもお世話になっております。6月分の月次レポートをお送りいたします...",
+        "timestamp": "2025-07-16 12:00",
+        "status": "アーカイブ",
+        "importance": "低",
+        "thread_count": 1,
+        "channel": "メール"
+    }
+]
@@ -0,0 +1,255 @@
+"""
+BizFlow AI MVP - 共有タスクボード
+全セッションで1つのタスクボードを共有し、変更ごとに版を進めて他のユーザーへ通知します
+"""
+
+import bisect
+import copy
+import logging
+import threading
+
+import streamlit as st
+from utils.event_log import TaskEventLog, get_task_event_log
+from utils.sample_data import SAMPLE_TASKS
+from utils.task_store import TaskStore
+
+logger = logging.getLogger(__name__)
+
+
+class VersionConflictError(Exception):
+    """タスクが読み込み後に他の更新で変更されていた"""
+
+    def __init__(self, task_id, expected_version, current):
+        self.task_id = task_id
+        self.expected_version = expected_version
+        # 現在のタスク（削除済みの場合はNone）
+        self.current = current
+        actual = "削除済み" if current is None else f"版 {current.get('version')}"
+        super().__init__(f"タスク {task_id} は他の更新と競合しました（読み込み時: 版 {expected_version} / 現在: {actual}）")
+
+
+class SharedBoard:
+    """プロセス内の全セッションで共有するタスクボード
+
+    タスクは変更のたびに新しい辞書へ置き換える（コピーオンライト）ため、読み取り側が受け取った
+    タスクや集計は後から書き換わりません。取得したタスクは直接変更せず、必ずボードのメソッドで更新します。
+
+    各タスクは変更のたびに増える版番号（version）を持ちます。書き込みメソッドに読み込み時の版を
+    expected_version として渡すと、その間に他の更新があった場合は VersionConflictError になります。
+
+    全ての変更はイベントログに記録され、ボードの版はログのオフセットと一致します。
+    ログに記録済みのイベントがある場合は、初期タスクではなくログから状態を復元します。
+    """
+
+    def __init__(self, tasks=None, event_log=None):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.events = event_log if event_log is not None else TaskEventLog()
+
+        if self.events.offset:
+            tasks = list(self.events.replay().values())
+        else:
+            tasks = copy.deepcopy(tasks or [])
+            for task in tasks:
+                task.setdefault('version', 1)
+        self._store = TaskStore(tasks)
+        self._counters = self._store.counters.copy()
+        self._listeners = []
+        # ページ送り用のID順一覧（追加・削除のたびに破棄）
+        self._sorted_ids = None
+        if not self.events.offset:
+            self.events.snapshot(self._task_map())
+
+    @property
+    def version(self):
+        return self.events.offset
+
+    # 読み取り
+
+    def __len__(self):
+        return self._counters.total
+
+    @property
+    def counters(self):
+        """現在の版の集計（読み取り専用）"""
+        return self._counters
+
+    def get(self, task_id):
+        with self._lock:
+            return self._store.get(task_id)
+
+    def all(self, offset=0, limit=None):
+        with self._lock:
+            return self._store.all(offset, limit)
+
+    def snapshot(self):
+        """(版, 全タスク) を同じ時点で取得"""
+        with self._lock:
+            return self.version, self._store.all()
+
+    def page(self, after=None, limit=100):
+        """ID順で after より後のタスクを最大 limit 件取得し、(版, タスク, 次のカーソル) を返す
+
+        ID順の一覧は版ごとに1回だけ作り直すため、ページ送りは二分探索で済みます。
+        次のページが無い場合、カーソルはNoneです。
+        """
+        with self._lock:
+            if self._sorted_ids is None:
+                self._sorted_ids = sorted(task['id'] for task in self._store)
+            ids = self._sorted_ids
+            start = 0 if after is None else bisect.bisect_right(ids, after)
+            page_ids = ids[start:start + limit]
+            tasks = [self._store.get(task_id) for task_id in page_ids]
+            next_after = page_ids[-1] if start + limit < len(ids) else None
+            return self.version, tasks, next_after
+
+    def changes(self, version):
+        """指定した版より後に変更されたタスクを (現在の版, 現在のタスク, 削除されたID) で取得
+
+        同じタスクへの複数の変更は最新の状態1件にまとめます。
+        イベントが圧縮済みで差分を作れない場合はNoneを返します。
+        """
+        with self._lock:
+            events = self.events.since(version)
+            if events is None:
+                return None
+            tasks = []
+            deleted = []
+            for task_id in dict.fromkeys(event['task_id'] for event in events):
+                task = self._store.get(task_id)
+                if task is None:
+                    deleted.append(task_id)
+                else:
+                    tasks.append(task)
+            return self.version, tasks, deleted
+
+    def find(self, field, value, offset=0, limit=None):
+        with self._lock:
+            return self._store.find(field, value, offset, limit)
+
+    def by_status(self, status, offset=0, limit=None):
+        return self.find('status', status, offset, limit)
+
+    def by_project(self, project, offset=0, limit=None):
+        return self.find('project', project, offset, limit)
+
+    # 書き込み
+
+    def _task_map(self):
+        return {task['id']: task for task in self._store}
+
+    def _commit(self, event_type, task_id, user, changes=None, detail=None):
+        """イベントを記録して版を進める（ロック取得中に呼び出す）"""
+        self._counters = self._store.counters.copy()
+        if event_type in ('task_created', 'task_deleted'):
+            self._sorted_ids = None
+        event = self.events.append(event_type, task_id, user, changes, detail)
+        if self.events.needs_snapshot():
+            self.events.snapshot(self._task_map())
+        self._changed.notify_all()
+        return event
+
+    def _notify(self, event):
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception:
+                # 変更は記録済みのため、通知先（SSE・WebSocketなど）のエラーで書き込み側を失敗させない
+                logger.exception("タスクボードの変更通知に失敗しました")
+
+    def add(self, task, user=None):
+        """タスクを追加（IDが無い場合は採番）"""
+        with self._lock:
+            task = self._store.add({**task, 'version': 1, 'updated_by': user})
+            event = self._commit('task_created', task['id'], user, task, {'name': task.get('name')})
+        self._notify(event)
+        return task
+
+    def update(self, task_id, updates, user=None, expected_version=None):
+        """タスクを更新（新しい辞書に置き換える）"""
+        if set(updates) == {'status'}:
+            return self._modify(
+                task_id, lambda task: updates, user, expected_version, 'status_changed',
+                lambda task: {'from': task.get('status'), 'to': updates['status']}
+            )
+        return self._modify(task_id, lambda task: updates, user, expected_version)
+
+    def _check_version(self, task_id, task, expected_version):
+        if expected_version is not None and (task is None or task.get('version') != expected_version):
+            raise VersionConflictError(task_id, expected_version, task)
+
+    def delete(self, task_id, user=None, expected_version=None):
+        """タスクを削除"""
+        with self._lock:
+            self._check_version(task_id, self._store.get(task_id), expected_version)
+            task = self._store.delete(task_id)
+            if task is None:
+                return None
+            event = self._commit('task_deleted', task_id, user, detail={'name': task.get('name')})
+        self._notify(event)
+        return task
+
+    def _modify(self, task_id, modify, user, expected_version=None, event_type='task_updated', detail=None):
+        """現在のタスクから更新内容を作って反映（版の比較と置き換えをまとめて行う）
+
+        detail は変更前のタスクから表示用の補足を作る関数です。
+        """
+        with self._lock:
+            task = self._store.get(task_id)
+            self._check_version(task_id, task, expected_version)
+            if task is None:
+                return None
+            changes = {**modify(task), 'version': task.get('version', 0) + 1, 'updated_by': user}
+            event_detail = {'name': task.get('name'), **(detail(task) if detail else {})}
+            task = self._store.add({**task, **changes})
+            event = self._commit(event_type, task_id, user, changes, event_detail)
+        self._notify(event)
+        return task
+
+    def set_subtask_completed(self, task_id, subtask_id, completed, user=None, expected_version=None):
+        """サブタスクの完了状態を変更"""
+        def detail(task):
+            names = [subtask['name'] for subtask in task.get('subtasks', []) if subtask['id'] == subtask_id]
+            return {'subtask': names[0] if names else None, 'completed': completed}
+        return self._modify(task_id, lambda task: {'subtasks': [
+            {**subtask, 'completed': completed} if subtask['id'] == subtask_id else subtask
+            for subtask in task.get('subtasks', [])
+        ]}, user, expected_version, 'subtask_toggled', detail)
+
+    def add_subtask(self, task_id, name, user=None):
+        """サブタスクを追加（追記のみのため、他の更新と競合しない）"""
+        def modify(task):
+            subtasks = task.get('subtasks', [])
+            next_id = max((subtask['id'] for subtask in subtasks), default=0) + 1
+            return {'subtasks': subtasks + [{'id': next_id, 'name': name, 'completed': False}]}
+        return self._modify(task_id, modify, user, None, 'subtask_added', lambda task: {'subtask': name})
+
+    def add_comment(self, task_id, comment, user=None):
+        """コメントを追加（追記のみのため、他の更新と競合しない）"""
+        return self._modify(
+            task_id, lambda task: {'comments': task.get('comments', []) + [comment]},
+            user, None, 'comment_added', lambda task: {'text': comment.get('text')}
+        )
+
+    # 変更通知
+
+    def changes_since(self, version):
+        """指定した版より後のイベント（圧縮済みで残っていない場合はNone）"""
+        return self.events.since(version)
+
+    def wait_for_change(self, version, timeout=None):
+        """指定した版より新しい版になるまで待機し、現在の版を返す"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version > version, timeout=timeout)
+            return self.version
+
+    def subscribe(self, listener):
+        """変更ごとに listener(event) を呼び出す（登録解除用の関数を返す）"""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+
+@st.cache_resource
+def get_shared_board():
+    """全セッション共通のタスクボードを取得（変更は共通のイベントログに記録）"""
+    return SharedBoard(SAMPLE_TASKS, event_log=get_task_event_log())
@@ -0,0 +1,195 @@
+"""
+BizFlow AI MVP - タスクストア
+タスクをIDで索引し、ステータス・プロジェクト・優先度の二次索引を保持します
+"""
+
+from collections import Counter
+from itertools import islice
+
+
+class TaskCounters:
+    """ステータス・プロジェクト・AI作成数の集計カウンター（差分更新）"""
+
+    # 集計に影響するフィールド
+    TRACKED_FIELDS = ('status', 'project', 'created_from_message')
+
+    def __init__(self):
+        self.total = 0
+        self.ai_created = 0
+        self._by_status = Counter()
+        self._by_project = Counter()
+        self._by_project_status = Counter()
+
+    def add(self, task):
+        """タスク1件分を加算"""
+        self._apply(task, 1)
+
+    def remove(self, task):
+        """タスク1件分を減算"""
+        self._apply(task, -1)
+
+    def _apply(self, task, delta):
+        status = task.get('status')
+        project = task.get('project', 'その他')
+
+        self.total += delta
+        if task.get('created_from_message'):
+            self.ai_created += delta
+        self._by_status[status] += delta
+        self._by_project[project] += delta
+        self._by_project_status[(project, status)] += delta
+
+    def copy(self):
+        """同じ集計値を持つ別のカウンター"""
+        counters = TaskCounters()
+        counters.total = self.total
+        counters.ai_created = self.ai_created
+        counters._by_status = self._by_status.copy()
+        counters._by_project = self._by_project.copy()
+        counters._by_project_status = self._by_project_status.copy()
+        return counters
+
+    def status(self, status):
+        """ステータス別のタスク数"""
+        return self._by_status[status]
+
+    def project(self, project, status=None):
+        """プロジェクト別のタスク数（ステータス指定可）"""
+        if status is None:
+            return self._by_project[project]
+        return self._by_project_status[(project, status)]
+
+    def project_stats(self):
+        """プロジェクト別の合計・完了数"""
+        return {
+            project: {'total': total, 'completed': self._by_project_status[(project, '完了')]}
+            for project, total in self._by_project.items()
+            if total > 0
+        }
+
+
+class TaskStore:
+    """ID索引と二次索引を持つタスクストア"""
+
+    # 二次索引を張るフィールド
+    INDEXED_FIELDS = ('status', 'project', 'priority')
+
+    def __init__(self, tasks=None):
+        self._tasks = {}
+        # フィールド名 -> 値 -> {タスクID: None}（挿入順を保つ集合として利用）
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        self._next_id = 1
+        self.counters = TaskCounters()
+
+        for task in tasks or []:
+            self.add(task)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(list(self._tasks.values()))
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def _index_add(self, task, fields=INDEXED_FIELDS):
+        for field in fields:
+            bucket = self._indexes[field].setdefault(task.get(field), {})
+            bucket[task['id']] = None
+
+    def _index_remove(self, task, fields=INDEXED_FIELDS):
+        for field in fields:
+            bucket = self._indexes[field].get(task.get(field))
+            if bucket is None:
+                continue
+            bucket.pop(task['id'], None)
+            if not bucket:
+                del self._indexes[field][task.get(field)]
+
+    def _index_replace(self, previous, task):
+        """値が変わったフィールドの索引のみ付け替え"""
+        changed = [field for field in self.INDEXED_FIELDS if previous.get(field) != task.get(field)]
+        self._index_remove(previous, changed)
+        self._index_add(task, changed)
+
+    def add(self, task):
+        """タスクを追加（IDが無い場合は採番）
+
+        同じIDのタスクは置き換えます。値が変わらない索引では元の並び順を保ちます
+        （ステータスを変えない更新でカンバンの列内の位置が動かないように）。
+        """
+        if task.get('id') is None:
+            task['id'] = self._next_id
+        previous = self._tasks.get(task['id'])
+        if previous is not None:
+            self.counters.remove(previous)
+            self._index_replace(previous, task)
+        else:
+            self._index_add(task)
+
+        self._tasks[task['id']] = task
+        self.counters.add(task)
+
+        if isinstance(task['id'], int) and task['id'] >= self._next_id:
+            self._next_id = task['id'] + 1
+        return task
+
+    def get(self, task_id):
+        """タスクIDからタスクを取得"""
+        return self._tasks.get(task_id)
+
+    def update(self, task_id, updates):
+        """タスクを更新（索引対象フィールドの変更は索引にも反映）"""
+        task = self._tasks.get(task_id)
+        if task is None:
+            return None
+
+        reindex = [
+            field for field in self.INDEXED_FIELDS
+            if field in updates and updates[field] != task.get(field)
+        ]
+        recount = any(
+            field in updates and updates[field] != task.get(field)
+            for field in TaskCounters.TRACKED_FIELDS
+        )
+        self._index_remove(task, reindex)
+        if recount:
+            self.counters.remove(task)
+        task.update(updates)
+        self._index_add(task, reindex)
+        if recount:
+            self.counters.add(task)
+        return task
+
+    def delete(self, task_id):
+        """タスクを削除"""
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            self._index_remove(task)
+            self.counters.remove(task)
+        return task
+
+    def all(self, offset=0, limit=None):
+        """全タスクを作成順で取得（offset/limitで範囲指定可）"""
+        stop = None if limit is None else offset + limit
+        return list(islice(self._tasks.values(), offset, stop))
+
+    def find(self, field, value, offset=0, limit=None):
+        """索引を使ってフィールド値が一致するタスクを取得（offset/limitで範囲指定可）"""
+        bucket = self._indexes[field].get(value, {})
+        stop = None if limit is None else offset + limit
+        return [self._tasks[task_id] for task_id in islice(bucket, offset, stop)]
+
+    def count(self, field, value):
+        """索引を使ってフィールド値が一致するタスク数を取得"""
+        return len(self._indexes[field].get(value, {}))
+
+    def by_status(self, status, offset=0, limit=None):
+        return self.find('status', status, offset, limit)
+
+    def by_project(self, project, offset=0, limit=None):
+        return self.find('project', project, offset, limit)
+
+    def by_priority(self, priority, offset=0, limit=None):
+        return self.find('priority', priority, offset, limit)